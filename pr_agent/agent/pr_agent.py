@@ -4,6 +4,7 @@ from functools import partial
 from pr_agent.algo.ai_handlers.base_ai_handler import BaseAiHandler
 from pr_agent.algo.ai_handlers.litellm_ai_handler import LiteLLMAIHandler
 from pr_agent.algo.cli_args import CliArgs
+from pr_agent.algo.metrics import metrics_command
 from pr_agent.algo.utils import update_settings_from_args
 from pr_agent.config_loader import get_settings
 from pr_agent.git_providers.utils import apply_repo_settings
@@ -91,7 +92,7 @@ class PRAgent:
         if action not in command2class:
             get_logger().error(f"Unknown command: {action}")
             return False
-        with get_logger().contextualize(command=action, pr_url=pr_url):
+        with get_logger().contextualize(command=action, pr_url=pr_url), metrics_command(action):
             get_logger().info("PR-Agent request handler started", analytics=True)
             if action == "answer":
                 if notify:
@@ -4,12 +4,15 @@ try:
 except:  # we don't enforce langchain as a dependency, so if it's not installed, just move on
     pass
 
-import functools
+import asyncio
+import time
 
-from openai import APIError, RateLimitError, Timeout
-from retry import retry
+from openai import APIError, RateLimitError
+from tenacity import (retry, retry_if_exception_type, stop_after_attempt,
+                      wait_random_exponential)
 
 from pr_agent.algo.ai_handlers.base_ai_handler import BaseAiHandler
+from pr_agent.algo.metrics import get_metrics_registry
 from pr_agent.config_loader import get_settings
 from pr_agent.log import get_logger
 
@@ -25,9 +28,12 @@ class LangChainOpenAIHandler(BaseAiHandler):
         # Create a default unused chat object to trigger early validation
         self._create_chat(self.deployment_id)
 
-    def chat(self, messages: list, model: str, temperature: float):
+    async def chat(self, messages: list, model: str, temperature: float):
         chat = self._create_chat(self.deployment_id)
-        return chat.invoke(input=messages, model=model, temperature=temperature)
+        # use the native async interface, so the event loop is not blocked while waiting for the model.
+        # wait_for cancels the underlying request if the timeout is reached or the caller is cancelled.
+        return await asyncio.wait_for(chat.ainvoke(input=messages, model=model, temperature=temperature),
+                                      timeout=get_settings().config.ai_timeout)
 
     @property
     def deployment_id(self):
@@ -36,18 +42,30 @@ class LangChainOpenAIHandler(BaseAiHandler):
         """
         return get_settings().get("OPENAI.DEPLOYMENT_ID", None)
 
-    @retry(exceptions=(APIError, Timeout, AttributeError, RateLimitError),
-           tries=OPENAI_RETRIES, delay=2, backoff=2, jitter=(1, 3))
-    async def chat_completion(self, model: str, system: str, user: str, temperature: float = 0.2):
+    @retry(
+        retry=retry_if_exception_type((APIError, RateLimitError, asyncio.TimeoutError)),
+        stop=stop_after_attempt(OPENAI_RETRIES),
+        wait=wait_random_exponential(multiplier=2, max=30),
+        reraise=True,
+    )
+    async def chat_completion(self, model: str, system: str, user: str, temperature: float = 0.2, img_path: str = None):
         try:
             messages = [SystemMessage(content=system), HumanMessage(content=user)]
 
             # get a chat completion from the formatted messages
-            resp = self.chat(messages, model=model, temperature=temperature)
+            start_time = time.perf_counter()
+            resp = await self.chat(messages, model=model, temperature=temperature)
             finish_reason = "completed"
+            usage = getattr(resp, "usage_metadata", None) or {}
+            get_metrics_registry().record_call(model=model, latency=time.perf_counter() - start_time,
+                                               finish_reason=(getattr(resp, "response_metadata", None) or {}).get(
+                                                   "finish_reason", finish_reason),
+                                               prompt_tokens=usage.get("input_tokens", 0),
+                                               completion_tokens=usage.get("output_tokens", 0))
             return resp.content, finish_reason
 
         except (Exception) as e:
+            get_metrics_registry().record_error(model, type(e).__name__)
             get_logger().error("Unknown error during OpenAI inference: ", e)
             raise e
 
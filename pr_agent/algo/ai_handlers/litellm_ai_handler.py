@@ -1,4 +1,5 @@
 import os
+import time
 
 import litellm
 import openai
@@ -8,6 +9,7 @@ from tenacity import retry, retry_if_exception_type, stop_after_attempt
 
 from pr_agent.algo import NO_SUPPORT_TEMPERATURE_MODELS, SUPPORT_REASONING_EFFORT_MODELS, USER_MESSAGE_ONLY_MODELS
 from pr_agent.algo.ai_handlers.base_ai_handler import BaseAiHandler
+from pr_agent.algo.metrics import get_metrics_registry
 from pr_agent.algo.utils import ReasoningEffort, get_version
 from pr_agent.config_loader import get_settings
 from pr_agent.log import get_logger
@@ -117,6 +119,20 @@ class LiteLLMAIHandler(BaseAiHandler):
             response_log['main_pr_language'] = 'unknown'
         return response_log
 
+    def record_metrics(self, response, model: str, latency: float, finish_reason: str):
+        try:
+            usage = response.get("usage", None) or {}
+            try:
+                cost = litellm.completion_cost(completion_response=response)
+            except Exception:  # unknown pricing for custom or self-hosted models
+                cost = 0.0
+            get_metrics_registry().record_call(model=model, latency=latency, finish_reason=finish_reason,
+                                               prompt_tokens=usage.get("prompt_tokens", 0),
+                                               completion_tokens=usage.get("completion_tokens", 0),
+                                               cost=cost)
+        except Exception as e:
+            get_logger().debug(f"Failed to record LLM metrics: {e}")
+
     def add_litellm_callbacks(selfs, kwargs) -> dict:
         captured_extra = []
 
@@ -271,22 +287,29 @@ class LiteLLMAIHandler(BaseAiHandler):
                 get_logger().info(f"\nSystem prompt:\n{system}")
                 get_logger().info(f"\nUser prompt:\n{user}")
                 
+            start_time = time.perf_counter()
             response = await acompletion(**kwargs)
+            latency = time.perf_counter() - start_time
         except (openai.APIError, openai.APITimeoutError) as e:
+            get_metrics_registry().record_error(model, type(e).__name__)
             get_logger().warning(f"Error during LLM inference: {e}")
             raise
         except (openai.RateLimitError) as e:
+            get_metrics_registry().record_error(model, type(e).__name__)
             get_logger().error(f"Rate limit error during LLM inference: {e}")
             raise
         except (Exception) as e:
+            get_metrics_registry().record_error(model, type(e).__name__)
             get_logger().warning(f"Unknown error during LLM inference: {e}")
             raise openai.APIError from e
         if response is None or len(response["choices"]) == 0:
+            get_metrics_registry().record_error(model, "EmptyResponse")
             raise openai.APIError
         else:
             resp = response["choices"][0]['message']['content']
             finish_reason = response["choices"][0]["finish_reason"]
             get_logger().debug(f"\nAI response:\n{resp}")
+            self.record_metrics(response, model, latency, finish_reason)
 
             # log the full response for debugging
             response_log = self.prepare_logs(response, system, user, resp, finish_reason)
@@ -1,10 +1,13 @@
+import time
 from os import environ
-from pr_agent.algo.ai_handlers.base_ai_handler import BaseAiHandler
+
 import openai
-from openai import APIError, AsyncOpenAI, RateLimitError, Timeout
-from retry import retry
+from openai import APIError, AsyncOpenAI, RateLimitError
+from tenacity import (retry, retry_if_exception_type, stop_after_attempt,
+                      wait_random_exponential)
 
 from pr_agent.algo.ai_handlers.base_ai_handler import BaseAiHandler
+from pr_agent.algo.metrics import get_metrics_registry
 from pr_agent.config_loader import get_settings
 from pr_agent.log import get_logger
 
@@ -30,6 +33,7 @@ class OpenAIHandler(BaseAiHandler):
 
         except AttributeError as e:
             raise ValueError("OpenAI key is required") from e
+        self._client = None
 
     @property
     def deployment_id(self):
@@ -38,26 +42,46 @@ class OpenAIHandler(BaseAiHandler):
         """
         return get_settings().get("OPENAI.DEPLOYMENT_ID", None)
 
-    @retry(exceptions=(APIError, Timeout, AttributeError, RateLimitError),
-           tries=OPENAI_RETRIES, delay=2, backoff=2, jitter=(1, 3))
-    async def chat_completion(self, model: str, system: str, user: str, temperature: float = 0.2):
+    @property
+    def client(self) -> AsyncOpenAI:
+        """
+        Returns a lazily created async client, shared by all the calls of this handler.
+        Retries are handled by the handler itself, so the client's internal retries are disabled.
+        """
+        if self._client is None:
+            self._client = AsyncOpenAI(timeout=get_settings().config.ai_timeout, max_retries=0)
+        return self._client
+
+    @retry(
+        retry=retry_if_exception_type((APIError, RateLimitError)),
+        stop=stop_after_attempt(OPENAI_RETRIES),
+        wait=wait_random_exponential(multiplier=2, max=30),
+        reraise=True,
+    )
+    async def chat_completion(self, model: str, system: str, user: str, temperature: float = 0.2, img_path: str = None):
         try:
             get_logger().info("System: ", system)
             get_logger().info("User: ", user)
             messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
-            client = AsyncOpenAI()
-            chat_completion = await client.chat.completions.create(
+            start_time = time.perf_counter()
+            chat_completion = await self.client.chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=temperature,
+                timeout=get_settings().config.ai_timeout,
             )
             resp = chat_completion.choices[0].message.content
             finish_reason = chat_completion.choices[0].finish_reason
             usage = chat_completion.usage
+            get_metrics_registry().record_call(model=model, latency=time.perf_counter() - start_time,
+                                               finish_reason=finish_reason,
+                                               prompt_tokens=getattr(usage, "prompt_tokens", 0),
+                                               completion_tokens=getattr(usage, "completion_tokens", 0))
             get_logger().info("AI response", response=resp, messages=messages, finish_reason=finish_reason,
                               model=model, usage=usage)
             return resp, finish_reason
-        except (APIError, Timeout) as e:
+        except APIError as e:
+            get_metrics_registry().record_error(model, type(e).__name__)
             get_logger().error("Error during OpenAI inference: ", e)
             raise
         except (RateLimitError) as e:
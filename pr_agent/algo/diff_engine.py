@@ -0,0 +1,330 @@
+import difflib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pr_agent.log import get_logger
+
+DIFF_CONTEXT_LINES = 3
+# below this number of lines (both versions together), spawning git costs more than diffing in python
+GIT_DIFF_MIN_LINES = 5000
+GIT_DIFF_TIMEOUT_SECONDS = 30
+# past this time, the Myers diff stops looking for the shortest edit script, and replaces the remaining changed
+# regions as a whole (still a valid patch, only larger)
+MYERS_DIFF_TIMEOUT_SECONDS = 5
+
+_RE_UNIFIED_HUNK_HEADER = re.compile(r"^@@ -(\d+)((?:,\d+)?) \+(\d+)((?:,\d+)?) @@")
+_RE_GIT_HUNK_HEADER = re.compile(r"^(@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@).*\n?$", re.DOTALL)
+
+# a diff engine returns the unified diff lines (with the '--- '/'+++ ' header) of two lists of lines, or None when it
+# cannot diff them, in which case the next engine is used
+DiffEngine = Callable[[List[str], List[str], int], Optional[List[str]]]
+
+
+def unified_diff_lines(original_lines: List[str], new_lines: List[str], context: int = DIFF_CONTEXT_LINES) -> List[str]:
+    """
+    A unified diff in the format of 'difflib.unified_diff' (without file names), faster on large files with few
+    changes: the common prefix and suffix of the files are trimmed (keeping 'context' lines), so the quadratic
+    matching only runs on the changed region. The hunk headers are shifted back to the line numbers of the full
+    files. Where several matchings are equally valid (repeated lines), the hunks may differ from difflib's.
+    """
+    common_length = min(len(original_lines), len(new_lines))
+    prefix = 0
+    while prefix < common_length and original_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    if prefix == len(original_lines) == len(new_lines):
+        return []
+    suffix = 0
+    while (suffix < common_length - prefix and
+           original_lines[len(original_lines) - 1 - suffix] == new_lines[len(new_lines) - 1 - suffix]):
+        suffix += 1
+
+    offset = max(0, prefix - context)
+    suffix_trim = max(0, suffix - context)
+    diff = difflib.unified_diff(original_lines[offset:len(original_lines) - suffix_trim],
+                                new_lines[offset:len(new_lines) - suffix_trim], n=context)
+    if not offset:
+        return list(diff)
+
+    def shift(match):
+        return (f"@@ -{int(match.group(1)) + offset}{match.group(2)} "
+                f"+{int(match.group(3)) + offset}{match.group(4)} @@")
+    return [_RE_UNIFIED_HUNK_HEADER.sub(shift, line, count=1) if line.startswith("@@") else line for line in diff]
+
+
+def _myers_bisect(a: List[int], b: List[int], deadline: float) -> Optional[Tuple[int, int]]:
+    """
+    Finds the middle snake of the shortest edit script of 'a' and 'b' (Myers' linear space variant). Returns the
+    point where the script can be split in two, or None when the sequences have nothing in common or the deadline
+    passed.
+    """
+    len_a, len_b = len(a), len(b)
+    max_d = (len_a + len_b + 1) // 2
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v_forward = [-1] * v_length
+    v_backward = [-1] * v_length
+    v_forward[v_offset + 1] = 0
+    v_backward[v_offset + 1] = 0
+    delta = len_a - len_b
+    # if the total number of lines is odd, the forward path collides with the reverse path
+    front = delta % 2 != 0
+    k_forward_start = k_forward_end = k_backward_start = k_backward_end = 0
+    for d in range(max_d):
+        if time.monotonic() > deadline:
+            break
+        for k in range(-d + k_forward_start, d + 1 - k_forward_end, 2):
+            k_index = v_offset + k
+            if k == -d or (k != d and v_forward[k_index - 1] < v_forward[k_index + 1]):
+                x = v_forward[k_index + 1]
+            else:
+                x = v_forward[k_index - 1] + 1
+            y = x - k
+            while x < len_a and y < len_b and a[x] == b[y]:
+                x += 1
+                y += 1
+            v_forward[k_index] = x
+            if x > len_a:
+                k_forward_end += 2
+            elif y > len_b:
+                k_forward_start += 2
+            elif front:
+                k_backward_index = v_offset + delta - k
+                if 0 <= k_backward_index < v_length and v_backward[k_backward_index] != -1:
+                    if x >= len_a - v_backward[k_backward_index]:
+                        return x, y
+        for k in range(-d + k_backward_start, d + 1 - k_backward_end, 2):
+            k_index = v_offset + k
+            if k == -d or (k != d and v_backward[k_index - 1] < v_backward[k_index + 1]):
+                x = v_backward[k_index + 1]
+            else:
+                x = v_backward[k_index - 1] + 1
+            y = x - k
+            while x < len_a and y < len_b and a[len_a - x - 1] == b[len_b - y - 1]:
+                x += 1
+                y += 1
+            v_backward[k_index] = x
+            if x > len_a:
+                k_backward_end += 2
+            elif y > len_b:
+                k_backward_start += 2
+            elif not front:
+                k_forward_index = v_offset + delta - k
+                if 0 <= k_forward_index < v_length and v_forward[k_forward_index] != -1:
+                    x_forward = v_forward[k_forward_index]
+                    if x_forward >= len_a - x:
+                        return x_forward, v_offset + x_forward - k_forward_index
+    return None
+
+
+def myers_matching_blocks(a: List[int], b: List[int],
+                          timeout: float = MYERS_DIFF_TIMEOUT_SECONDS) -> List[Tuple[int, int, int]]:
+    """
+    Returns the matching blocks (i, j, n) of a shortest edit script of 'a' and 'b', in the format of
+    'difflib.SequenceMatcher.get_matching_blocks' (including the final (len(a), len(b), 0) block).
+    """
+    deadline = time.monotonic() + timeout
+    blocks = []
+    # ranges of (a_start, a_end, b_start, b_end) left to diff, in reverse order so blocks come out sorted
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_start, a_end, b_start, b_end = stack.pop()
+        # common prefix and suffix
+        prefix = 0
+        while a_start + prefix < a_end and b_start + prefix < b_end and a[a_start + prefix] == b[b_start + prefix]:
+            prefix += 1
+        suffix = 0
+        while (a_start + prefix < a_end - suffix and b_start + prefix < b_end - suffix and
+               a[a_end - suffix - 1] == b[b_end - suffix - 1]):
+            suffix += 1
+        if prefix:
+            blocks.append((a_start, b_start, prefix))
+        middle = None
+        if a_start + prefix < a_end - suffix and b_start + prefix < b_end - suffix:
+            split = _myers_bisect(a[a_start + prefix:a_end - suffix], b[b_start + prefix:b_end - suffix],
+                                   deadline)
+            if split:
+                x, y = split
+                middle = [(a_start + prefix, a_start + prefix + x, b_start + prefix, b_start + prefix + y),
+                          (a_start + prefix + x, a_end - suffix, b_start + prefix + y, b_end - suffix)]
+        if suffix:
+            # the suffix block is emitted after the middle ranges are diffed
+            stack.append((a_end - suffix, a_end, b_end - suffix, b_end))
+        if middle:
+            stack.extend(reversed(middle))
+
+    # merge adjacent blocks
+    merged = []
+    for i, j, n in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + n)
+        else:
+            merged.append((i, j, n))
+    merged.append((len(a), len(b), 0))
+    return merged
+
+
+def _opcodes_from_blocks(blocks: List[Tuple[int, int, int]]) -> List[Tuple[str, int, int, int, int]]:
+    # same as 'difflib.SequenceMatcher.get_opcodes'
+    i = j = 0
+    opcodes = []
+    for ai, bj, size in blocks:
+        tag = ''
+        if i < ai and j < bj:
+            tag = 'replace'
+        elif i < ai:
+            tag = 'delete'
+        elif j < bj:
+            tag = 'insert'
+        if tag:
+            opcodes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+def _grouped_opcodes(opcodes: list, context: int) -> List[list]:
+    # same as 'difflib.SequenceMatcher.get_grouped_opcodes'
+    codes = list(opcodes) or [("equal", 0, 1, 0, 1)]
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    groups, group = [], []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        groups.append(group)
+    return groups
+
+
+def _format_range_unified(start: int, stop: int) -> str:
+    # same as 'difflib._format_range_unified'
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def myers_diff_lines(original_lines: List[str], new_lines: List[str],
+                     context: int = DIFF_CONTEXT_LINES) -> List[str]:
+    """
+    A unified diff in the format of 'difflib.unified_diff', computed with Myers' O(ND) algorithm - fast when the
+    files are large but the number of changed lines is small, with no super-linear blowup on repetitive content.
+    """
+    line_ids = {}
+    a = [line_ids.setdefault(line, len(line_ids)) for line in original_lines]
+    b = [line_ids.setdefault(line, len(line_ids)) for line in new_lines]
+    groups = _grouped_opcodes(_opcodes_from_blocks(myers_matching_blocks(a, b)), context)
+    if not groups:
+        return []
+    diff = ["--- \n", "+++ \n"]
+    for group in groups:
+        first, last = group[0], group[-1]
+        diff.append(f"@@ -{_format_range_unified(first[1], last[2])} "
+                    f"+{_format_range_unified(first[3], last[4])} @@\n")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                diff.extend(' ' + line for line in original_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                diff.extend('-' + line for line in original_lines[i1:i2])
+            if tag in ('replace', 'insert'):
+                diff.extend('+' + line for line in new_lines[j1:j2])
+    return diff
+
+
+def git_diff_lines(original_lines: List[str], new_lines: List[str],
+                   context: int = DIFF_CONTEXT_LINES) -> Optional[List[str]]:
+    """
+    A unified diff computed by 'git diff --no-index', in the format of 'difflib.unified_diff'. Returns None when git
+    is not available, the files are small (spawning git would cost more than diffing them in python), or git fails.
+    """
+    if len(original_lines) + len(new_lines) < GIT_DIFF_MIN_LINES or not is_git_available():
+        return None
+    try:
+        with tempfile.TemporaryDirectory(prefix="pr_agent_diff_") as tmp_dir:
+            paths = []
+            for name, lines in (("original", original_lines), ("new", new_lines)):
+                path = os.path.join(tmp_dir, name)
+                with open(path, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+                    f.writelines(lines)
+                paths.append(path)
+            result = subprocess.run(["git", "diff", "--no-index", "--no-color", "--no-ext-diff", "--text",
+                                     f"--unified={context}", *paths],
+                                    capture_output=True, timeout=GIT_DIFF_TIMEOUT_SECONDS)
+        # exit code 1 means the files differ
+        if result.returncode not in (0, 1):
+            get_logger().warning(f"git diff failed with exit code {result.returncode}: "
+                                 f"{result.stderr.decode('utf-8', errors='replace')[:500]}")
+            return None
+        output = result.stdout.decode("utf-8", errors="surrogateescape").splitlines(keepends=True)
+    except Exception as e:
+        get_logger().warning(f"git diff failed, error: {e}")
+        return None
+    # drop the git headers ('diff --git', 'index', '--- a/...', '+++ b/...'), up to the first hunk, and the function
+    # context git appends to the hunk headers
+    for i, line in enumerate(output):
+        if line.startswith("@@"):
+            return ["--- \n", "+++ \n"] + [_RE_GIT_HUNK_HEADER.sub(r"\1\n", line) if line.startswith("@@") else line
+                                           for line in output[i:]]
+    return []
+
+
+_git_available = None
+
+
+def is_git_available() -> bool:
+    global _git_available
+    if _git_available is None:
+        _git_available = shutil.which("git") is not None
+    return _git_available
+
+
+def _difflib_diff_lines(original_lines: List[str], new_lines: List[str], context: int) -> List[str]:
+    return unified_diff_lines(original_lines, new_lines, context)
+
+
+_DIFF_ENGINES: Dict[str, DiffEngine] = {
+    "git": git_diff_lines,
+    "myers": myers_diff_lines,
+    "difflib": _difflib_diff_lines,
+}
+# 'auto' tries git on large files, and falls back to the pure python Myers diff
+_DIFF_ENGINES_ORDER = {"auto": ["git", "myers"], "git": ["git", "myers"], "myers": ["myers"], "difflib": ["difflib"]}
+
+
+def register_diff_engine(name: str, engine: DiffEngine):
+    """
+    Registers a diff engine, selectable with 'config.diff_engine'. When it returns None, the Myers diff is used.
+    """
+    _DIFF_ENGINES[name] = engine
+    _DIFF_ENGINES_ORDER[name] = [name, "myers"]
+
+
+def diff_lines(original_lines: List[str], new_lines: List[str], engine: str = "auto",
+               context: int = DIFF_CONTEXT_LINES) -> List[str]:
+    """
+    Returns the unified diff lines of two versions of a file, computed by the given diff engine (see
+    '_DIFF_ENGINES_ORDER'). Unknown engines fall back to 'auto'.
+    """
+    for name in _DIFF_ENGINES_ORDER.get(engine, _DIFF_ENGINES_ORDER["auto"]):
+        diff = _DIFF_ENGINES[name](original_lines, new_lines, context)
+        if diff is not None:
+            return diff
+    return unified_diff_lines(original_lines, new_lines, context)
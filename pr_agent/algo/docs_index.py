@@ -0,0 +1,193 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from pr_agent.log import get_logger
+
+DOCS_FOLDERS_TO_EXCLUDE = ['/finetuning_benchmark/']
+DOCS_FILES_TO_EXCLUDE = {'EXAMPLE_BEST_PRACTICE.md', 'compression_strategy.md', '/docs/overview/index.md'}
+# files of the main tools and of the usage guide come first in the prompt, and get a higher relevance score
+DOCS_PRIORITY_PATHS = ['/docs/index.md', '/usage-guide', 'tools/describe.md', 'tools/review.md', 'tools/improve.md',
+                       '/faq']
+PRIORITY_SCORE_BOOST = 1.2
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_HEADER_RE = re.compile(r"^(#{1,3})\s+\S")
+_TERM_RE = re.compile(r"[a-z0-9_]+")
+
+
+@dataclass
+class DocSection:
+    file_path: str  # relative to the docs folder, e.g. '/tools/review.md'
+    header: str  # the markdown header line of the section, or '' for the text before the first header
+    text: str
+    priority: bool
+    tokens: int = 0
+
+
+def split_markdown_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Splits a markdown document into (header, text) sections at level 1-3 headers (outside code blocks).
+    The text of each section starts with its header line.
+    """
+    sections = []
+    header, lines = "", []
+    in_code_block = False
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code_block = not in_code_block
+        if not in_code_block and _HEADER_RE.match(line):
+            if "\n".join(lines).strip():
+                sections.append((header, "\n".join(lines).strip()))
+            header, lines = line.strip(), []
+        lines.append(line)
+    if "\n".join(lines).strip():
+        sections.append((header, "\n".join(lines).strip()))
+    return sections
+
+
+def _terms(text: str) -> List[str]:
+    return _TERM_RE.findall(text.lower())
+
+
+class DocsIndex:
+    """
+    An index of the sections of the documentation website, ranked against a question with BM25.
+    """
+
+    def __init__(self, sections: List[DocSection]):
+        self.sections = sections
+        self._terms_counts = []
+        self._lengths = []
+        document_frequency = Counter()
+        for section in sections:
+            # header terms count twice, since a matching header is a strong hint
+            terms = _terms(section.text) + _terms(section.header)
+            counts = Counter(terms)
+            self._terms_counts.append(counts)
+            self._lengths.append(len(terms))
+            document_frequency.update(counts.keys())
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        num_sections = len(sections)
+        self._idf = {term: math.log(1 + (num_sections - df + 0.5) / (df + 0.5))
+                     for term, df in document_frequency.items()}
+
+    @classmethod
+    def from_docs_folder(cls, docs_path: Path) -> "DocsIndex":
+        md_files = list(docs_path.glob('**/*.md'))
+        md_files = [file for file in md_files if not any(folder in str(file) for folder in DOCS_FOLDERS_TO_EXCLUDE)
+                    and file.name not in DOCS_FILES_TO_EXCLUDE]
+        # sort the files so that the priority files will be at the top
+        is_priority = {file: any(priority_path in str(file) for priority_path in DOCS_PRIORITY_PATHS)
+                       for file in md_files}
+        md_files = sorted(md_files, key=lambda file: not is_priority[file])
+
+        sections = []
+        for file in md_files:
+            try:
+                text = file.read_text(encoding='utf-8')
+            except Exception as e:
+                get_logger().error(f"Error while reading the file {file}: {e}")
+                continue
+            file_path = str(file).replace(str(docs_path), '')
+            sections.extend(DocSection(file_path, header, section_text, is_priority[file])
+                            for header, section_text in split_markdown_sections(text))
+        return cls(sections)
+
+    def count_tokens(self, token_handler):
+        counts = token_handler.count_tokens_batch([self.format_sections([section]) for section in self.sections])
+        for section, tokens in zip(self.sections, counts):
+            section.tokens = tokens
+
+    def search(self, question: str) -> List[Tuple[int, float]]:
+        """
+        Returns (section index, score) pairs of the sections that match the question, from the most relevant.
+        """
+        query_terms = set(_terms(question))
+        results = []
+        for i, counts in enumerate(self._terms_counts):
+            score = 0.0
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[i] / (self._average_length or 1))
+            for term in query_terms:
+                tf = counts.get(term, 0)
+                if tf:
+                    score += self._idf[term] * tf * (BM25_K1 + 1) / (tf + length_norm)
+            if score > 0:
+                if self.sections[i].priority:
+                    score *= PRIORITY_SCORE_BOOST
+                results.append((i, score))
+        results.sort(key=lambda result: result[1], reverse=True)
+        return results
+
+    def select_sections(self, question: str, max_tokens: int, max_sections: int) -> List[DocSection]:
+        """
+        Returns the most relevant sections to the question (up to 'max_sections') that fit together in 'max_tokens',
+        in documentation order.
+        """
+        selected, total_tokens = [], 0
+        for i, _ in self.search(question):
+            if len(selected) >= max_sections:
+                break
+            if total_tokens + self.sections[i].tokens > max_tokens:
+                continue
+            selected.append(i)
+            total_tokens += self.sections[i].tokens
+        return [self.sections[i] for i in sorted(selected)]
+
+    def select_leading_sections(self, max_tokens: int) -> List[DocSection]:
+        """
+        Returns the first sections of the documentation (priority files first) that fit together in 'max_tokens', as
+        the whole documentation website clipped to the model. Used when no section matches the question.
+        """
+        selected, total_tokens = [], 0
+        for section in self.sections:
+            if total_tokens + section.tokens > max_tokens:
+                break
+            selected.append(section)
+            total_tokens += section.tokens
+        return selected
+
+    @staticmethod
+    def format_sections(sections: List[DocSection]) -> str:
+        """
+        Formats sections for the help prompt. Consecutive sections of the same file are listed under one file name.
+        """
+        docs_prompt = ""
+        for i, section in enumerate(sections):
+            if i == 0 or sections[i - 1].file_path != section.file_path:
+                if i > 0:
+                    docs_prompt += "\n=========\n\n"
+                docs_prompt += f"\n==file name==\n\n{section.file_path}\n\n==file content==\n\n"
+            else:
+                docs_prompt += "\n\n"
+            docs_prompt += section.text
+        if sections:
+            docs_prompt += "\n=========\n\n"
+        return docs_prompt
+
+
+_docs_indices: Dict[Tuple[str, str], Tuple[tuple, DocsIndex]] = {}
+_docs_indices_lock = Lock()
+
+
+def get_docs_index(docs_path: Path, token_handler, model: str) -> DocsIndex:
+    """
+    Returns the index of the documentation folder, built on first use and rebuilt only when a file changed.
+    Section token counts are computed with 'token_handler', once per model.
+    """
+    signature = tuple(sorted((str(file), file.stat().st_mtime_ns, file.stat().st_size)
+                             for file in docs_path.glob('**/*.md')))
+    key = (str(docs_path), model)
+    with _docs_indices_lock:
+        cached = _docs_indices.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+        docs_index = DocsIndex.from_docs_folder(docs_path)
+        docs_index.count_tokens(token_handler)
+        _docs_indices[key] = (signature, docs_index)
+        return docs_index
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from pr_agent.log import get_logger
+
+
+class LocalVectorStore:
+    """
+    A flat vector index persisted in a local folder, for cosine-similarity search without a vector database service.
+
+    The folder holds:
+    - vectors.npy: the normalized float32 vectors, one row per record (memory-mapped on load).
+    - records.json: the id, metadata and text hash of each row.
+    - state.json: free-form sync state per key (e.g. the last indexed issue 'updated_at' per repo).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._records: List[dict] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._state: Dict[str, dict] = {}
+        self._load()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        try:
+            with open(self._file("records.json"), "r", encoding="utf-8") as f:
+                records = json.load(f)
+            vectors = np.load(self._file("vectors.npy"), mmap_mode="r")
+            if len(records) != vectors.shape[0]:
+                raise ValueError(f"{len(records)} records but {vectors.shape[0]} vectors")
+            self._records, self._vectors = records, vectors
+            self._rows = {record["id"]: row for row, record in enumerate(records)}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            get_logger().warning(f"Failed to load the local vector store at {self.path}, starting empty, error: {e}")
+            self._records, self._rows, self._vectors = [], {}, None
+        try:
+            with open(self._file("state.json"), "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            get_logger().warning(f"Failed to load the sync state at {self.path}, error: {e}")
+
+    def get_text_hashes(self, ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Bulk lookup of the stored ids among 'ids'. Returns the text hash of each id that exists.
+        """
+        return {record_id: self._records[self._rows[record_id]].get("text_hash", "")
+                for record_id in ids if record_id in self._rows}
+
+    def get_sync_state(self, key: str) -> dict:
+        return dict(self._state.get(key, {}))
+
+    def upsert(self, records: List[dict], vectors: List[List[float]], sync_state: Dict[str, dict] = None):
+        """
+        Adds or replaces records (dicts with 'id', 'metadata' and optionally 'text_hash') with their vectors, updates
+        the sync state, and persists the store.
+        """
+        with self._lock:
+            if not records:
+                if sync_state:
+                    self._state.update(sync_state)
+                    self._save()
+                return
+            new_vectors = np.asarray(vectors, dtype=np.float32).reshape(len(records), -1)
+            norms = np.linalg.norm(new_vectors, axis=1, keepdims=True)
+            new_vectors = new_vectors / np.where(norms == 0, 1, norms)
+            if self._vectors is None or not len(self._records):
+                all_vectors = np.empty((0, new_vectors.shape[1]), dtype=np.float32)
+            else:
+                all_vectors = np.array(self._vectors)  # copy of the memory-mapped vectors
+            if all_vectors.shape[1] != new_vectors.shape[1]:
+                raise ValueError(f"Vector dimension {new_vectors.shape[1]} does not match the store "
+                                 f"dimension {all_vectors.shape[1]}")
+            appended_vectors = []
+            for record, vector in zip(records, new_vectors):
+                row = self._rows.get(record["id"])
+                if row is None:
+                    self._rows[record["id"]] = len(self._records)
+                    self._records.append(record)
+                    appended_vectors.append(vector)
+                elif row >= all_vectors.shape[0]:  # appended earlier in this call
+                    self._records[row] = record
+                    appended_vectors[row - all_vectors.shape[0]] = vector
+                else:
+                    self._records[row] = record
+                    all_vectors[row] = vector
+            if appended_vectors:
+                all_vectors = np.vstack([all_vectors, np.stack(appended_vectors)])
+            self._vectors = all_vectors
+            if sync_state:
+                self._state.update(sync_state)
+            self._save()
+
+    def query(self, vector: List[float], top_k: int = 5, metadata_filter: dict = None) -> List[dict]:
+        """
+        Returns the 'top_k' records most similar to 'vector' (cosine similarity), as dicts with 'id', 'score' and
+        'metadata'. Only records whose metadata matches all the items of 'metadata_filter' are considered.
+        """
+        if self._vectors is None or not len(self._records):
+            return []
+        query_vector = np.asarray(vector, dtype=np.float32)
+        query_vector = query_vector / (np.linalg.norm(query_vector) or 1)
+        scores = np.asarray(self._vectors @ query_vector)
+        if metadata_filter:
+            mask = np.array([all(record["metadata"].get(key) == value for key, value in metadata_filter.items())
+                             for record in self._records])
+            scores = np.where(mask, scores, -np.inf)
+        top_k = min(top_k, len(scores))
+        top_rows = np.argpartition(-scores, top_k - 1)[:top_k]
+        top_rows = top_rows[np.argsort(-scores[top_rows])]
+        return [{"id": self._records[row]["id"], "score": float(scores[row]), "metadata": self._records[row]["metadata"]}
+                for row in top_rows if np.isfinite(scores[row])]
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        # write each file to a temporary file first, so readers never see a partial store
+        if self._vectors is not None:
+            self._write(self._file("vectors.npy"), lambda f: np.save(f, self._vectors), binary=True)
+            self._write(self._file("records.json"), lambda f: json.dump(self._records, f, ensure_ascii=False))
+            self._vectors = np.load(self._file("vectors.npy"), mmap_mode="r")
+        self._write(self._file("state.json"), lambda f: json.dump(self._state, f))
+
+    def _write(self, path: str, write_fn, binary: bool = False):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb" if binary else "w", **({} if binary else {"encoding": "utf-8"})) as f:
+                write_fn(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,177 @@
+"""
+In-process registry of LLM call metrics.
+
+Every chat completion records its latency, token usage, cost, finish reason and errors, tagged by the running
+command (review, describe, improve, ...) and by the model. The registry can be rendered as Prometheus text
+(served on the '/metrics' route of the webhook servers) or as a JSON summary (printed at the end of a CLI run).
+Metrics are kept per process - with several gunicorn/uvicorn workers, each worker exposes its own values.
+"""
+import bisect
+import contextlib
+import json
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Iterable, List, Tuple
+
+LATENCY_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+_current_command: ContextVar[str] = ContextVar("pr_agent_metrics_command", default="unknown")
+
+
+@contextlib.contextmanager
+def metrics_command(command: str):
+    """
+    Tags all the LLM calls made inside the block with the given command.
+    """
+    token = _current_command.set(command)
+    try:
+        yield
+    finally:
+        _current_command.reset(token)
+
+
+def get_metrics_command() -> str:
+    return _current_command.get()
+
+
+class Counter:
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def prometheus_lines(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{{{_format_labels(self.label_names, labels)}}} {_format_value(value)}")
+        return lines
+
+    def summary(self) -> Dict[str, float]:
+        return {"/".join(labels): value for labels, value in sorted(self.values.items())}
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts (non-cumulative, last one is +Inf), sum, count, max]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            self.values[labels] = entry
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+        entry[3] = max(entry[3], value)
+
+    def prometheus_lines(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count, _) in sorted(self.values.items()):
+            label_str = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f'{self.name}_bucket{{{label_str},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_str}}} {_format_value(total)}")
+            lines.append(f"{self.name}_count{{{label_str}}} {count}")
+        return lines
+
+    def summary(self) -> Dict[str, dict]:
+        return {"/".join(labels): {"count": count, "sum": round(total, 6), "avg": round(total / count, 6),
+                                   "max": round(max_value, 6)}
+                for labels, (_, total, count, max_value) in sorted(self.values.items()) if count}
+
+
+class MetricsRegistry:
+    """
+    A minimal, thread-safe registry of the LLM metrics, without a dependency on prometheus_client.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        labels = ("command", "model")
+        self.requests = Counter("pr_agent_llm_requests_total", "Completed LLM calls",
+                                labels + ("finish_reason",))
+        self.errors = Counter("pr_agent_llm_errors_total", "Failed LLM calls (each retry attempt counts)",
+                              labels + ("error",))
+        self.fallbacks = Counter("pr_agent_llm_fallbacks_total", "Times a model failed and the next fallback model"
+                                                                 " was tried", labels)
+        self.prompt_tokens = Counter("pr_agent_llm_prompt_tokens_total", "Prompt tokens sent to the LLM", labels)
+        self.completion_tokens = Counter("pr_agent_llm_completion_tokens_total", "Completion tokens returned by the"
+                                                                                 " LLM", labels)
+        self.cost = Counter("pr_agent_llm_cost_usd_total", "Estimated LLM cost in USD", labels)
+        self.latency = Histogram("pr_agent_llm_request_duration_seconds", "Total latency of an LLM call",
+                                 labels, LATENCY_BUCKETS)
+        self.prompt_tokens_per_call = Histogram("pr_agent_llm_prompt_tokens", "Prompt tokens per LLM call",
+                                                labels, TOKEN_BUCKETS)
+        self._metrics = [self.requests, self.errors, self.fallbacks, self.prompt_tokens, self.completion_tokens,
+                         self.cost, self.latency, self.prompt_tokens_per_call]
+
+    def record_call(self, model: str, latency: float, finish_reason: str = None, prompt_tokens: int = 0,
+                    completion_tokens: int = 0, cost: float = 0.0, command: str = None):
+        labels = (command or get_metrics_command(), model)
+        with self._lock:
+            self.requests.inc(labels + (str(finish_reason),))
+            self.latency.observe(labels, latency)
+            self.prompt_tokens.inc(labels, prompt_tokens or 0)
+            self.completion_tokens.inc(labels, completion_tokens or 0)
+            self.prompt_tokens_per_call.observe(labels, prompt_tokens or 0)
+            if cost:
+                self.cost.inc(labels, cost)
+
+    def record_error(self, model: str, error: str, command: str = None):
+        with self._lock:
+            self.errors.inc((command or get_metrics_command(), model, error))
+
+    def record_fallback(self, model: str, command: str = None):
+        with self._lock:
+            self.fallbacks.inc((command or get_metrics_command(), model))
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            lines = []
+            for metric in self._metrics:
+                lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {metric.name: metric.summary() for metric in self._metrics if metric.values}
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def reset(self):
+        with self._lock:
+            for metric in self._metrics:
+                metric.values.clear()
+
+
+def _format_labels(label_names: Tuple[str, ...], labels: Tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(label_names, labels))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
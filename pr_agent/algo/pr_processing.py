@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import contextvars
+import math
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, List, Tuple
 
 from github import RateLimitExceededException
@@ -9,7 +12,8 @@ from pr_agent.algo.file_filter import filter_ignored
 from pr_agent.algo.git_patch_processing import (
     convert_to_hunks_with_lines_numbers, extend_patch, handle_patch_deletions)
 from pr_agent.algo.language_handler import sort_files_by_main_languages
-from pr_agent.algo.token_handler import TokenHandler
+from pr_agent.algo.metrics import get_metrics_registry
+from pr_agent.algo.token_handler import TOKEN_ESTIMATE_MAX_OVERESTIMATE, TokenHandler
 from pr_agent.algo.types import EDIT_TYPE, FilePatchInfo
 from pr_agent.algo.utils import ModelType, clip_tokens, get_max_tokens, get_weak_model
 from pr_agent.config_loader import get_settings
@@ -25,6 +29,7 @@ ADDED_FILES_ = "Additional added files (insufficient token budget to process):\n
 OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD = 1500
 OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD = 1000
 MAX_EXTRA_LINES = 10
+MAX_PARALLEL_FILE_CONTENT_LOADS = 8
 
 
 def cap_and_log_extra_lines(value, direction) -> int:
@@ -39,7 +44,10 @@ def get_pr_diff(git_provider: GitProvider, token_handler: TokenHandler,
                 add_line_numbers_to_hunks: bool = False,
                 disable_extra_lines: bool = False,
                 large_pr_handling=False,
-                return_remaining_files=False):
+                return_remaining_files=False,
+                only_files: set = None):
+    # the tokens are counted for the model of this call, which may be a fallback model
+    token_handler = token_handler.for_model(model)
     if disable_extra_lines:
         PATCH_EXTRA_LINES_BEFORE = 0
         PATCH_EXTRA_LINES_AFTER = 0
@@ -65,6 +73,9 @@ def get_pr_diff(git_provider: GitProvider, token_handler: TokenHandler,
         except Exception as e:
             pass
 
+    if only_files is not None:
+        diff_files = [file for file in diff_files if file.filename in only_files]
+
 
     # get pr languages
     pr_languages = sort_files_by_main_languages(git_provider.get_languages(), diff_files)
@@ -77,7 +88,8 @@ def get_pr_diff(git_provider: GitProvider, token_handler: TokenHandler,
     # generate a standard diff string, with patch extension
     patches_extended, total_tokens, patches_extended_tokens = pr_generate_extended_diff(
         pr_languages, token_handler, add_line_numbers_to_hunks,
-        patch_extra_lines_before=PATCH_EXTRA_LINES_BEFORE, patch_extra_lines_after=PATCH_EXTRA_LINES_AFTER)
+        patch_extra_lines_before=PATCH_EXTRA_LINES_BEFORE, patch_extra_lines_after=PATCH_EXTRA_LINES_AFTER,
+        max_tokens=get_max_tokens(model) - OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD)
 
     # if we are under the limit, return the full diff
     if total_tokens + OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD < get_max_tokens(model):
@@ -153,7 +165,8 @@ def get_pr_diff(git_provider: GitProvider, token_handler: TokenHandler,
 
 
 def get_pr_diff_multiple_patchs(git_provider: GitProvider, token_handler: TokenHandler, model: str,
-                add_line_numbers_to_hunks: bool = False, disable_extra_lines: bool = False):
+                add_line_numbers_to_hunks: bool = False, disable_extra_lines: bool = False, max_calls: int = None):
+    token_handler = token_handler.for_model(model)
     try:
         diff_files_original = git_provider.get_diff_files()
     except RateLimitExceededException as e:
@@ -179,26 +192,62 @@ def get_pr_diff_multiple_patchs(git_provider: GitProvider, token_handler: TokenH
             pass
 
     patches_compressed_list, total_tokens_list, deleted_files_list, remaining_files_list, file_dict, files_in_patches_list = \
-        pr_generate_compressed_diff(pr_languages, token_handler, model, add_line_numbers_to_hunks, large_pr_handling=True)
+        pr_generate_compressed_diff(pr_languages, token_handler, model, add_line_numbers_to_hunks, large_pr_handling=True,
+                                    max_calls=max_calls)
 
     return patches_compressed_list, total_tokens_list, deleted_files_list, remaining_files_list, file_dict, files_in_patches_list
 
 
+def load_files_content(files: List[FilePatchInfo], max_workers: int = MAX_PARALLEL_FILE_CONTENT_LOADS):
+    """
+    Loads the lazy 'base_file' and 'head_file' content of the files concurrently, instead of one at a time when the
+    content is first read.
+    """
+    pending = [(file, version) for file in files if isinstance(file, FilePatchInfo)
+               for version in ('base', 'head') if not file.is_content_loaded(version)]
+    if not pending:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+        # each load runs in a copy of the current context, so the providers see the request settings
+        futures = [executor.submit(contextvars.copy_context().run, getattr, file, f'{version}_file')
+                   for file, version in pending]
+        for future in futures:
+            future.result()
+
+
+def _new_content_for_deletion_check(file: FilePatchInfo) -> str:
+    # 'handle_patch_deletions' only reads the new content of files that may have been deleted
+    if file.edit_type in (EDIT_TYPE.DELETED, EDIT_TYPE.UNKNOWN):
+        return file.head_file
+    return ""
+
+
 def pr_generate_extended_diff(pr_languages: list,
                               token_handler: TokenHandler,
                               add_line_numbers_to_hunks: bool,
                               patch_extra_lines_before: int = 0,
-                              patch_extra_lines_after: int = 0) -> Tuple[list, int, list]:
+                              patch_extra_lines_after: int = 0,
+                              max_tokens: int = None) -> Tuple[list, int, list]:
+    """
+    Generates the extended patches of all the files, and counts their tokens.
+    If 'max_tokens' is given and the estimated total is far above it, the exact token count is skipped and the
+    estimates are returned instead - the caller is going to fall back to the compressed diff anyway.
+    """
     total_tokens = token_handler.prompt_tokens  # initial tokens
     patches_extended = []
     patches_extended_tokens = []
+    patched_files = []
+    # the full content of the files is only needed to add context lines to the patches
+    use_files_content = patch_extra_lines_before > 0 or patch_extra_lines_after > 0
+    if use_files_content:
+        load_files_content([file for lang in pr_languages for file in lang['files'] if file.patch])
     for lang in pr_languages:
         for file in lang['files']:
-            original_file_content_str = file.base_file
-            new_file_content_str = file.head_file
             patch = file.patch
             if not patch:
                 continue
+            original_file_content_str = file.base_file if use_files_content else ""
+            new_file_content_str = file.head_file if use_files_content else ""
 
             # extend each patch with extra lines of context
             extended_patch = extend_patch(original_file_content_str, patch,
@@ -217,18 +266,36 @@ def pr_generate_extended_diff(pr_languages: list,
             if file.ai_file_summary and get_settings().get("config.enable_ai_metadata", False):
                 full_extended_patch = add_ai_summary_top_patch(file, full_extended_patch)
 
-            patch_tokens = token_handler.count_tokens(full_extended_patch)
-            file.tokens = patch_tokens
-            total_tokens += patch_tokens
-            patches_extended_tokens.append(patch_tokens)
             patches_extended.append(full_extended_patch)
+            patched_files.append(file)
+
+    if max_tokens is not None:
+        estimated_tokens = token_handler.estimate_tokens_batch(patches_extended,
+                                                               [file.filename for file in patched_files])
+        estimated_total_tokens = total_tokens + sum(estimated_tokens)
+        if estimated_total_tokens > max_tokens * (1 + TOKEN_ESTIMATE_MAX_OVERESTIMATE):
+            get_logger().info(f"Estimated tokens: {estimated_total_tokens}, far above the limit: {max_tokens}, "
+                              f"skipping exact token count of the extended diff.")
+            for file, patch_tokens in zip(patched_files, estimated_tokens):
+                file.tokens = patch_tokens
+            return patches_extended, estimated_total_tokens, estimated_tokens
+
+    for file, patch_tokens in zip(patched_files, token_handler.count_tokens_batch(patches_extended)):
+        file.tokens = patch_tokens
+        total_tokens += patch_tokens
+        patches_extended_tokens.append(patch_tokens)
 
     return patches_extended, total_tokens, patches_extended_tokens
 
 
 def pr_generate_compressed_diff(top_langs: list, token_handler: TokenHandler, model: str,
                                 convert_hunks_to_line_numbers: bool,
-                                large_pr_handling: bool) -> Tuple[list, list, list, list, dict, list]:
+                                large_pr_handling: bool,
+                                max_calls: int = None) -> Tuple[list, list, list, list, dict, list]:
+    """
+    Generates compressed patches, packed into groups that fit the model. In large PR handling mode, up to 'max_calls'
+    groups are generated (by default, 'pr_description.max_ai_calls' - 1).
+    """
     deleted_files_list = []
 
     # sort each one of the languages in top_langs by the number of tokens in the diff
@@ -236,18 +303,16 @@ def pr_generate_compressed_diff(top_langs: list, token_handler: TokenHandler, mo
     for lang in top_langs:
         sorted_files.extend(sorted(lang['files'], key=lambda x: x.tokens, reverse=True))
 
-    # generate patches for each file, and count tokens
+    # generate patches for each file
     file_dict = {}
     for file in sorted_files:
-        original_file_content_str = file.base_file
-        new_file_content_str = file.head_file
         patch = file.patch
         if not patch:
             continue
 
         # removing delete-only hunks
-        patch = handle_patch_deletions(patch, original_file_content_str,
-                                       new_file_content_str, file.filename, file.edit_type)
+        patch = handle_patch_deletions(patch, "", _new_content_for_deletion_check(file), file.filename,
+                                       file.edit_type)
         if patch is None:
             if file.filename not in deleted_files_list:
                 deleted_files_list.append(file.filename)
@@ -260,80 +325,103 @@ def pr_generate_compressed_diff(top_langs: list, token_handler: TokenHandler, mo
         # if file.ai_file_summary and get_settings().config.get('config.is_auto_command', False):
         #     patch = add_ai_summary_top_patch(file, patch)
 
-        new_patch_tokens = token_handler.count_tokens(patch)
-        file_dict[file.filename] = {'patch': patch, 'tokens': new_patch_tokens, 'edit_type': file.edit_type}
+        file_dict[file.filename] = {'patch': patch, 'tokens': 0, 'edit_type': file.edit_type}
+
+    # count the tokens of all the patches in one batch
+    patches_tokens = token_handler.count_tokens_batch([data['patch'] for data in file_dict.values()])
+    for data, new_patch_tokens in zip(file_dict.values(), patches_tokens):
+        data['tokens'] = new_patch_tokens
 
     max_tokens_model = get_max_tokens(model)
 
-    # first iteration
-    files_in_patches_list = []
-    remaining_files_list =  [file.filename for file in sorted_files]
-    patches_list =[]
-    total_tokens_list = []
-    total_tokens, patches, remaining_files_list, files_in_patch_list = generate_full_patch(convert_hunks_to_line_numbers, file_dict,
-                                       max_tokens_model, remaining_files_list, token_handler)
-    patches_list.append(patches)
-    total_tokens_list.append(total_tokens)
-    files_in_patches_list.append(files_in_patch_list)
-
-    # additional iterations (if needed)
+    # pack all the patch groups in a single pass (additional groups only in large PR handling mode)
+    max_groups = 1
     if large_pr_handling:
-        NUMBER_OF_ALLOWED_ITERATIONS = get_settings().pr_description.max_ai_calls - 1 # one more call is to summarize
-        for i in range(NUMBER_OF_ALLOWED_ITERATIONS-1):
-            if remaining_files_list:
-                total_tokens, patches, remaining_files_list, files_in_patch_list = generate_full_patch(convert_hunks_to_line_numbers,
-                                                                                 file_dict,
-                                                                                  max_tokens_model,
-                                                                                  remaining_files_list, token_handler)
-                if patches:
-                    patches_list.append(patches)
-                    total_tokens_list.append(total_tokens)
-                    files_in_patches_list.append(files_in_patch_list)
-            else:
-                break
+        if max_calls is None:
+            max_calls = get_settings().pr_description.max_ai_calls - 1 # one more call is to summarize
+        max_groups = max(max_calls, 1)
+    remaining_files_list = [file.filename for file in sorted_files]
+    total_tokens_list, patches_list, remaining_files_list, files_in_patches_list = generate_full_patches(
+        convert_hunks_to_line_numbers, file_dict, max_tokens_model, remaining_files_list, token_handler, max_groups)
 
     return patches_list, total_tokens_list, deleted_files_list, remaining_files_list, file_dict, files_in_patches_list
 
 
 def generate_full_patch(convert_hunks_to_line_numbers, file_dict, max_tokens_model,remaining_files_list_prev, token_handler):
-    total_tokens = token_handler.prompt_tokens # initial tokens
-    patches = []
-    remaining_files_list_new = []
-    files_in_patch_list = []
-    for filename, data in file_dict.items():
-        if filename not in remaining_files_list_prev:
-            continue
+    total_tokens_list, patches_list, remaining_files_list_new, files_in_patches_list = generate_full_patches(
+        convert_hunks_to_line_numbers, file_dict, max_tokens_model, remaining_files_list_prev, token_handler,
+        max_groups=1)
+    return total_tokens_list[0], patches_list[0], remaining_files_list_new, files_in_patches_list[0]
 
-        patch = data['patch']
-        new_patch_tokens = data['tokens']
-        edit_type = data['edit_type']
 
-        # Hard Stop, no more tokens
-        if total_tokens > max_tokens_model - OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD:
-            get_logger().warning(f"File was fully skipped, no more tokens: {filename}.")
-            continue
+def generate_full_patches(convert_hunks_to_line_numbers, file_dict, max_tokens_model, remaining_files_list_prev,
+                          token_handler, max_groups: int = 1) -> Tuple[list, list, list, list]:
+    """
+    Packs the patches of the files in 'remaining_files_list_prev' into up to 'max_groups' groups that fit the model,
+    in a single pass. Files are visited in 'file_dict' order (by main language, then by decreasing size), and each one
+    goes to the first group with enough room for it (first-fit). Files that fit no group are returned as remaining.
 
-        # If the patch is too large, just show the file name
-        if total_tokens + new_patch_tokens > max_tokens_model - OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD:
+    Returns:
+        total_tokens_list, patches_list, remaining_files_list_new, files_in_patches_list - one entry per group in the
+        lists, where only the first group may be empty.
+    """
+    hard_limit = max_tokens_model - OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD
+    soft_limit = max_tokens_model - OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD
+    remaining_files_set_prev = set(remaining_files_list_prev)
+    candidates = []
+    for filename, data in file_dict.items():
+        if filename not in remaining_files_set_prev:
+            continue
+        patch = data['patch']
+        patch_final = ""
+        if data['tokens'] > soft_limit - token_handler.prompt_tokens:
+            patch_final = None # too large even for an empty group
+        elif patch:
+            if not convert_hunks_to_line_numbers:
+                patch_final = f"\n\n## File: '{filename.strip()}'\n\n{patch.strip()}\n"
+            else:
+                patch_final = "\n\n" + patch.strip()
+        candidates.append((filename, patch_final, data['tokens']))
+    # count the tokens of all the patches that may be added in one batch
+    patches_final_tokens = iter(token_handler.count_tokens_batch([patch_final for _, patch_final, _ in candidates
+                                                                  if patch_final]))
+
+    total_tokens_list = [token_handler.prompt_tokens] * max_groups # initial tokens
+    patches_list = [[] for _ in range(max_groups)]
+    files_in_patches_list = [[] for _ in range(max_groups)]
+    remaining_files_list_new = []
+    first_open_group = 0
+    verbosity_level = get_settings().config.verbosity_level
+    for filename, patch_final, new_patch_tokens in candidates:
+        patch_final_tokens = next(patches_final_tokens) if patch_final else 0
+        for i in range(first_open_group if patch_final is not None else max_groups, max_groups):
+            # Hard Stop, no more tokens in this group
+            if total_tokens_list[i] > hard_limit:
+                if i == first_open_group:
+                    first_open_group += 1
+                continue
+            # If the patch is too large for this group, try the next one
+            if total_tokens_list[i] + new_patch_tokens > soft_limit:
+                continue
+            if patch_final:
+                patches_list[i].append(patch_final)
+                total_tokens_list[i] += patch_final_tokens
+                files_in_patches_list[i].append(filename)
+                if verbosity_level >= 2:
+                    get_logger().info(f"Tokens: {total_tokens_list[i]}, group: {i + 1}, last filename: {filename}")
+            break
+        else:
             # Current logic is to skip the patch if it's too large
             # TODO: Option for alternative logic to remove hunks from the patch to reduce the number of tokens
             #  until we meet the requirements
-            if get_settings().config.verbosity_level >= 2:
+            if verbosity_level >= 2:
                 get_logger().warning(f"Patch too large, skipping it: '{filename}'")
             remaining_files_list_new.append(filename)
-            continue
 
-        if patch:
-            if not convert_hunks_to_line_numbers:
-                patch_final = f"\n\n## File: '{filename.strip()}'\n\n{patch.strip()}\n"
-            else:
-                patch_final = "\n\n" + patch.strip()
-            patches.append(patch_final)
-            total_tokens += token_handler.count_tokens(patch_final)
-            files_in_patch_list.append(filename)
-            if get_settings().config.verbosity_level >= 2:
-                get_logger().info(f"Tokens: {total_tokens}, last filename: {filename}")
-    return total_tokens, patches, remaining_files_list_new, files_in_patch_list
+    # drop empty additional groups (groups are filled in order, so the non-empty groups are a prefix)
+    num_groups = max([1] + [i + 1 for i in range(max_groups) if patches_list[i]])
+    return (total_tokens_list[:num_groups], patches_list[:num_groups], remaining_files_list_new,
+            files_in_patches_list[:num_groups])
 
 
 async def retry_with_fallback_models(f: Callable, model_type: ModelType = ModelType.REGULAR):
@@ -352,6 +440,7 @@ async def retry_with_fallback_models(f: Callable, model_type: ModelType = ModelT
             get_logger().warning(
                 f"Failed to generate prediction with {model}"
             )
+            get_metrics_registry().record_fallback(model)
             if i == len(all_models) - 1:  # If it's the last iteration
                 raise Exception(f"Failed to generate prediction with any model of {all_models}")
 
@@ -387,7 +476,8 @@ def get_pr_multi_diffs(git_provider: GitProvider,
                        token_handler: TokenHandler,
                        model: str,
                        max_calls: int = 5,
-                       add_line_numbers: bool = True) -> List[str]:
+                       add_line_numbers: bool = True,
+                       balanced: bool = False) -> List[str]:
     """
     Retrieves the diff files from a Git provider, sorts them by main language, and generates patches for each file.
     The patches are split into multiple groups based on the maximum number of tokens allowed for the given model.
@@ -397,6 +487,8 @@ def get_pr_multi_diffs(git_provider: GitProvider,
         token_handler (TokenHandler): An object that handles tokens in the context of a pull request.
         model (str): The name of the model.
         max_calls (int, optional): The maximum number of calls to retrieve diff files. Defaults to 5.
+        balanced (bool, optional): Whether to spread the patches evenly over the groups (see 'split_patches_balanced'),
+            instead of filling each group before opening the next one. Defaults to False.
 
     Returns:
         List[str]: A list of final diff strings, split into multiple groups based on the maximum number of tokens allowed for the given model.
@@ -404,6 +496,7 @@ def get_pr_multi_diffs(git_provider: GitProvider,
     Raises:
         RateLimitExceededException: If the rate limit for the Git provider API is exceeded.
     """
+    token_handler = token_handler.for_model(model)
     try:
         diff_files = git_provider.get_diff_files()
     except RateLimitExceededException as e:
@@ -417,8 +510,10 @@ def get_pr_multi_diffs(git_provider: GitProvider,
 
     # Sort files within each language group by tokens in descending order
     sorted_files = []
+    files_languages = {}
     for lang in pr_languages:
         sorted_files.extend(sorted(lang['files'], key=lambda x: x.tokens, reverse=True))
+        files_languages.update({file.filename: lang['language'] for file in lang['files']})
 
     # Get the maximum number of extra lines before and after the patch
     PATCH_EXTRA_LINES_BEFORE = get_settings().config.patch_extra_lines_before
@@ -431,30 +526,23 @@ def get_pr_multi_diffs(git_provider: GitProvider,
         pr_languages, token_handler,
         add_line_numbers_to_hunks=add_line_numbers,
         patch_extra_lines_before=PATCH_EXTRA_LINES_BEFORE,
-        patch_extra_lines_after=PATCH_EXTRA_LINES_AFTER)
+        patch_extra_lines_after=PATCH_EXTRA_LINES_AFTER,
+        max_tokens=get_max_tokens(model) - OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD)
 
     # if we are under the limit, return the full diff
     if total_tokens + OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD < get_max_tokens(model):
         return ["\n".join(patches_extended)] if patches_extended else []
 
-    patches = []
-    final_diff_list = []
-    total_tokens = token_handler.prompt_tokens
-    call_number = 1
+    # generate the patches of all the files, and count their tokens in one batch
+    files_and_patches = []
     for file in sorted_files:
-        if call_number > max_calls:
-            if get_settings().config.verbosity_level >= 2:
-                get_logger().info(f"Reached max calls ({max_calls})")
-            break
-
-        original_file_content_str = file.base_file
-        new_file_content_str = file.head_file
         patch = file.patch
         if not patch:
             continue
 
         # Remove delete-only hunks
-        patch = handle_patch_deletions(patch, original_file_content_str, new_file_content_str, file.filename, file.edit_type)
+        patch = handle_patch_deletions(patch, "", _new_content_for_deletion_check(file), file.filename,
+                                       file.edit_type)
         if patch is None:
             continue
 
@@ -467,7 +555,19 @@ def get_pr_multi_diffs(git_provider: GitProvider,
         # add AI-summary metadata to the patch
         if file.ai_file_summary and get_settings().get("config.enable_ai_metadata", False):
             patch = add_ai_summary_top_patch(file, patch)
-        new_patch_tokens = token_handler.count_tokens(patch)
+        files_and_patches.append((file, patch))
+    patches_tokens = token_handler.count_tokens_batch([patch for _, patch in files_and_patches])
+
+    patches = []
+    final_diff_list = []
+    balanced_patches = []
+    total_tokens = token_handler.prompt_tokens
+    call_number = 1
+    for (file, patch), new_patch_tokens in zip(files_and_patches, patches_tokens):
+        if call_number > max_calls:
+            if get_settings().config.verbosity_level >= 2:
+                get_logger().info(f"Reached max calls ({max_calls})")
+            break
 
         if patch and (token_handler.prompt_tokens + new_patch_tokens) > get_max_tokens(
                 model) - OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD:
@@ -489,6 +589,11 @@ def get_pr_multi_diffs(git_provider: GitProvider,
                 get_logger().warning(f"Patch too large, skipping: {file.filename}")
                 continue
 
+        if balanced:
+            if patch:
+                balanced_patches.append((patch, new_patch_tokens, files_languages.get(file.filename)))
+            continue
+
         if patch and (total_tokens + new_patch_tokens > get_max_tokens(model) - OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD):
             final_diff = "\n".join(patches)
             final_diff_list.append(final_diff)
@@ -513,9 +618,67 @@ def get_pr_multi_diffs(git_provider: GitProvider,
         final_diff = "\n".join(patches)
         final_diff_list.append(final_diff)
 
+    if balanced:
+        final_diff_list = split_patches_balanced(balanced_patches, max_calls,
+                                                 get_max_tokens(model) - OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD -
+                                                 token_handler.prompt_tokens)
+
     return final_diff_list
 
 
+def split_patches_balanced(patches: List[Tuple[str, int, str]], max_calls: int, max_chunk_tokens: int) -> List[str]:
+    """
+    Splits patches into chunks of similar size, to minimize the size of the largest chunk (and hence the latency of
+    parallel calls), using longest-processing-time-first: each patch, from the largest to the smallest, goes to the
+    least loaded chunk. A chunk that already holds patches of the same language is preferred, as long as this does not
+    grow the largest chunk. Each chunk keeps the original order of its patches.
+
+    Args:
+        patches: a list of (patch, tokens, language) tuples, in diff order.
+        max_calls: the maximum number of chunks.
+        max_chunk_tokens: the maximum number of patch tokens in a chunk.
+
+    Returns:
+        List[str]: the final diff string of each chunk. Uses the smallest number of chunks (up to 'max_calls') that fits
+        all the patches, and patches that fit no chunk are dropped.
+    """
+    if not patches or max_calls < 1:
+        return []
+    total_tokens = sum(tokens for _, tokens, _ in patches)
+    num_chunks = min(max(math.ceil(total_tokens / max(max_chunk_tokens, 1)), 1), max_calls)
+    order = sorted(range(len(patches)), key=lambda i: patches[i][1], reverse=True)
+    while True:
+        chunks_loads = [0] * num_chunks
+        chunks_indices = [[] for _ in range(num_chunks)]
+        chunks_languages = [set() for _ in range(num_chunks)]
+        dropped = []
+        for i in order:
+            _, tokens, language = patches[i]
+            feasible_chunks = [c for c in range(num_chunks) if chunks_loads[c] + tokens <= max_chunk_tokens]
+            if not feasible_chunks:
+                dropped.append(i)
+                continue
+            chunk = min(feasible_chunks, key=lambda c: chunks_loads[c])
+            same_language_chunks = [c for c in feasible_chunks if language in chunks_languages[c]]
+            if same_language_chunks:
+                same_language_chunk = min(same_language_chunks, key=lambda c: chunks_loads[c])
+                if chunks_loads[same_language_chunk] + tokens <= max(max(chunks_loads), chunks_loads[chunk] + tokens):
+                    chunk = same_language_chunk
+            chunks_loads[chunk] += tokens
+            chunks_indices[chunk].append(i)
+            chunks_languages[chunk].add(language)
+        if not dropped or num_chunks >= max_calls:
+            break
+        num_chunks += 1
+
+    if dropped:
+        get_logger().warning(f"Reached max calls ({max_calls}), skipping {len(dropped)} patches")
+    if get_settings().config.verbosity_level >= 2:
+        get_logger().info(f"Balanced chunks tokens: {chunks_loads}")
+    chunks_indices = sorted((sorted(indices) for indices in chunks_indices if indices), key=lambda indices: indices[0])
+    return ["\n".join(patches[i][0] for i in indices) for indices in chunks_indices]
+
+
 def add_ai_metadata_to_diff_files(git_provider, pr_description_files):
     """
     Adds AI metadata to the diff files based on the PR description files (FilePatchInfo.ai_file_summary).
@@ -0,0 +1,138 @@
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from pr_agent.algo.types import FilePatchInfo
+from pr_agent.config_loader import get_settings
+from pr_agent.log import get_logger
+
+REVIEW_STORE_VERSION = 1
+
+
+def file_blob_sha(file: FilePatchInfo) -> str:
+    """
+    Returns the git blob SHA of the new content of a file. When the provider did not load the file content, or loads it
+    lazily (it is not loaded just to be hashed), a hash of the patch is used instead (prefixed with 'patch:'), so the
+    file is still recognized as changed when its diff is.
+    """
+    if file.content_loader is None and file.head_file:
+        content = file.head_file.encode("utf-8", errors="surrogateescape")
+        return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+    return "patch:" + hashlib.sha1((file.patch or "").encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+def get_changed_files(stored_files: Dict[str, str], diff_files: Iterable[FilePatchInfo]) -> Tuple[Set[str], Set[str]]:
+    """
+    Compares the files of a PR with the files covered by a stored review.
+
+    Returns:
+        changed_files: the files that are new in the PR, or whose content changed since the stored review.
+        removed_files: the files of the stored review that are no longer part of the PR.
+    """
+    current_files = {file.filename: file_blob_sha(file) for file in diff_files}
+    changed_files = {filename for filename, sha in current_files.items() if stored_files.get(filename) != sha}
+    removed_files = set(stored_files) - set(current_files)
+    return changed_files, removed_files
+
+
+def merge_reviews(stored_review: dict, new_review: dict, unchanged_files: Set[str]) -> dict:
+    """
+    Merges the review of the files changed since the stored review into the stored review (both in the format of the
+    review prompt output, with a top 'review' key).
+
+    The key issues of the stored review are kept only for files that did not change. The other fields are taken from
+    the new review, except the estimated effort (the maximum of both) and the security concerns (kept from the stored
+    review, unless the new review reports some).
+    """
+    stored = copy.deepcopy(stored_review.get("review", {})) if stored_review else {}
+    new = new_review.get("review", {}) if new_review else {}
+    merged = dict(stored)
+    merged.update(new)
+
+    stored_issues = [issue for issue in stored.get("key_issues_to_review") or []
+                     if isinstance(issue, dict) and str(issue.get("relevant_file", "")).strip() in unchanged_files]
+    if "key_issues_to_review" in stored or "key_issues_to_review" in new:
+        new_issues = new.get("key_issues_to_review") or []
+        merged["key_issues_to_review"] = stored_issues + (new_issues if isinstance(new_issues, list) else [])
+
+    effort_key = "estimated_effort_to_review_[1-5]"
+    if effort_key in stored and effort_key in new:
+        merged[effort_key] = max([stored[effort_key], new[effort_key]], key=_effort_score)
+
+    security_key = "security_concerns"
+    if security_key in stored and _is_no_concern(new.get(security_key, "")):
+        merged[security_key] = stored[security_key]
+
+    # 'key_issues_to_review' is displayed last
+    if "key_issues_to_review" in merged:
+        merged["key_issues_to_review"] = merged.pop("key_issues_to_review")
+    return {"review": merged}
+
+
+def _effort_score(value) -> int:
+    try:
+        return int(str(value).strip().split(",")[0].split()[0])
+    except (ValueError, IndexError):
+        return 0
+
+
+def _is_no_concern(value) -> bool:
+    return str(value).strip().lower() in ("", "no", "none", "false")
+
+
+class ReviewStore:
+    """
+    A file-based store of the last review of each PR, with the blob SHAs of the files it covered.
+    Each PR is stored as a JSON file named by the hash of the PR URL.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+
+    def load(self, pr_url: str) -> Optional[dict]:
+        path = self._path(pr_url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            get_logger().warning(f"Failed to load the stored review of {pr_url}, error: {e}")
+            return None
+        if entry.get("version") != REVIEW_STORE_VERSION or entry.get("pr_url") != pr_url:
+            return None
+        return entry
+
+    def save(self, pr_url: str, review: dict, files: Dict[str, str]):
+        entry = {"version": REVIEW_STORE_VERSION, "pr_url": pr_url, "updated_at": time.time(),
+                 "review": review, "files": files}
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            # write to a temporary file first, so concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False, default=str)
+                os.replace(tmp_path, self._path(pr_url))
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        except Exception as e:
+            get_logger().warning(f"Failed to store the review of {pr_url}, error: {e}")
+
+    def _path(self, pr_url: str) -> str:
+        return os.path.join(self.store_dir, hashlib.sha256(pr_url.encode("utf-8")).hexdigest() + ".json")
+
+
+def get_review_store() -> Optional[ReviewStore]:
+    """
+    Returns the review store configured by 'pr_reviewer.review_store_dir', or None when it is disabled.
+    """
+    store_dir = get_settings().pr_reviewer.get("review_store_dir", "")
+    if not store_dir:
+        return None
+    return ReviewStore(os.path.expanduser(store_dir))
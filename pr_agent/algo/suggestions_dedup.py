@@ -0,0 +1,141 @@
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+SHINGLE_SIZE = 3
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# fixed (a, b) pairs of the universal hash functions 'h(x) = (a * x + b) mod p', one per MinHash permutation
+_PERMUTATIONS = [(int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME
+                  or 1,
+                  int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME)
+                 for i in range(NUM_BANDS * ROWS_PER_BAND)]
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def code_shingles(code: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """
+    Returns the hashed token n-grams of a code snippet. Whitespace and letter case are ignored.
+    """
+    tokens = _TOKEN_RE.findall(code.lower())
+    if len(tokens) <= size:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    return {int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "big") for gram in grams}
+
+
+def minhash_signature(shingles: Set[int]) -> Tuple[int, ...]:
+    if not shingles:
+        return tuple([_MAX_HASH] * len(_PERMUTATIONS))
+    return tuple(min(((a * shingle + b) % _MERSENNE_PRIME) & _MAX_HASH for shingle in shingles)
+                 for a, b in _PERMUTATIONS)
+
+
+def jaccard_similarity(shingles_a: Set[int], shingles_b: Set[int]) -> float:
+    if not shingles_a and not shingles_b:
+        return 1.0
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+
+class SuggestionsIndex:
+    """
+    A local index of code suggestions for near-duplicate lookup.
+
+    Suggestions are bucketed by file and by the bands of the MinHash signature of their 'improved_code' (locality
+    sensitive hashing), so a lookup only compares against suggestions that likely share most of their code. Candidates
+    are then confirmed by the exact Jaccard similarity of the code shingles and by overlapping line ranges. Without line
+    ranges (before self-reflection), the 'existing_code' of the suggestions must be similar too, so that the same fix
+    at two different places is not merged.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.8):
+        self.similarity_threshold = similarity_threshold
+        self._buckets: Dict[tuple, List[int]] = defaultdict(list)
+        self._entries: List[Tuple[str, Set[int], Set[int], Optional[Tuple[int, int]]]] = []
+
+    def find_duplicate(self, suggestion: dict) -> Optional[int]:
+        """
+        Returns the id of an indexed suggestion that 'suggestion' duplicates, or None.
+        """
+        relevant_file, shingles, existing_shingles, line_range = self._describe(suggestion)
+        candidates = set()
+        for bucket in self._bucket_keys(relevant_file, shingles):
+            candidates.update(self._buckets.get(bucket, ()))
+        for entry_id in sorted(candidates):
+            _, entry_shingles, entry_existing_shingles, entry_line_range = self._entries[entry_id]
+            if jaccard_similarity(shingles, entry_shingles) < self.similarity_threshold:
+                continue
+            if line_range is None or entry_line_range is None:
+                # the location is unknown, so it is compared by the code the suggestions replace
+                if jaccard_similarity(existing_shingles, entry_existing_shingles) >= self.similarity_threshold:
+                    return entry_id
+            elif _ranges_overlap(line_range, entry_line_range):
+                return entry_id
+        return None
+
+    def add(self, suggestion: dict) -> int:
+        """
+        Indexes a suggestion, and returns its id (ids are consecutive, starting from 0).
+        """
+        relevant_file, shingles, existing_shingles, line_range = self._describe(suggestion)
+        entry_id = len(self._entries)
+        self._entries.append((relevant_file, shingles, existing_shingles, line_range))
+        for bucket in self._bucket_keys(relevant_file, shingles):
+            self._buckets[bucket].append(entry_id)
+        return entry_id
+
+    @staticmethod
+    def _describe(suggestion: dict) -> Tuple[str, Set[int], Set[int], Optional[Tuple[int, int]]]:
+        relevant_file = str(suggestion.get("relevant_file", "")).strip()
+        shingles = code_shingles(str(suggestion.get("improved_code", "")))
+        existing_shingles = code_shingles(str(suggestion.get("existing_code", "")))
+        line_range = None
+        try:
+            start = int(suggestion.get("relevant_lines_start", -1))
+            end = int(suggestion.get("relevant_lines_end", -1))
+            if 0 < start <= end:
+                line_range = (start, end)
+        except (TypeError, ValueError):
+            pass
+        return relevant_file, shingles, existing_shingles, line_range
+
+    @staticmethod
+    def _bucket_keys(relevant_file: str, shingles: Set[int]) -> List[tuple]:
+        signature = minhash_signature(shingles)
+        return [(relevant_file, band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+                for band in range(NUM_BANDS)]
+
+
+def _ranges_overlap(range_a: Tuple[int, int], range_b: Tuple[int, int]) -> bool:
+    return range_a[0] <= range_b[1] and range_b[0] <= range_a[1]
+
+
+def dedup_code_suggestions(suggestions: List[dict], similarity_threshold: float = 0.8) -> List[dict]:
+    """
+    Merges near-duplicate code suggestions: same 'relevant_file', overlapping line ranges (or similar 'existing_code'
+    when the line ranges are unknown), and similar 'improved_code'. From each group of duplicates, the highest scored
+    suggestion is kept (the first one, when the suggestions are not scored yet), at the position of the first one.
+    """
+    if similarity_threshold <= 0 or len(suggestions) < 2:
+        return suggestions
+    index = SuggestionsIndex(similarity_threshold)
+    unique_suggestions = []
+    for suggestion in suggestions:
+        duplicate_id = index.find_duplicate(suggestion)
+        if duplicate_id is None:
+            index.add(suggestion)
+            unique_suggestions.append(suggestion)
+        elif _score(suggestion) > _score(unique_suggestions[duplicate_id]):
+            unique_suggestions[duplicate_id] = suggestion
+    return unique_suggestions
+
+
+def _score(suggestion: dict) -> int:
+    try:
+        return int(suggestion.get("score", 0))
+    except (TypeError, ValueError):
+        return 0
@@ -1,27 +1,122 @@
+import copy
+import math
+import os
 from threading import Lock
+from typing import Any, Callable, Dict, List, Set, Tuple
 
 from jinja2 import Environment, StrictUndefined
-from tiktoken import encoding_for_model, get_encoding
+from tiktoken import get_encoding
 
 from pr_agent.config_loader import get_settings
 from pr_agent.log import get_logger
 
+OPENAI_O200K_MODEL_PREFIXES = ("gpt-4o", "chatgpt-4o", "gpt-4.1", "gpt-4.5", "gpt-5", "o1", "o3", "o4")
+OPENAI_CL100K_MODEL_PREFIXES = ("gpt-4", "gpt-3.5", "gpt-35")
+DEFAULT_ENCODING = "cl100k_base"
+
+# Average number of UTF-8 bytes per token in diffs of common file types, measured with 'cl100k_base' ('o200k_base'
+# is within 2%). Used by 'TokenHandler.estimate_tokens'. See tests/benchmarks/benchmark_token_estimator.py
+BYTES_PER_TOKEN_BY_EXTENSION = {
+    "py": 4.1, "pyi": 3.1, "pyx": 3.8, "json": 3.9, "md": 4.1, "rst": 3.8, "toml": 3.7, "yaml": 3.1, "yml": 3.1,
+    "c": 3.3, "h": 3.4, "cc": 3.3, "cpp": 3.3, "hpp": 3.4, "js": 3.0, "jsx": 3.0, "ts": 3.0, "tsx": 3.0,
+    "html": 3.0, "css": 3.0, "xml": 2.6, "txt": 3.1, "csv": 1.6, "proto": 3.9,
+}
+DEFAULT_BYTES_PER_TOKEN = 3.3
+# Upper bound on how much a sum of estimates may exceed the exact count. Only totals above the budget by more than
+# this margin are decided by the estimate alone.
+TOKEN_ESTIMATE_MAX_OVERESTIMATE = 0.5
+TOKENIZER_BATCH_THREADS = min(os.cpu_count() or 1, 8)
+# Error margins of the model families that are counted with 'cl100k_base': the 95th percentile of the per-patch
+# undercount, measured on diffs with tests/benchmarks/benchmark_token_margins.py. Claude is measured with the tokenizer
+# bundled with litellm (of the models before Claude 3), the closest public one.
+MODEL_FAMILY_TOKEN_MARGINS = {"claude": 0.31}
+
+
+class _CallableEncoder:
+    """
+    Adapts a plain 'text -> tokens' callable to the tiktoken 'encode' interface used across the code.
+    """
+
+    def __init__(self, encode_fn: Callable[[str], list]):
+        self._encode_fn = encode_fn
+
+    def encode(self, text: str, **kwargs) -> list:
+        return self._encode_fn(text)
+
 
 class TokenEncoder:
-    _encoder_instance = None
-    _model = None
+    """
+    A thread-safe registry of token encoders, lazily built once per model.
+
+    OpenAI models are counted with their exact tiktoken encoding. Other model families are counted with
+    'cl100k_base' as an approximation, unless a tokenizer was registered for them via 'register_tokenizer'.
+    Approximate counts are inflated by a margin (see 'get_error_margin').
+    """
+    _encoders: Dict[str, Any] = {}
+    _exact_models: Set[str] = set()
+    _family_tokenizers: Dict[str, Callable[[str], Callable[[str], list]]] = {}
     _lock = Lock()  # Create a lock object
 
     @classmethod
-    def get_token_encoder(cls):
-        model = get_settings().config.model
-        if cls._encoder_instance is None or model != cls._model:  # Check without acquiring the lock for performance
+    def get_token_encoder(cls, model: str = None):
+        model = model or get_settings().config.model
+        encoder = cls._encoders.get(model)
+        if encoder is None:  # Check without acquiring the lock for performance
             with cls._lock:  # Lock acquisition to ensure thread safety
-                if cls._encoder_instance is None or model != cls._model:
-                    cls._model = model
-                    cls._encoder_instance = encoding_for_model(cls._model) if "gpt" in cls._model else get_encoding(
-                        "cl100k_base")
-        return cls._encoder_instance
+                encoder = cls._encoders.get(model)
+                if encoder is None:
+                    encoder, exact = cls._create_encoder(model)
+                    if exact:
+                        cls._exact_models.add(model)
+                    cls._encoders[model] = encoder
+        return encoder
+
+    @classmethod
+    def register_tokenizer(cls, family: str, factory: Callable[[str], Callable[[str], list]]):
+        """
+        Registers an exact tokenizer for a model family (e.g. 'claude', 'gemini').
+
+        Args:
+            family: a substring matched (case-insensitive) against the model name.
+            factory: called once per model with the model name, returns a 'text -> list of tokens' callable.
+        """
+        with cls._lock:
+            cls._family_tokenizers[family.lower()] = factory
+            # drop cached encoders of this family, so they are rebuilt with the new tokenizer
+            for model in [m for m in cls._encoders if family.lower() in m.lower()]:
+                cls._encoders.pop(model)
+                cls._exact_models.discard(model)
+
+    @classmethod
+    def get_error_margin(cls, model: str = None) -> float:
+        """
+        Returns the relative margin to add to token counts of the given model - zero when its tokenizer is exact.
+        Otherwise, 'config.model_token_count_estimate_factor' when it is set, and the measured margin of the model
+        family (MODEL_FAMILY_TOKEN_MARGINS) when it is not.
+        """
+        model = model or get_settings().config.model
+        cls.get_token_encoder(model)
+        if model in cls._exact_models:
+            return 0.0
+        configured_margin = float(get_settings().config.get("model_token_count_estimate_factor", 0.0))
+        if configured_margin > 0:
+            return configured_margin
+        model_name = model.lower()
+        return next((margin for family, margin in MODEL_FAMILY_TOKEN_MARGINS.items() if family in model_name), 0.0)
+
+    @classmethod
+    def _create_encoder(cls, model: str) -> Tuple[Any, bool]:
+        model_name = model.lower()
+        for family, factory in cls._family_tokenizers.items():
+            if family in model_name:
+                return _CallableEncoder(factory(model)), True
+
+        base_model_name = model_name.split("/")[-1]  # e.g. 'azure/gpt-4o', 'openai/o3-mini'
+        if base_model_name.startswith(OPENAI_O200K_MODEL_PREFIXES):
+            return get_encoding("o200k_base"), True
+        if base_model_name.startswith(OPENAI_CL100K_MODEL_PREFIXES):
+            return get_encoding("cl100k_base"), True
+        return get_encoding(DEFAULT_ENCODING), False
 
 
 class TokenHandler:
@@ -37,7 +132,7 @@ class TokenHandler:
       method.
     """
 
-    def __init__(self, pr=None, vars: dict = {}, system="", user=""):
+    def __init__(self, pr=None, vars: dict = {}, system="", user="", model: str = None):
         """
         Initializes the TokenHandler object.
 
@@ -46,11 +141,30 @@ class TokenHandler:
         - vars: A dictionary of variables.
         - system: The system string.
         - user: The user string.
+        - model: The model whose tokenizer is used. Defaults to 'config.model'.
         """
-        self.encoder = TokenEncoder.get_token_encoder()
+        self.model = model or get_settings().config.model
+        self.encoder = TokenEncoder.get_token_encoder(self.model)
+        self.error_margin = TokenEncoder.get_error_margin(self.model)
+        self._prompts = None
         if pr is not None:
             self.prompt_tokens = self._get_system_user_tokens(pr, self.encoder, vars, system, user)
 
+    def for_model(self, model: str) -> "TokenHandler":
+        """
+        Returns a token handler of the same prompt that counts tokens for 'model' (e.g. a fallback or weak model).
+        """
+        if not model or model == self.model:
+            return self
+        token_handler = copy.copy(self)
+        token_handler.model = model
+        token_handler.encoder = TokenEncoder.get_token_encoder(model)
+        token_handler.error_margin = TokenEncoder.get_error_margin(model)
+        if self._prompts is not None:
+            token_handler.prompt_tokens = token_handler._apply_error_margin(
+                sum(len(token_handler.encoder.encode(prompt)) for prompt in self._prompts))
+        return token_handler
+
     def _get_system_user_tokens(self, pr, encoder, vars: dict, system, user):
         """
         Calculates the number of tokens in the system and user strings.
@@ -69,9 +183,10 @@ class TokenHandler:
             environment = Environment(undefined=StrictUndefined)
             system_prompt = environment.from_string(system).render(vars)
             user_prompt = environment.from_string(user).render(vars)
+            self._prompts = (system_prompt, user_prompt)
             system_prompt_tokens = len(encoder.encode(system_prompt))
             user_prompt_tokens = len(encoder.encode(user_prompt))
-            return system_prompt_tokens + user_prompt_tokens
+            return self._apply_error_margin(system_prompt_tokens + user_prompt_tokens)
         except Exception as e:
             get_logger().error(f"Error in _get_system_user_tokens: {e}")
             return 0
@@ -86,4 +201,56 @@ class TokenHandler:
         Returns:
         The number of tokens in the patch string.
         """
-        return len(self.encoder.encode(patch, disallowed_special=()))
+        return self._apply_error_margin(len(self.encoder.encode(patch, disallowed_special=())))
+
+    def count_tokens_batch(self, patches: List[str]) -> List[int]:
+        """
+        Counts the number of tokens in each of the given patch strings.
+        With tiktoken encoders, the strings are tokenized in parallel native threads ('encode_ordinary_batch').
+
+        Args:
+        - patches: The patch strings.
+
+        Returns:
+        The number of tokens in each patch string, in the same order as 'patches'.
+        """
+        if not patches:
+            return []
+        if len(patches) > 1 and hasattr(self.encoder, "encode_ordinary_batch"):
+            # 'encode_ordinary' ignores special tokens, same as 'encode' with 'disallowed_special=()'
+            encoded_patches = self.encoder.encode_ordinary_batch(patches, num_threads=TOKENIZER_BATCH_THREADS)
+            return [self._apply_error_margin(len(tokens)) for tokens in encoded_patches]
+        return [self.count_tokens(patch) for patch in patches]
+
+    def estimate_tokens(self, text: str, filename: str = None) -> int:
+        """
+        Estimates the number of tokens in a string from its UTF-8 size, without running the tokenizer.
+        The estimate is typically within 20% of 'count_tokens' for a single patch, and closer for sums of many patches.
+
+        Args:
+        - text: The string to estimate.
+        - filename: The name of the file the text comes from, used to select a per-language bytes-per-token ratio.
+
+        Returns:
+        The estimated number of tokens.
+        """
+        if not text:
+            return 0
+        bytes_per_token = DEFAULT_BYTES_PER_TOKEN
+        if filename and "." in filename:
+            bytes_per_token = BYTES_PER_TOKEN_BY_EXTENSION.get(filename.rsplit(".", 1)[-1].lower(),
+                                                               DEFAULT_BYTES_PER_TOKEN)
+        num_bytes = len(text) if text.isascii() else len(text.encode("utf-8"))
+        return self._apply_error_margin(max(round(num_bytes / bytes_per_token), 1))
+
+    def estimate_tokens_batch(self, texts: List[str], filenames: List[str] = None) -> List[int]:
+        """
+        Estimates the number of tokens of each string in 'texts'. See 'estimate_tokens'.
+        """
+        filenames = filenames or [None] * len(texts)
+        return [self.estimate_tokens(text, filename) for text, filename in zip(texts, filenames)]
+
+    def _apply_error_margin(self, num_tokens: int) -> int:
+        if not self.error_margin:
+            return num_tokens
+        return int(math.ceil(num_tokens * (1 + self.error_margin)))
@@ -1,6 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from typing import Callable, Optional
+
+from pr_agent.log import get_logger
 
 
 class EDIT_TYPE(Enum):
@@ -24,3 +26,40 @@ class FilePatchInfo:
     num_minus_lines: int = -1
     language: Optional[str] = None
     ai_file_summary: str = None
+    # loads the 'base' or 'head' content of the file on first access, when 'base_file'/'head_file' is None
+    content_loader: Optional[Callable[[str], str]] = field(default=None, repr=False, compare=False)
+
+    def is_content_loaded(self, version: str) -> bool:
+        """
+        Returns False when reading the 'base' or 'head' content of the file would load it first.
+        """
+        return self.content_loader is None or self.__dict__.get(f'_{version}_file') is not None
+
+
+def _lazy_file_content(version: str) -> property:
+    attribute = f'_{version}_file'
+
+    def get_content(self) -> str:
+        content = self.__dict__.get(attribute)
+        if content is None:
+            loader = self.__dict__.get('content_loader')
+            if loader is None:
+                return content
+            # concurrent first accesses may both load the content, which is harmless
+            try:
+                content = loader(version) or ""
+            except Exception as e:
+                get_logger().warning(f"Failed to load the {version} content of {self.filename}, error: {e}")
+                content = ""
+            self.__dict__[attribute] = content
+        return content
+
+    def set_content(self, content: str):
+        self.__dict__[attribute] = content
+
+    return property(get_content, set_content)
+
+
+# 'base_file' and 'head_file' stay regular dataclass fields in the constructor, and are read through lazy properties
+FilePatchInfo.base_file = _lazy_file_content('base')
+FilePatchInfo.head_file = _lazy_file_content('head')
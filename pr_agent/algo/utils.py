@@ -11,9 +11,11 @@ import sys
 import textwrap
 import time
 import traceback
+from collections import OrderedDict
 from datetime import datetime
 from enum import Enum
 from importlib.metadata import PackageNotFoundError, version
+from threading import Lock
 from typing import Any, List, Tuple
 
 import html2text
@@ -23,8 +25,10 @@ from pydantic import BaseModel
 from starlette_context import context
 
 from pr_agent.algo import MAX_TOKENS
+from pr_agent.algo.diff_engine import unified_diff_lines  # noqa: F401
+from pr_agent.algo.diff_engine import diff_lines
 from pr_agent.algo.git_patch_processing import extract_hunk_lines_from_patch
-from pr_agent.algo.token_handler import TokenEncoder
+from pr_agent.algo.token_handler import TokenHandler
 from pr_agent.algo.types import FilePatchInfo
 from pr_agent.config_loader import get_settings, global_settings
 from pr_agent.log import get_logger
@@ -635,6 +639,25 @@ def convert_str_to_datetime(date_str):
     return datetime.strptime(date_str, datetime_format)
 
 
+def _get_diff_size_summary_patch(filename, original_file_content_str: str, new_file_content_str: str,
+                                 original_lines: List[str], new_lines: List[str]) -> str:
+    """
+    Returns a one-hunk summary patch (with no content lines) when a version of the file exceeds the configured byte or
+    line ceilings ('config.max_diff_file_bytes', 'config.max_diff_file_lines'), or "" when the file can be diffed.
+    """
+    max_bytes = get_settings().config.get("max_diff_file_bytes", 0)
+    max_lines = get_settings().config.get("max_diff_file_lines", 0)
+    num_bytes = max(len(original_file_content_str.encode("utf-8", errors="surrogateescape")),
+                    len(new_file_content_str.encode("utf-8", errors="surrogateescape")))
+    num_lines = max(len(original_lines), len(new_lines))
+    if (max_bytes <= 0 or num_bytes <= max_bytes) and (max_lines <= 0 or num_lines <= max_lines):
+        return ""
+    get_logger().info(f"File {filename} is too large to diff ({num_lines} lines, {num_bytes} bytes), "
+                      f"using a summary patch")
+    return (f"--- \n+++ \n@@ -1,{len(original_lines)} +1,{len(new_lines)} @@ "
+            f"File too large to diff ({num_lines} lines, {num_bytes} bytes), changes omitted\n")
+
+
 def load_large_diff(filename, new_file_content_str: str, original_file_content_str: str, show_warning: bool = True) -> str:
     """
     Generate a patch for a modified file by comparing the original content of the file with the new content provided as
@@ -646,8 +669,13 @@ def load_large_diff(filename, new_file_content_str: str, original_file_content_s
     try:
         original_file_content_str = (original_file_content_str or "").rstrip() + "\n"
         new_file_content_str = (new_file_content_str or "").rstrip() + "\n"
-        diff = difflib.unified_diff(original_file_content_str.splitlines(keepends=True),
-                                    new_file_content_str.splitlines(keepends=True))
+        original_lines = original_file_content_str.splitlines(keepends=True)
+        new_lines = new_file_content_str.splitlines(keepends=True)
+        summary_patch = _get_diff_size_summary_patch(filename, original_file_content_str, new_file_content_str,
+                                                     original_lines, new_lines)
+        if summary_patch:
+            return summary_patch
+        diff = diff_lines(original_lines, new_lines, engine=get_settings().config.get("diff_engine", "auto"))
         if get_settings().config.verbosity_level >= 2 and show_warning:
             get_logger().info(f"File was modified, but no patch was found. Manually creating patch: {filename}.")
         patch = ''.join(diff)
@@ -896,8 +924,7 @@ def clip_tokens(text: str, max_tokens: int, add_three_dots=True, num_input_token
 
     try:
         if num_input_tokens is None:
-            encoder = TokenEncoder.get_token_encoder()
-            num_input_tokens = len(encoder.encode(text))
+            num_input_tokens = TokenHandler().count_tokens(text)
         if num_input_tokens <= max_tokens:
             return text
         if max_tokens < 0:
@@ -1252,3 +1279,50 @@ def set_file_languages(diff_files) -> List[FilePatchInfo]:
         get_logger().exception(f"Failed to set file languages: {e}")
 
     return diff_files
+
+
+class LRUCache:
+    """
+    A small thread-safe, in-process cache that evicts the least recently used entries above 'max_size'.
+    When 'ttl' is set, entries also expire 'ttl' seconds after they were set.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if not self._is_live(key):
+                return default
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._is_live(key)
+
+    def _is_live(self, key) -> bool:
+        if key not in self._data:
+            return False
+        if self.ttl is not None and time.monotonic() - self._data[key][1] > self.ttl:
+            self._data.pop(key)
+            return False
+        return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -3,6 +3,7 @@ import asyncio
 import os
 
 from pr_agent.agent.pr_agent import PRAgent, commands
+from pr_agent.algo.metrics import get_metrics_registry
 from pr_agent.algo.utils import get_version
 from pr_agent.config_loader import get_settings
 from pr_agent.log import get_logger, setup_logger
@@ -88,6 +89,8 @@ def run(inargs=None, args=None):
         return result
 
     result = asyncio.run(inner())
+    if get_settings().config.get("output_llm_metrics", False):
+        get_logger().info(f"LLM metrics summary:\n{get_metrics_registry().to_json()}")
     if not result:
         parser.print_help()
 
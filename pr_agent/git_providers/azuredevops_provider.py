@@ -1,5 +1,6 @@
 import os
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
 
 from pr_agent.algo.types import EDIT_TYPE, FilePatchInfo
@@ -11,7 +12,7 @@ from ..algo.utils import (PRDescriptionHeader, clip_tokens,
                           load_large_diff)
 from ..config_loader import get_settings
 from ..log import get_logger
-from .git_provider import GitProvider
+from .git_provider import MAX_FILES_ALLOWED_FULL, GitProvider
 
 AZURE_DEVOPS_AVAILABLE = True
 ADO_APP_CLIENT_DEFAULT_ID = "499b84ac-1321-427f-aa17-267ca6975798/.default"
@@ -292,36 +293,11 @@ class AzureDevopsProvider(GitProvider):
                 except Exception:
                     pass
 
-            invalid_files_names = []
-            for file in diffs:
-                if not is_valid_file(file):
-                    invalid_files_names.append(file)
-                    continue
-
-                version = GitVersionDescriptor(
-                    version=head_sha.commit_id, version_type="commit"
-                )
-                try:
-                    new_file_content_str = self.azure_devops_client.get_item(
-                        repository_id=self.repo_slug,
-                        path=file,
-                        project=self.workspace_slug,
-                        version_descriptor=version,
-                        download=False,
-                        include_content=True,
-                    )
-
-                    new_file_content_str = new_file_content_str.content
-                except Exception as error:
-                    get_logger().error(f"Failed to retrieve new file content of {file} at version {version}", error=error)
-                    # get_logger().error(
-                    #     "Failed to retrieve new file content of %s at version %s. Error: %s",
-                    #     file,
-                    #     version,
-                    #     str(error),
-                    # )
-                    new_file_content_str = ""
+            invalid_files_names = [file for file in diffs if not is_valid_file(file)]
+            diffs = [file for file in diffs if is_valid_file(file)]
 
+            edit_types = {}
+            for file in diffs:
                 edit_type = EDIT_TYPE.MODIFIED
                 if diff_types[file] == "add":
                     edit_type = EDIT_TYPE.ADDED
@@ -329,30 +305,32 @@ class AzureDevopsProvider(GitProvider):
                     edit_type = EDIT_TYPE.DELETED
                 elif "rename" in diff_types[file]: # diff_type can be `rename` | `edit, rename`
                     edit_type = EDIT_TYPE.RENAMED
-
-                version = GitVersionDescriptor(
-                    version=base_sha.commit_id, version_type="commit"
-                )
-                if edit_type == EDIT_TYPE.ADDED or edit_type == EDIT_TYPE.RENAMED:
-                    original_file_content_str = ""
+                edit_types[file] = edit_type
+
+            # Azure DevOps does not provide the patches, so they are computed from the files contents. Only a limited
+            # number of files keep their full content; the patches of the next files (up to 'max_files_with_patch')
+            # are computed too, and the rest of the files are listed without a patch
+            max_files_with_patch = max(MAX_FILES_ALLOWED_FULL - 1,
+                                       int(get_settings().get("AZURE_DEVOPS.MAX_FILES_WITH_PATCH", 300)))
+            files_to_load = diffs[:max_files_with_patch]
+            if len(diffs) > MAX_FILES_ALLOWED_FULL - 1:
+                get_logger().info("Too many files in PR, will avoid keeping full content for rest of files")
+            if len(diffs) > len(files_to_load):
+                get_logger().warning(f"Too many files in PR, the patches of {len(diffs) - len(files_to_load)} files "
+                                     f"are not loaded", artifact={"files": diffs[len(files_to_load):]})
+            files_contents = self._load_files_contents(files_to_load, edit_types,
+                                                       head_sha.commit_id, base_sha.commit_id)
+
+            for i, file in enumerate(diffs):
+                if file in files_contents:
+                    original_file_content_str, new_file_content_str = files_contents.pop(file)
+                    patch = load_large_diff(
+                        file, new_file_content_str, original_file_content_str, show_warning=False
+                    ).rstrip()
+                    if i >= MAX_FILES_ALLOWED_FULL - 1:
+                        original_file_content_str, new_file_content_str = "", ""
                 else:
-                    try:
-                        original_file_content_str = self.azure_devops_client.get_item(
-                            repository_id=self.repo_slug,
-                            path=file,
-                            project=self.workspace_slug,
-                            version_descriptor=version,
-                            download=False,
-                            include_content=True,
-                        )
-                        original_file_content_str = original_file_content_str.content
-                    except Exception as error:
-                        get_logger().error(f"Failed to retrieve original file content of {file} at version {version}", error=error)
-                        original_file_content_str = ""
-
-                patch = load_large_diff(
-                    file, new_file_content_str, original_file_content_str, show_warning=False
-                ).rstrip()
+                    original_file_content_str, new_file_content_str, patch = "", "", ""
 
                 # count number of lines added and removed
                 patch_lines = patch.splitlines(keepends=True)
@@ -365,7 +343,7 @@ class AzureDevopsProvider(GitProvider):
                         new_file_content_str,
                         patch=patch,
                         filename=file,
-                        edit_type=edit_type,
+                        edit_type=edit_types[file],
                         num_plus_lines=num_plus_lines,
                         num_minus_lines=num_minus_lines,
                     )
@@ -378,6 +356,52 @@ class AzureDevopsProvider(GitProvider):
             get_logger().exception(f"Failed to get diff files, error: {e}")
             return []
 
+    def _get_file_content(self, file: str, commit_id: str) -> str:
+        version = GitVersionDescriptor(
+            version=commit_id, version_type="commit"
+        )
+        item = self.azure_devops_client.get_item(
+            repository_id=self.repo_slug,
+            path=file,
+            project=self.workspace_slug,
+            version_descriptor=version,
+            download=False,
+            include_content=True,
+        )
+        return item.content
+
+    def _load_files_contents(self, files: list, edit_types: dict, head_commit_id: str,
+                             base_commit_id: str) -> Dict[str, Tuple[str, str]]:
+        """
+        Loads the (original, new) content of the files concurrently. The original content of added and renamed files
+        is not loaded.
+        """
+        if not files:
+            return {}
+
+        def load_new(file: str) -> str:
+            try:
+                return self._get_file_content(file, head_commit_id)
+            except Exception as error:
+                get_logger().error(f"Failed to retrieve new file content of {file} at version {head_commit_id}",
+                                   error=error)
+                return ""
+
+        def load_original(file: str) -> str:
+            if edit_types[file] in (EDIT_TYPE.ADDED, EDIT_TYPE.RENAMED):
+                return ""
+            try:
+                return self._get_file_content(file, base_commit_id)
+            except Exception as error:
+                get_logger().error(f"Failed to retrieve original file content of {file} at version {base_commit_id}",
+                                   error=error)
+                return ""
+
+        max_workers = max(1, int(get_settings().get("AZURE_DEVOPS.MAX_PARALLEL_FILE_REQUESTS", 8)))
+        with ThreadPoolExecutor(max_workers=min(max_workers, 2 * len(files))) as executor:
+            futures = {file: (executor.submit(load_original, file), executor.submit(load_new, file)) for file in files}
+            return {file: (original.result(), new.result()) for file, (original, new) in futures.items()}
+
     def publish_comment(self, pr_comment: str, is_temporary: bool = False, thread_context=None):
         if is_temporary and not get_settings().config.publish_output_progress:
             get_logger().debug(f"Skipping publish_comment for temporary comment: {pr_comment}")
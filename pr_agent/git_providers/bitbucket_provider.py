@@ -1,7 +1,8 @@
+import codecs
 import difflib
 import json
 import re
-from typing import Optional, Tuple
+from typing import Iterable, Iterator, Optional, Tuple
 from urllib.parse import urlparse
 
 import requests
@@ -11,12 +12,16 @@ from starlette_context import context
 from pr_agent.algo.types import EDIT_TYPE, FilePatchInfo
 
 from ..algo.file_filter import filter_ignored
+from ..algo.git_patch_processing import decode_if_bytes
 from ..algo.language_handler import is_valid_file
 from ..algo.utils import find_line_number_of_relevant_line_in_file
 from ..config_loader import get_settings
 from ..log import get_logger
 from .git_provider import MAX_FILES_ALLOWED_FULL, GitProvider
 
+DIFF_STREAM_CHUNK_BYTES = 64 * 1024
+_RE_DIFF_GIT_HEADER = re.compile(rb'^diff --git (?:"?a/(.+?)"? "?b/(.+?)"?)$')
+
 
 def _gef_filename(diff):
     if diff.new.path:
@@ -24,6 +29,76 @@ def _gef_filename(diff):
     return diff.old.path
 
 
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    remainder = b""
+    for chunk in chunks:
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+    if remainder:
+        yield remainder
+
+
+def _parse_diff_path(path: bytes) -> Optional[str]:
+    # a path of a '---'/'+++' header line: 'a/path', 'b/path', '/dev/null', or a C-style quoted '"a/pa\303\251th"'.
+    # git ends the paths that contain a space with a TAB
+    path = path.rstrip(b"\t\r\n")
+    if path.startswith(b'"') and path.endswith(b'"'):
+        path = codecs.escape_decode(path[1:-1])[0]
+    if path == b"/dev/null":
+        return None
+    if path[:2] in (b"a/", b"b/"):
+        path = path[2:]
+    return decode_if_bytes(path)
+
+
+def iter_file_patches(chunks: Iterable[bytes]) -> Iterator[Tuple[Optional[str], Optional[str], str]]:
+    """
+    Splits a 'git diff' output, read incrementally from byte chunks, into per-file patches. Yields (old path, new path,
+    patch) per file, where a path is None for an added or deleted file, and the patch starts at the first hunk
+    ("" for binary files and changes without hunks). Each patch is decoded on its own, with 'decode_if_bytes'.
+    """
+    old_path = new_path = None
+    patch_lines = None
+
+    def file_patch():
+        patch = decode_if_bytes(b"".join(patch_lines)) if patch_lines else ""
+        return old_path, new_path, patch[:-1] if patch.endswith("\n") else patch
+
+    in_file = False
+    for line in _iter_lines(chunks):
+        if line.startswith(b"diff --git "):
+            if in_file:
+                yield file_patch()
+            in_file, patch_lines = True, None
+            # the paths of the header are only used for files without '---'/'+++' lines (binary, pure renames)
+            match = _RE_DIFF_GIT_HEADER.match(line.rstrip(b"\r\n"))
+            old_path = new_path = decode_if_bytes(match.group(2)) if match else None
+            if match and match.group(1) != match.group(2):
+                old_path = decode_if_bytes(match.group(1))
+        elif not in_file:
+            continue
+        elif patch_lines is not None:
+            patch_lines.append(line)
+        elif line.startswith(b"@@"):
+            patch_lines = [line]
+        elif line.startswith(b"--- "):
+            old_path = _parse_diff_path(line[4:])
+        elif line.startswith(b"+++ "):
+            new_path = _parse_diff_path(line[4:])
+        elif line.startswith(b"new file mode"):
+            old_path = None
+        elif line.startswith(b"deleted file mode"):
+            new_path = None
+        elif line.startswith(b"rename from "):
+            old_path = decode_if_bytes(line[len(b"rename from "):].rstrip(b"\r\n"))
+        elif line.startswith(b"rename to "):
+            new_path = decode_if_bytes(line[len(b"rename to "):].rstrip(b"\r\n"))
+    if in_file:
+        yield file_patch()
+
+
 class BitbucketProvider(GitProvider):
     def __init__(
         self, pr_url: Optional[str] = None, incremental: Optional[bool] = False
@@ -178,64 +253,30 @@ class BitbucketProvider(GitProvider):
             except Exception as e:
                 pass
 
-        # get the pr patches
-        try:
-            pr_patches = self.pr.diff()
-        except Exception as e:
-            # Try different encodings if UTF-8 fails
-            get_logger().warning(f"Failed to decode PR patch with utf-8, error: {e}")
-            encodings_to_try = ['iso-8859-1', 'latin-1', 'ascii', 'utf-16']
-            pr_patches = None
-            for encoding in encodings_to_try:
-                try:
-                    pr_patches = self.pr.diff(encoding=encoding)
-                    get_logger().info(f"Successfully decoded PR patch with encoding {encoding}")
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-            if pr_patches is None:
-                raise ValueError(f"Failed to decode PR patch with encodings {encodings_to_try}")
-
-        diff_split = ["diff --git" + x for x in pr_patches.split("diff --git") if x.strip()]
-        # filter all elements of 'diff_split' that are of indices in 'diffs_original' that are not in 'diffs'
-        if len(diff_split) > len(diffs) and len(diffs_original) == len(diff_split):
-            diff_split = [diff_split[i] for i in range(len(diff_split)) if diffs_original[i] in diffs]
-        if len(diff_split) != len(diffs):
-            get_logger().error(f"Error - failed to split the diff into {len(diffs)} parts")
-            return []
-        # bitbucket diff has a header for each file, we need to remove it:
-        # "diff --git filename
-        # new file mode 100644 (optional)
-        #  index caa56f0..61528d7 100644
-        #   --- a/pr_agent/cli_pip.py
-        #  +++ b/pr_agent/cli_pip.py
-        #   @@ -... @@"
-        for i, _ in enumerate(diff_split):
-            diff_split_lines = diff_split[i].splitlines()
-            if (len(diff_split_lines) >= 6) and \
-                    ((diff_split_lines[2].startswith("---") and
-                      diff_split_lines[3].startswith("+++") and
-                      diff_split_lines[4].startswith("@@")) or
-                     (diff_split_lines[3].startswith("---") and  # new or deleted file
-                      diff_split_lines[4].startswith("+++") and
-                      diff_split_lines[5].startswith("@@"))):
-                diff_split[i] = "\n".join(diff_split_lines[4:])
+        # get the pr patches, streamed and split per file, keeping only the patches of the files in 'diffs'
+        file_paths = {_gef_filename(diff) for diff in diffs}
+        patches = {}
+        with requests.get(self.bitbucket_pull_request_api_url + "/diff", headers=self.headers, stream=True) as response:
+            response.raise_for_status()
+            for old_path, new_path, patch in iter_file_patches(response.iter_content(DIFF_STREAM_CHUNK_BYTES)):
+                path = new_path or old_path
+                if path in file_paths:
+                    patches[path] = patch
+        for diff in diffs:
+            file_path = _gef_filename(diff)
+            if patches.get(file_path):
+                continue
+            if diff.data.get('lines_added', 0) == 0 and diff.data.get('lines_removed', 0) == 0:
+                get_logger().info(f"Disregarding empty diff for file {file_path}")
             else:
-                if diffs[i].data.get('lines_added', 0) == 0 and diffs[i].data.get('lines_removed', 0) == 0:
-                    diff_split[i] = ""
-                elif len(diff_split_lines) <= 3:
-                    diff_split[i] = ""
-                    get_logger().info(f"Disregarding empty diff for file {_gef_filename(diffs[i])}")
-                else:
-                    get_logger().warning(f"Bitbucket failed to get diff for file {_gef_filename(diffs[i])}")
-                    diff_split[i] = ""
+                get_logger().warning(f"Bitbucket failed to get diff for file {file_path}")
+            patches[file_path] = ""
 
         invalid_files_names = []
         diff_files = []
         counter_valid = 0
         # get full files
-        for index, diff in enumerate(diffs):
+        for diff in diffs:
             file_path = _gef_filename(diff)
             if not is_valid_file(file_path):
                 invalid_files_names.append(file_path)
@@ -270,7 +311,7 @@ class BitbucketProvider(GitProvider):
             file_patch_canonic_structure = FilePatchInfo(
                 original_file_content_str,
                 new_file_content_str,
-                diff_split[index],
+                patches[file_path],
                 file_path,
             )
 
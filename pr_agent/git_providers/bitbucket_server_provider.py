@@ -1,9 +1,10 @@
 import difflib
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 from packaging.version import parse as parse_version
-from typing import Optional, Tuple
-from urllib.parse import quote_plus, urlparse
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, quote_plus, urlparse
 
 from atlassian.bitbucket import Bitbucket
 from requests.exceptions import HTTPError
@@ -11,11 +12,14 @@ from requests.exceptions import HTTPError
 from ..algo.git_patch_processing import decode_if_bytes
 from ..algo.language_handler import is_valid_file
 from ..algo.types import EDIT_TYPE, FilePatchInfo
-from ..algo.utils import (find_line_number_of_relevant_line_in_file,
+from ..algo.utils import (LRUCache, find_line_number_of_relevant_line_in_file,
                           load_large_diff)
 from ..config_loader import get_settings
 from ..log import get_logger
-from .git_provider import GitProvider
+from .git_provider import MAX_FILES_ALLOWED_FULL, GitProvider
+
+# merge bases by (server, project, repo, source commit, destination commit) - the commits never change
+_MERGE_BASE_CACHE = LRUCache(max_size=1000)
 
 
 class BitbucketServerProvider(GitProvider):
@@ -170,11 +174,17 @@ class BitbucketServerProvider(GitProvider):
 
         return guaranteed_common_ancestor
 
-    def get_diff_files(self) -> list[FilePatchInfo]:
-        if self.diff_files:
-            return self.diff_files
-
-        head_sha = self.pr.fromRef['latestCommit']
+    def _get_base_sha(self, head_sha: str) -> str:
+        """
+        The commit to diff the PR head against: the best common ancestor of the source and destination branches when
+        the Bitbucket version allows finding it (cached per source and destination commits), and otherwise the
+        parent of the first commit of the PR.
+        """
+        destination_sha = self.pr.toRef['latestCommit']
+        cache_key = (self.bitbucket_server_url, self.workspace_slug, self.repo_slug, head_sha, destination_sha)
+        base_sha = _MERGE_BASE_CACHE.get(cache_key)
+        if base_sha:
+            return base_sha
 
         # if Bitbucket api version is >= 8.16 then use the merge-base api for 2-way diff calculation
         if self.bitbucket_api_version is not None and self.bitbucket_api_version >= parse_version("8.16"):
@@ -191,50 +201,71 @@ class BitbucketServerProvider(GitProvider):
             ))
             # if Bitbucket api version is None or < 7.0 then do a simple diff with a guaranteed common ancestor
             base_sha = source_commits_list[-1]['parents'][0]['id']
+            if self.bitbucket_api_version is None or self.bitbucket_api_version < parse_version("7.0"):
+                return base_sha
             # if Bitbucket api version is 7.0-8.15 then use 2-way diff functionality for the base_sha
-            if self.bitbucket_api_version is not None and self.bitbucket_api_version >= parse_version("7.0"):
-                try:
-                    destination_commits = list(
-                        self.bitbucket_client.get_commits(self.workspace_slug, self.repo_slug, base_sha,
-                                                          self.pr.toRef['latestCommit']))
-                    base_sha = self.get_best_common_ancestor(source_commits_list, destination_commits, base_sha)
-                except Exception as e:
-                    get_logger().error(
-                        f"Failed to get the commit list for calculating best common ancestor for PR: {self.pr_url}, \nerror: {e}")
-                    raise e
+            try:
+                destination_commits = list(
+                    self.bitbucket_client.get_commits(self.workspace_slug, self.repo_slug, base_sha,
+                                                      destination_sha))
+                base_sha = self.get_best_common_ancestor(source_commits_list, destination_commits, base_sha)
+            except Exception as e:
+                get_logger().error(
+                    f"Failed to get the commit list for calculating best common ancestor for PR: {self.pr_url}, \nerror: {e}")
+                raise e
+        _MERGE_BASE_CACHE.set(cache_key, base_sha)
+        return base_sha
 
-        diff_files = []
-        original_file_content_str = ""
-        new_file_content_str = ""
+    def get_diff_files(self) -> list[FilePatchInfo]:
+        if self.diff_files:
+            return self.diff_files
 
-        changes = self.bitbucket_client.get_pull_requests_changes(self.workspace_slug, self.repo_slug, self.pr_num)
-        for change in changes:
+        head_sha = self.pr.fromRef['latestCommit']
+        base_sha = self._get_base_sha(head_sha)
+
+        changes = []
+        for change in self.bitbucket_client.get_pull_requests_changes(self.workspace_slug, self.repo_slug, self.pr_num):
             file_path = change['path']['toString']
             if not is_valid_file(file_path.split("/")[-1]):
                 get_logger().info(f"Skipping a non-code file: {file_path}")
                 continue
+            changes.append(change)
+
+        # allow only a limited number of files to be fully loaded. The patches of the next files (up to
+        # 'max_files_with_patch') are read from the diff API, and the rest of the files are listed without a patch
+        changes_to_load = changes[:MAX_FILES_ALLOWED_FULL - 1]
+        max_files_with_patch = max(len(changes_to_load),
+                                   int(get_settings().get("BITBUCKET_SERVER.MAX_FILES_WITH_PATCH", 300)))
+        changes_with_patch = changes[len(changes_to_load):max_files_with_patch]
+        if changes_with_patch:
+            get_logger().info("Too many files in PR, will avoid loading full content for rest of files")
+        if len(changes) > max_files_with_patch:
+            get_logger().warning(f"Too many files in PR, the patches of {len(changes) - max_files_with_patch} files "
+                                 f"are not loaded",
+                                 artifact={"files": [change['path']['toString']
+                                                     for change in changes[max_files_with_patch:]]})
+        files_contents = self._load_files_contents(changes_to_load, base_sha, head_sha)
+        files_patches = self._load_files_patches(changes_with_patch)
 
+        diff_files = []
+        for change in changes:
+            file_path = change['path']['toString']
             match change['type']:
                 case 'ADD':
                     edit_type = EDIT_TYPE.ADDED
-                    new_file_content_str = self.get_file(file_path, head_sha)
-                    new_file_content_str = decode_if_bytes(new_file_content_str)
-                    original_file_content_str = ""
                 case 'DELETE':
                     edit_type = EDIT_TYPE.DELETED
-                    new_file_content_str = ""
-                    original_file_content_str = self.get_file(file_path, base_sha)
-                    original_file_content_str = decode_if_bytes(original_file_content_str)
                 case 'RENAME':
                     edit_type = EDIT_TYPE.RENAMED
                 case _:
                     edit_type = EDIT_TYPE.MODIFIED
-                    original_file_content_str = self.get_file(file_path, base_sha)
-                    original_file_content_str = decode_if_bytes(original_file_content_str)
-                    new_file_content_str = self.get_file(file_path, head_sha)
-                    new_file_content_str = decode_if_bytes(new_file_content_str)
+            original_file_content_str, new_file_content_str = files_contents.get(file_path, ("", ""))
 
-            patch = load_large_diff(file_path, new_file_content_str, original_file_content_str, show_warning=False)
+            if file_path in files_patches:
+                patch = files_patches[file_path]
+            else:
+                patch = load_large_diff(file_path, new_file_content_str, original_file_content_str,
+                                        show_warning=False)
 
             diff_files.append(
                 FilePatchInfo(
@@ -249,6 +280,74 @@ class BitbucketServerProvider(GitProvider):
         self.diff_files = diff_files
         return diff_files
 
+    def _load_files_contents(self, changes: list, base_sha: str, head_sha: str) -> Dict[str, Tuple[str, str]]:
+        """
+        Loads the (original, new) content of the changed files concurrently. Added files have no original content,
+        deleted files have no new content, and the original content of renamed files is read from their source path.
+        """
+        if not changes:
+            return {}
+
+        def load(path: Optional[str], commit_id: str) -> str:
+            if not path:
+                return ""
+            return decode_if_bytes(self.get_file(path, commit_id))
+
+        def original_path(change: dict) -> Optional[str]:
+            if change['type'] == 'ADD':
+                return None
+            if change['type'] == 'RENAME':
+                return (change.get('srcPath') or {}).get('toString')
+            return change['path']['toString']
+
+        def new_path(change: dict) -> Optional[str]:
+            return None if change['type'] == 'DELETE' else change['path']['toString']
+
+        max_workers = max(1, int(get_settings().get("BITBUCKET_SERVER.MAX_PARALLEL_FILE_REQUESTS", 8)))
+        with ThreadPoolExecutor(max_workers=min(max_workers, 2 * len(changes))) as executor:
+            futures = {change['path']['toString']: (executor.submit(load, original_path(change), base_sha),
+                                                    executor.submit(load, new_path(change), head_sha))
+                       for change in changes}
+            return {file: (original.result(), new.result()) for file, (original, new) in futures.items()}
+
+    def _load_files_patches(self, changes: list) -> Dict[str, str]:
+        """
+        Loads the patches of the changed files concurrently from the diff API, without their contents.
+        """
+        if not changes:
+            return {}
+
+        def load(change: dict) -> str:
+            try:
+                return self._get_file_patch(change)
+            except Exception as e:
+                get_logger().error(f"Failed to get the diff of {change['path']['toString']}, error: {e}")
+                return ""
+
+        max_workers = max(1, int(get_settings().get("BITBUCKET_SERVER.MAX_PARALLEL_FILE_REQUESTS", 8)))
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(changes))) as executor:
+            futures = {change['path']['toString']: executor.submit(load, change) for change in changes}
+            return {file: future.result() for file, future in futures.items()}
+
+    def _get_file_patch(self, change: dict) -> str:
+        """
+        Returns the unified patch of a changed file, built from the hunks returned by the diff API.
+        """
+        params = {}
+        if change['type'] == 'RENAME' and change.get('srcPath'):
+            params['srcPath'] = change['srcPath']['toString']
+        diff = self.bitbucket_client.get(self._get_file_diff(change['path']['toString']), params=params) or {}
+        prefixes = {'ADDED': '+', 'REMOVED': '-'}
+        patch_lines = []
+        for file_diff in diff.get('diffs', []):
+            for hunk in file_diff.get('hunks', []):
+                patch_lines.append(f"@@ -{hunk['sourceLine']},{hunk['sourceSpan']} "
+                                   f"+{hunk['destinationLine']},{hunk['destinationSpan']} @@")
+                for segment in hunk.get('segments', []):
+                    prefix = prefixes.get(segment['type'], ' ')
+                    patch_lines.extend(prefix + line['line'] for line in segment.get('lines', []))
+        return "\n".join(patch_lines)
+
     def publish_comment(self, pr_comment: str, is_temporary: bool = False):
         if not is_temporary:
             self.bitbucket_client.add_pull_request_comment(self.workspace_slug, self.repo_slug, self.pr_num, pr_comment)
@@ -481,3 +580,7 @@ class BitbucketServerProvider(GitProvider):
 
     def _get_merge_base(self):
         return f"rest/api/latest/projects/{self.workspace_slug}/repos/{self.repo_slug}/pull-requests/{self.pr_num}/merge-base"
+
+    def _get_file_diff(self, path: str):
+        return (f"rest/api/latest/projects/{self.workspace_slug}/repos/{self.repo_slug}/pull-requests/{self.pr_num}"
+                f"/diff/{quote(path)}")
@@ -1,3 +1,5 @@
+import threading
+
 import boto3
 import botocore
 
@@ -53,6 +55,7 @@ class CodeCommitClient:
 
     def __init__(self):
         self.boto_client = None
+        self._boto_client_lock = threading.Lock()
 
     def is_supported(self, capability: str) -> bool:
         if capability in ["gfm_markdown"]:
@@ -65,6 +68,13 @@ class CodeCommitClient:
         except Exception as e:
             raise ValueError(f"Failed to connect to AWS CodeCommit: {e}") from e
 
+    def _get_boto_client(self):
+        # the boto client is thread-safe, and is shared by concurrent requests
+        with self._boto_client_lock:
+            if self.boto_client is None:
+                self._connect_boto_client()
+        return self.boto_client
+
     def get_differences(self, repo_name: int, destination_commit: str, source_commit: str):
         """
         Get the differences between two commits in CodeCommit.
@@ -144,6 +154,38 @@ class CodeCommitClient:
 
         return response.get("fileContent", "")
 
+    def get_blob(self, repo_name: str, blob_id: str) -> bytes:
+        """
+        Retrieve the content of a blob (a file at a specific version) from CodeCommit.
+        Safe to call concurrently.
+
+        Args:
+        - repo_name: Name of the repository
+        - blob_id: ID of the blob, as returned by get_differences()
+
+        Returns:
+        - Blob content
+
+        Boto3 Documentation:
+        - aws codecommit get_blob
+        - https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/codecommit/client/get_blob.html
+        """
+        if not blob_id:
+            return b""
+
+        boto_client = self._get_boto_client()
+
+        try:
+            response = boto_client.get_blob(repositoryName=repo_name, blobId=blob_id)
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == 'RepositoryDoesNotExistException':
+                raise ValueError(f"CodeCommit cannot retrieve blob: Repository does not exist: {repo_name}") from e
+            raise ValueError(f"CodeCommit cannot retrieve blob '{blob_id}' from repository '{repo_name}'") from e
+        except Exception as e:
+            raise ValueError(f"CodeCommit cannot retrieve blob '{blob_id}' from repository '{repo_name}'") from e
+
+        return response.get("content", b"")
+
     def get_pr(self, repo_name: str, pr_number: int):
         """
         Get a information about a CodeCommit PR.
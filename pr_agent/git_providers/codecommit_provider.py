@@ -1,7 +1,8 @@
 import os
 import re
 from collections import Counter
-from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 from pr_agent.algo.language_handler import is_valid_file
@@ -13,6 +14,8 @@ from ..config_loader import get_settings
 from ..log import get_logger
 from .git_provider import GitProvider
 
+MAX_PARALLEL_BLOB_REQUESTS = 8
+
 
 class PullRequestCCMimic:
     """
@@ -115,23 +118,23 @@ class CodeCommitProvider(GitProvider):
 
         self.diff_files = []
 
-        files = self.get_files()
+        # Only add valid files to the diff list
+        # "bad extensions" are set in the language_extensions.toml file
+        # a "valid file" is one that is not in the "bad extensions" list
+        files = [diff_item for diff_item in self.get_files() if is_valid_file(diff_item.b_path)]
+        blobs = self._get_blobs({blob_id for diff_item in files
+                                 for blob_id in (diff_item.a_blob_id, diff_item.b_blob_id) if blob_id})
         for diff_item in files:
             patch_filename = ""
-            if diff_item.a_blob_id is not None:
+            if diff_item.a_blob_id:
                 patch_filename = diff_item.a_path
-                original_file_content_str = self.codecommit_client.get_file(
-                    self.repo_name, diff_item.a_path, self.pr.destination_commit)
-                if isinstance(original_file_content_str, (bytes, bytearray)):
-                    original_file_content_str = original_file_content_str.decode("utf-8")
+                original_file_content_str = blobs[diff_item.a_blob_id]
             else:
                 original_file_content_str = ""
 
-            if diff_item.b_blob_id is not None:
+            if diff_item.b_blob_id:
                 patch_filename = diff_item.b_path
-                new_file_content_str = self.codecommit_client.get_file(self.repo_name, diff_item.b_path, self.pr.source_commit)
-                if isinstance(new_file_content_str, (bytes, bytearray)):
-                    new_file_content_str = new_file_content_str.decode("utf-8")
+                new_file_content_str = blobs[diff_item.b_blob_id]
             else:
                 new_file_content_str = ""
 
@@ -148,14 +151,27 @@ class CodeCommitProvider(GitProvider):
                 if diff_item.a_path == diff_item.b_path
                 else diff_item.a_path,
             )
-            # Only add valid files to the diff list
-            # "bad extensions" are set in the language_extensions.toml file
-            # a "valid file" is one that is not in the "bad extensions" list
-            if is_valid_file(info.filename):
-                self.diff_files.append(info)
+            self.diff_files.append(info)
 
         return self.diff_files
 
+    def _get_blobs(self, blob_ids: Set[str]) -> Dict[str, str]:
+        """
+        Retrieves the content of the blobs concurrently, as strings.
+        """
+        if not blob_ids:
+            return {}
+
+        def get_blob(blob_id: str) -> str:
+            content = self.codecommit_client.get_blob(self.repo_name, blob_id)
+            if isinstance(content, (bytes, bytearray)):
+                content = content.decode("utf-8")
+            return content
+
+        blob_ids = sorted(blob_ids)
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_BLOB_REQUESTS, len(blob_ids))) as executor:
+            return dict(zip(blob_ids, executor.map(get_blob, blob_ids)))
+
     def publish_description(self, pr_title: str, pr_body: str):
         try:
             self.codecommit_client.publish_description(
@@ -1,21 +1,28 @@
+import hashlib
 import json
 import os
 import pathlib
+import re
 import shutil
 import subprocess
+import tempfile
 import uuid
-from collections import Counter, namedtuple
+import weakref
+from collections import defaultdict, namedtuple
 from pathlib import Path
-from tempfile import NamedTemporaryFile, mkdtemp
+from tempfile import NamedTemporaryFile
+from threading import Lock
 
 import requests
 import urllib3.util
 from git import Repo
 
-from pr_agent.algo.types import EDIT_TYPE, FilePatchInfo
+from pr_agent.algo.types import FilePatchInfo
 from pr_agent.config_loader import get_settings
 from pr_agent.git_providers.git_provider import GitProvider
-from pr_agent.git_providers.local_git_provider import PullRequestMimic
+from pr_agent.git_providers.local_git_provider import (PullRequestMimic,
+                                                       get_tree_languages,
+                                                       iter_diff_files)
 from pr_agent.log import get_logger
 
 
@@ -30,12 +37,6 @@ def _call(*command, **kwargs) -> (int, str, str):
     return res.stdout.decode()
 
 
-def clone(url, directory):
-    get_logger().info("Cloning %s to %s", url, directory)
-    stdout = _call('git', 'clone', "--depth", "1", url, directory)
-    get_logger().info(stdout)
-
-
 def fetch(url, refspec, cwd):
     get_logger().info("Fetching %s %s", url, refspec)
     stdout = _call(
@@ -45,12 +46,6 @@ def fetch(url, refspec, cwd):
     get_logger().info(stdout)
 
 
-def checkout(cwd):
-    get_logger().info("Checking out")
-    stdout = _call('git', 'checkout', "FETCH_HEAD", cwd=cwd)
-    get_logger().info(stdout)
-
-
 def show(*args, cwd=None):
     get_logger().info("Show")
     return _call('git', 'show', *args, cwd=cwd)
@@ -99,13 +94,105 @@ def list_comments(url: urllib3.util.Url, refspec):
     return json.loads(change_set)["currentPatchSet"]["comments"]
 
 
+MIRRORS_CACHE_DIR_NAME = "pr_agent_gerrit_mirrors"
+WORKTREE_REF_PREFIX = "refs/pr-agent/"
+
+# one lock per mirror, held while fetching into it and adding or removing its worktrees
+_mirror_locks = defaultdict(Lock)
+_mirror_locks_lock = Lock()
+
+
+# the worktrees of this process that a provider still uses, which the cleanup must not remove. Only updated with
+# atomic set operations, since a worktree is released by the garbage collector (see 'GerritProvider.__init__')
+_live_worktrees = set()
+
+
+def _get_mirror_lock(mirror: Path) -> Lock:
+    with _mirror_locks_lock:
+        return _mirror_locks[str(mirror)]
+
+
+def get_mirrors_cache_dir() -> Path:
+    cache_dir = get_settings().get("gerrit.mirror_cache_dir", "")
+    return Path(cache_dir or os.path.join(tempfile.gettempdir(), MIRRORS_CACHE_DIR_NAME))
+
+
+def _get_project_dir(cache_dir: Path, project: str) -> Path:
+    # a readable name, with a hash to tell apart projects that only differ by special characters
+    readable_name = re.sub(r"[^A-Za-z0-9._-]", "_", project)[-60:]
+    return cache_dir / f"{readable_name}-{hashlib.sha1(project.encode()).hexdigest()[:8]}"
+
+
+def prepare_worktree(repo_url: str, project, refspec, cache_dir: Path) -> Path:
+    """
+    Checks out the refspec in a new worktree of the bare mirror of the project, creating the mirror on first use.
+    Only the objects of the refspec that the mirror does not have yet are fetched.
+    """
+    project_dir = _get_project_dir(cache_dir, project)
+    mirror = project_dir / "mirror.git"
+    worktree_id = uuid.uuid4().hex
+    worktree = project_dir / "worktrees" / worktree_id
+    # each worktree pins its commit with its own ref, deleted with the worktree
+    worktree_ref = WORKTREE_REF_PREFIX + worktree_id
+    with _get_mirror_lock(mirror):
+        if not (mirror / "HEAD").exists():
+            get_logger().info("Creating a mirror of %s in %s", project, mirror)
+            mirror.mkdir(parents=True, exist_ok=True)
+            _call('git', 'init', '--bare', '--quiet', cwd=mirror)
+        fetch(repo_url, f"+{refspec}:{worktree_ref}", cwd=mirror)
+        try:
+            _call('git', 'worktree', 'add', '--detach', str(worktree), worktree_ref, cwd=mirror)
+        except Exception:
+            _call('git', 'update-ref', '-d', worktree_ref, cwd=mirror)
+            raise
+        _live_worktrees.add(str(worktree))
+    return worktree
+
+
+def release_worktree(worktree: str):
+    """
+    Marks a worktree as no longer used, so the cleanup may remove it.
+    """
+    _live_worktrees.discard(str(worktree))
+
+
+def remove_worktree(worktree: Path):
+    mirror = worktree.parent.parent / "mirror.git"
+    with _get_mirror_lock(mirror):
+        shutil.rmtree(worktree, ignore_errors=True)
+        _call('git', 'worktree', 'prune', cwd=mirror)
+        _call('git', 'update-ref', '-d', WORKTREE_REF_PREFIX + worktree.name, cwd=mirror)
+        # the objects of removed worktrees are collected once there are enough of them
+        _call('git', 'gc', '--auto', '--quiet', cwd=mirror)
+
+
+def cleanup_worktrees(cache_dir: Path, max_worktrees: int):
+    """
+    Removes the least recently created worktrees of all the mirrors, keeping at most 'max_worktrees'. Worktrees still
+    used by a provider of this process are never removed.
+    """
+    worktrees = []
+    for worktree in cache_dir.glob("*/worktrees/*"):
+        try:
+            worktrees.append((worktree.stat().st_mtime, worktree))
+        except FileNotFoundError:
+            continue  # removed by a concurrent cleanup
+    worktrees.sort(reverse=True)
+    for _, worktree in worktrees[max(max_worktrees, 1):]:
+        if str(worktree) in _live_worktrees:
+            continue
+        try:
+            remove_worktree(worktree)
+        except Exception as e:
+            get_logger().warning(f"Failed to remove the worktree {worktree}, error: {e}")
+
+
 def prepare_repo(url: urllib3.util.Url, project, refspec):
     repo_url = (f"{url.scheme}://{url.auth}@{url.host}:{url.port}/{project}")
 
-    directory = pathlib.Path(mkdtemp())
-    clone(repo_url, directory),
-    fetch(repo_url, refspec, cwd=directory)
-    checkout(cwd=directory)
+    cache_dir = get_mirrors_cache_dir()
+    directory = prepare_worktree(repo_url, project, refspec, cache_dir)
+    cleanup_worktrees(cache_dir, get_settings().get("gerrit.max_cached_worktrees", 20))
     return directory
 
 
@@ -173,6 +260,8 @@ def upload_patch(patch, path):
 
 
 class GerritProvider(GitProvider):
+    # the calls share the git process of one GitPython Repo, which is not thread-safe
+    supports_concurrent_metadata = False
 
     def __init__(self, key: str, incremental=False):
         self.project, self.refspec = key.split(':')
@@ -191,8 +280,11 @@ class GerritProvider(GitProvider):
         self.repo_path = prepare_repo(
             self.parsed_url, self.project, self.refspec
         )
+        # the worktree may be removed by the cleanup once the provider is no longer used
+        weakref.finalize(self, release_worktree, str(self.repo_path))
         self.repo = Repo(self.repo_path)
         assert self.repo
+        self._blob_lock = Lock()
         self.pr_url = base_url
         self.pr = PullRequestMimic(self.get_pr_title(), self.get_diff_files())
 
@@ -200,7 +292,10 @@ class GerritProvider(GitProvider):
         """
         Substitutes the branch-name as the PR-mimic title.
         """
-        return self.repo.branches[0].name
+        # the worktrees of the mirror are detached, and the mirror has no branches of its own
+        if self.repo.branches:
+            return self.repo.branches[0].name
+        return self.refspec
 
     def get_issue_comments(self):
         comments = list_comments(self.parsed_url, self.refspec)
@@ -238,38 +333,8 @@ class GerritProvider(GitProvider):
             R=True
         )
 
-        diff_files = []
-        for diff_item in diffs:
-            if diff_item.a_blob is not None:
-                original_file_content_str = (
-                    diff_item.a_blob.data_stream.read().decode('utf-8')
-                )
-            else:
-                original_file_content_str = ""  # empty file
-            if diff_item.b_blob is not None:
-                new_file_content_str = diff_item.b_blob.data_stream.read(). \
-                    decode('utf-8')
-            else:
-                new_file_content_str = ""  # empty file
-            edit_type = EDIT_TYPE.MODIFIED
-            if diff_item.new_file:
-                edit_type = EDIT_TYPE.ADDED
-            elif diff_item.deleted_file:
-                edit_type = EDIT_TYPE.DELETED
-            elif diff_item.renamed_file:
-                edit_type = EDIT_TYPE.RENAMED
-            diff_files.append(
-                FilePatchInfo(
-                    original_file_content_str,
-                    new_file_content_str,
-                    diff_item.diff.decode('utf-8'),
-                    diff_item.b_path,
-                    edit_type=edit_type,
-                    old_filename=None
-                    if diff_item.a_path == diff_item.b_path
-                    else diff_item.a_path
-                )
-            )
+        diff_files = list(iter_diff_files(diffs, get_settings().config.get('max_file_content_bytes', 0),
+                                          self._blob_lock))
         self.diff_files = diff_files
         return diff_files
 
@@ -287,18 +352,7 @@ class GerritProvider(GitProvider):
         Calculate percentage of languages in repository. Used for hunk
         prioritisation.
         """
-        # Get all files in repository
-        filepaths = [Path(item.path) for item in
-                     self.repo.tree().traverse() if item.type == 'blob']
-        # Identify language by file extension and count
-        lang_count = Counter(
-            ext.lstrip('.') for filepath in filepaths for ext in
-            [filepath.suffix.lower()])
-        # Convert counts to percentages
-        total_files = len(filepaths)
-        lang_percentage = {lang: count / total_files * 100 for lang, count
-                           in lang_count.items()}
-        return lang_percentage
+        return get_tree_languages(self.repo, self.repo.head.commit.tree.hexsha)
 
     def get_pr_description_full(self):
         return self.repo.head.commit.message
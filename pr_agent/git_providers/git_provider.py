@@ -1,6 +1,10 @@
+import contextvars
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 # enum EDIT_TYPE (ADDED, DELETED, MODIFIED, RENAMED)
-from typing import Optional
+from types import MappingProxyType
+from typing import Optional, Tuple
 
 from pr_agent.algo.types import FilePatchInfo
 from pr_agent.algo.utils import Range, process_description
@@ -8,8 +12,14 @@ from pr_agent.config_loader import get_settings
 from pr_agent.log import get_logger
 
 MAX_FILES_ALLOWED_FULL = 50
+PR_METADATA_FIELDS = ('languages', 'files', 'branch', 'description_full', 'user_description', 'commit_messages')
+MAX_PARALLEL_METADATA_REQUESTS = 6
 
 class GitProvider(ABC):
+    # False for providers whose calls share a resource that is not thread-safe (e.g. the git process of a GitPython
+    # Repo), so that 'prefetch_pr_metadata' runs their getters one after the other
+    supports_concurrent_metadata = True
+
     @abstractmethod
     def is_supported(self, capability: str) -> bool:
         pass
@@ -62,19 +72,8 @@ class GitProvider(ABC):
         pass
 
     def get_pr_description(self, full: bool = True, split_changes_walkthrough=False) -> str or tuple:
-        from pr_agent.algo.utils import clip_tokens
-        from pr_agent.config_loader import get_settings
-        max_tokens_description = get_settings().get("CONFIG.MAX_DESCRIPTION_TOKENS", None)
         description = self.get_pr_description_full() if full else self.get_user_description()
-        if split_changes_walkthrough:
-            description, files = process_description(description)
-            if max_tokens_description:
-                description = clip_tokens(description, max_tokens_description)
-            return description, files
-        else:
-            if max_tokens_description:
-                description = clip_tokens(description, max_tokens_description)
-            return description
+        return process_pr_description(description, split_changes_walkthrough)
 
     def get_user_description(self) -> str:
         if hasattr(self, 'user_description') and not (self.user_description is None):
@@ -262,6 +261,73 @@ class GitProvider(ABC):
     def limit_output_characters(self, output: str, max_chars: int):
         return output[:max_chars] + '...' if len(output) > max_chars else output
 
+    def prefetch_pr_metadata(self, fields: Tuple[str, ...] = PR_METADATA_FIELDS) -> "PRMetadata":
+        """
+        Fetches the PR metadata that the tools need in a single parallel wave, instead of one request after the other
+        (sequentially for providers without 'supports_concurrent_metadata').
+        Fields that were not requested are None in the returned snapshot. Errors of the provider calls are raised.
+        """
+        getters = {
+            'languages': self.get_languages,
+            'files': self.get_files,
+            'branch': self.get_pr_branch,
+            'description_full': self.get_pr_description_full,
+            'user_description': self.get_user_description,
+            'commit_messages': self.get_commit_messages,
+        }
+        unknown_fields = set(fields) - set(getters)
+        if unknown_fields:
+            raise ValueError(f"Unknown PR metadata fields: {sorted(unknown_fields)}")
+        if self.supports_concurrent_metadata:
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_METADATA_REQUESTS, len(fields) or 1)) as executor:
+                # each call runs in a copy of the current context, so request-scoped caches stay visible to the
+                # providers
+                futures = {name: executor.submit(contextvars.copy_context().run, getters[name]) for name in fields}
+                values = {name: future.result() for name, future in futures.items()}
+        else:
+            values = {name: getters[name]() for name in fields}
+        if values.get('languages') is not None:
+            values['languages'] = MappingProxyType(dict(values['languages']))
+        if values.get('files') is not None:
+            values['files'] = tuple(values['files'])
+        return PRMetadata(**values)
+
+
+def process_pr_description(description: str, split_changes_walkthrough=False) -> str or tuple:
+    """
+    Clips a PR description to 'config.max_description_tokens'. With 'split_changes_walkthrough', the files
+    walkthrough of a description generated by the pr-agent is split from it, and (description, files) is returned.
+    """
+    from pr_agent.algo.utils import clip_tokens
+    max_tokens_description = get_settings().get("CONFIG.MAX_DESCRIPTION_TOKENS", None)
+    if split_changes_walkthrough:
+        description, files = process_description(description)
+        if max_tokens_description:
+            description = clip_tokens(description, max_tokens_description)
+        return description, files
+    else:
+        if max_tokens_description:
+            description = clip_tokens(description, max_tokens_description)
+        return description
+
+
+@dataclass(frozen=True)
+class PRMetadata:
+    """
+    An immutable snapshot of the PR metadata, fetched once by 'GitProvider.prefetch_pr_metadata'.
+    """
+    languages: Optional[MappingProxyType] = None
+    files: Optional[tuple] = None
+    branch: Optional[str] = None
+    description_full: Optional[str] = None
+    user_description: Optional[str] = None
+    commit_messages: Optional[str] = None
+
+    def get_pr_description(self, full: bool = True, split_changes_walkthrough=False) -> str or tuple:
+        # same as 'GitProvider.get_pr_description', without another provider call
+        description = self.description_full if full else self.user_description
+        return process_pr_description(description or "", split_changes_walkthrough)
+
 
 def get_main_pr_language(languages, files) -> str:
     """
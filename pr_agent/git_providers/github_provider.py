@@ -29,6 +29,9 @@ from .git_provider import (MAX_FILES_ALLOWED_FULL, FilePatchInfo, GitProvider,
 
 
 class GithubProvider(GitProvider):
+    # the calls share the connection of one PyGithub Requester, which is not thread-safe
+    supports_concurrent_metadata = False
+
     def __init__(self, pr_url: Optional[str] = None):
         self.repo_obj = None
         try:
@@ -200,6 +203,7 @@ class GithubProvider(GitProvider):
                     continue
 
                 patch = file.patch
+                content_loader = None
                 if is_close_to_rate_limit:
                     new_file_content_str = ""
                     original_file_content_str = ""
@@ -212,23 +216,29 @@ class GithubProvider(GitProvider):
                         if counter_valid == MAX_FILES_ALLOWED_FULL:
                             get_logger().info(f"Too many files in PR, will avoid loading full content for rest of files")
 
-                    if avoid_load:
-                        new_file_content_str = ""
-                    else:
-                        new_file_content_str = self._get_pr_file_content(file, self.pr.head.sha)  # communication with GitHub
-
-                    if self.incremental.is_incremental and self.unreviewed_files_set:
-                        original_file_content_str = self._get_pr_file_content(file, self.incremental.last_seen_commit_sha)
-                        patch = load_large_diff(file.filename, new_file_content_str, original_file_content_str)
-                        self.unreviewed_files_set[file.filename] = patch
+                    if patch and not avoid_load and not self.incremental.is_incremental:
+                        # the content is loaded on first access, since many commands only need the patch
+                        new_file_content_str = None
+                        original_file_content_str = None
+                        content_loader = self._get_file_content_loader(file, merge_base_commit.sha)
                     else:
                         if avoid_load:
-                            original_file_content_str = ""
+                            new_file_content_str = ""
                         else:
-                            original_file_content_str = self._get_pr_file_content(file, merge_base_commit.sha)
-                            # original_file_content_str = self._get_pr_file_content(file, self.pr.base.sha)
-                        if not patch:
+                            new_file_content_str = self._get_pr_file_content(file, self.pr.head.sha)  # communication with GitHub
+
+                        if self.incremental.is_incremental and self.unreviewed_files_set:
+                            original_file_content_str = self._get_pr_file_content(file, self.incremental.last_seen_commit_sha)
                             patch = load_large_diff(file.filename, new_file_content_str, original_file_content_str)
+                            self.unreviewed_files_set[file.filename] = patch
+                        else:
+                            if avoid_load:
+                                original_file_content_str = ""
+                            else:
+                                original_file_content_str = self._get_pr_file_content(file, merge_base_commit.sha)
+                                # original_file_content_str = self._get_pr_file_content(file, self.pr.base.sha)
+                            if not patch:
+                                patch = load_large_diff(file.filename, new_file_content_str, original_file_content_str)
 
 
                 if file.status == 'added':
@@ -255,7 +265,8 @@ class GithubProvider(GitProvider):
                 file_patch_canonical_structure = FilePatchInfo(original_file_content_str, new_file_content_str, patch,
                                                                file.filename, edit_type=edit_type,
                                                                num_plus_lines=num_plus_lines,
-                                                               num_minus_lines=num_minus_lines,)
+                                                               num_minus_lines=num_minus_lines,
+                                                               content_loader=content_loader)
                 diff_files.append(file_patch_canonical_structure)
             if invalid_files_names:
                 get_logger().info(f"Filtered out files with invalid extensions: {invalid_files_names}")
@@ -769,6 +780,13 @@ class GithubProvider(GitProvider):
     def _get_pr_file_content(self, file: FilePatchInfo, sha: str) -> str:
         return self.get_pr_file_content(file.filename, sha)
 
+    def _get_file_content_loader(self, file, base_sha: str):
+        head_sha = self.pr.head.sha
+
+        def load(version: str) -> str:
+            return self._get_pr_file_content(file, base_sha if version == 'base' else head_sha)  # communication with GitHub
+        return load
+
     def publish_labels(self, pr_types):
         try:
             label_color_map = {"Bug fix": "1d76db", "Tests": "e99695", "Bug fix with tests": "c5def5",
@@ -1,7 +1,9 @@
 import difflib
 import hashlib
 import re
-from typing import Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import gitlab
@@ -19,6 +21,20 @@ from ..config_loader import get_settings
 from ..log import get_logger
 from .git_provider import MAX_FILES_ALLOWED_FULL, GitProvider
 
+MR_DIFFS_PAGE_SIZE = 100
+# limits the concurrent file requests to each GitLab host, across all the merge requests handled by the process
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def _get_host_semaphore(gitlab_url: str) -> threading.BoundedSemaphore:
+    host = urlparse(gitlab_url).netloc or gitlab_url
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            max_requests = max(1, int(get_settings().get("GITLAB.MAX_PARALLEL_REQUESTS_PER_HOST", 16)))
+            _host_semaphores[host] = threading.BoundedSemaphore(max_requests)
+        return _host_semaphores[host]
+
 
 class DiffNotFoundError(Exception):
     """Raised when the diff for a merge request cannot be found."""
@@ -44,6 +60,7 @@ class GitLabProvider(GitProvider):
         self.mr = None
         self.diff_files = None
         self.git_files = None
+        self.mr_changes = None
         self.temp_comments = []
         self.pr_url = merge_request_url
         self._set_merge_request(merge_request_url)
@@ -74,7 +91,8 @@ class GitLabProvider(GitProvider):
 
     def get_pr_file_content(self, file_path: str, branch: str) -> str:
         try:
-            return self.gl.projects.get(self.id_project).files.get(file_path, branch).decode()
+            # 'lazy' avoids fetching the project itself before each file
+            return self.gl.projects.get(self.id_project, lazy=True).files.get(file_path, branch).decode()
         except GitlabGetError:
             # In case of file creation the method returns GitlabGetError (404 file not found).
             # In this case we return an empty string for the diff.
@@ -94,7 +112,7 @@ class GitLabProvider(GitProvider):
             return self.diff_files
 
         # filter files using [ignore] patterns
-        diffs_original = self.mr.changes()['changes']
+        diffs_original = self.get_mr_changes()
         diffs = filter_ignored(diffs_original, 'gitlab')
         if diffs != diffs_original:
             try:
@@ -107,24 +125,27 @@ class GitLabProvider(GitProvider):
             except Exception as e:
                 pass
 
-        diff_files = []
-        invalid_files_names = []
-        counter_valid = 0
-        for diff in diffs:
-            if not is_valid_file(diff['new_path']):
-                invalid_files_names.append(diff['new_path'])
-                continue
+        invalid_files_names = [diff['new_path'] for diff in diffs if not is_valid_file(diff['new_path'])]
+        diffs = [diff for diff in diffs if is_valid_file(diff['new_path'])]
 
-            # allow only a limited number of files to be fully loaded. We can manage the rest with diffs only
-            counter_valid += 1
-            if counter_valid < MAX_FILES_ALLOWED_FULL or not diff['diff']:
-                original_file_content_str = self.get_pr_file_content(diff['old_path'], self.mr.diff_refs['base_sha'])
-                new_file_content_str = self.get_pr_file_content(diff['new_path'], self.mr.diff_refs['head_sha'])
+        # allow only a limited number of files to be fully loaded. We can manage the rest with diffs only.
+        # files without a diff are loaded now, to generate their patch. The others are loaded on first access
+        diffs_to_load = [i for i, diff in enumerate(diffs) if not diff['diff']]
+        if len(diffs) >= MAX_FILES_ALLOWED_FULL:
+            get_logger().info(f"Too many files in PR, will avoid loading full content for rest of files")
+        files_contents = self._load_files_contents([diffs[i] for i in diffs_to_load])
+        contents_by_index = dict(zip(diffs_to_load, files_contents))
+
+        diff_files = []
+        for i, diff in enumerate(diffs):
+            content_loader = None
+            if i in contents_by_index:
+                original_file_content_str, new_file_content_str = contents_by_index[i]
+            elif i + 1 < MAX_FILES_ALLOWED_FULL:
+                original_file_content_str, new_file_content_str = None, None
+                content_loader = self._get_file_content_loader(diff)
             else:
-                if counter_valid == MAX_FILES_ALLOWED_FULL:
-                    get_logger().info(f"Too many files in PR, will avoid loading full content for rest of files")
-                original_file_content_str = ''
-                new_file_content_str = ''
+                original_file_content_str, new_file_content_str = '', ''
 
             try:
                 if isinstance(original_file_content_str, bytes):
@@ -160,16 +181,71 @@ class GitLabProvider(GitProvider):
                               edit_type=edit_type,
                               old_filename=None if diff['old_path'] == diff['new_path'] else diff['old_path'],
                               num_plus_lines=num_plus_lines,
-                              num_minus_lines=num_minus_lines, ))
+                              num_minus_lines=num_minus_lines,
+                              content_loader=content_loader))
         if invalid_files_names:
             get_logger().info(f"Filtered out files with invalid extensions: {invalid_files_names}")
 
         self.diff_files = diff_files
         return diff_files
 
+    def get_mr_changes(self) -> List[dict]:
+        """
+        Returns the changed files of the merge request, each with its paths, flags and diff.
+
+        The paginated merge request 'diffs' endpoint is preferred, since 'changes' returns all the files in one
+        response, and truncates it on large merge requests. Older GitLab versions, without the endpoint, use 'changes'.
+        """
+        if self.mr_changes is not None:
+            return self.mr_changes
+        try:
+            self.mr_changes = list(self.gl.http_list(f"{self.mr.manager.path}/{self.mr.iid}/diffs",
+                                                     query_data={'per_page': MR_DIFFS_PAGE_SIZE, 'unidiff': True},
+                                                     get_all=True))
+        except Exception as e:
+            get_logger().info(f"Failed to list the diffs of merge request {self.id_mr}, using its changes instead, "
+                              f"error: {e}")
+            self.mr_changes = self.mr.changes()['changes']
+        return self.mr_changes
+
+    def _load_files_contents(self, diffs: List[dict]) -> List[Tuple[str, str]]:
+        """
+        Loads the (original, new) content of the files of 'diffs' concurrently, in the order of 'diffs'.
+        """
+        if not diffs:
+            return []
+        base_sha, head_sha = self.mr.diff_refs['base_sha'], self.mr.diff_refs['head_sha']
+        host_semaphore = _get_host_semaphore(self.gitlab_url)
+
+        def load(file_path: str, sha: str) -> str:
+            with host_semaphore:
+                return self.get_pr_file_content(file_path, sha)
+
+        max_workers = max(1, int(get_settings().get("GITLAB.MAX_PARALLEL_FILE_REQUESTS", 8)))
+        with ThreadPoolExecutor(max_workers=min(max_workers, 2 * len(diffs))) as executor:
+            futures = [(executor.submit(load, diff['old_path'], base_sha),
+                        executor.submit(load, diff['new_path'], head_sha)) for diff in diffs]
+            return [(original.result(), new.result()) for original, new in futures]
+
+    def _get_file_content_loader(self, diff: dict):
+        base_sha, head_sha = self.mr.diff_refs['base_sha'], self.mr.diff_refs['head_sha']
+        host_semaphore = _get_host_semaphore(self.gitlab_url)
+
+        def load(version: str) -> str:
+            file_path, sha = (diff['old_path'], base_sha) if version == 'base' else (diff['new_path'], head_sha)
+            with host_semaphore:
+                content = self.get_pr_file_content(file_path, sha)
+            if isinstance(content, bytes):
+                try:
+                    content = bytes.decode(content, 'utf-8')
+                except UnicodeDecodeError:
+                    get_logger().warning(f"Cannot decode file {file_path} in merge request {self.id_mr}")
+            return content
+        return load
+
     def get_files(self) -> list:
         if not self.git_files:
-            self.git_files = [change['new_path'] for change in self.mr.changes()['changes']]
+            self.git_files = [change['new_path'] for change in self.get_mr_changes()]
         return self.git_files
 
     def publish_description(self, pr_title: str, pr_body: str):
@@ -325,7 +401,7 @@ class GitLabProvider(GitProvider):
                     get_logger().exception(f"Failed to create comment in MR {self.id_mr}")
 
     def get_relevant_diff(self, relevant_file: str, relevant_line_in_file: str) -> Optional[dict]:
-        changes = self.mr.changes()  # Retrieve the changes for the merge request once
+        changes = self.get_mr_changes()  # Retrieve the changes for the merge request once
         if not changes:
             get_logger().error('No changes found for the merge request.')
             return None
@@ -334,7 +410,7 @@ class GitLabProvider(GitProvider):
             get_logger().error('No diffs found for the merge request.')
             return None
         for diff in all_diffs:
-            for change in changes['changes']:
+            for change in changes:
                 if change['new_path'] == relevant_file and relevant_line_in_file in change['diff']:
                     return diff
             get_logger().debug(
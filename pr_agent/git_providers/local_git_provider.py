@@ -1,10 +1,14 @@
+import posixpath
+import subprocess
 from collections import Counter
-from pathlib import Path
-from typing import List
+from threading import Lock
+from typing import Iterable, Iterator, List
 
 from git import Repo
 
+from pr_agent.algo.git_patch_processing import decode_if_bytes
 from pr_agent.algo.types import EDIT_TYPE, FilePatchInfo
+from pr_agent.algo.utils import LRUCache
 from pr_agent.config_loader import _find_repository_root, get_settings
 from pr_agent.git_providers.git_provider import GitProvider
 from pr_agent.log import get_logger
@@ -20,6 +24,94 @@ class PullRequestMimic:
         self.diff_files = diff_files
 
 
+# git considers a file binary when its first 8000 bytes contain a NUL byte
+BINARY_DETECTION_BYTES = 8000
+BLOB_READ_CHUNK_BYTES = 64 * 1024
+
+
+def read_blob(blob, max_size: int) -> str:
+    """
+    Reads the content of a git blob as text, in chunks. Binary blobs and blobs larger than 'max_size' bytes (when
+    positive) are not read, and return "". Content that is not valid UTF-8 is decoded like 'decode_if_bytes'.
+    """
+    if blob is None:
+        return ""
+    if max_size > 0 and blob.size > max_size:
+        get_logger().info(f"Skipping the content of {blob.path}: {blob.size} bytes, above {max_size}")
+        return ""
+    stream = blob.data_stream
+    chunks = [stream.read(BINARY_DETECTION_BYTES)]
+    is_binary = b"\0" in chunks[0]
+    while True:
+        # the stream of a blob must be read to the end, even when its content is not used
+        chunk = stream.read(BLOB_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        if not is_binary:
+            chunks.append(chunk)
+    if is_binary:
+        return ""
+    return decode_if_bytes(b"".join(chunks))
+
+
+def iter_diff_files(diffs: Iterable, max_size: int, blob_lock: Lock) -> Iterator[FilePatchInfo]:
+    """
+    Converts GitPython diff items to FilePatchInfo objects, one at a time. The contents of the files are read from
+    their blobs on first access (see 'read_blob'), holding 'blob_lock', since the git process that streams the blobs
+    of a repository cannot serve several threads.
+    """
+    for diff_item in diffs:
+        def load(version: str, a_blob=diff_item.a_blob, b_blob=diff_item.b_blob) -> str:
+            with blob_lock:
+                return read_blob(a_blob if version == 'base' else b_blob, max_size)
+
+        edit_type = EDIT_TYPE.MODIFIED
+        if diff_item.new_file:
+            edit_type = EDIT_TYPE.ADDED
+        elif diff_item.deleted_file:
+            edit_type = EDIT_TYPE.DELETED
+        elif diff_item.renamed_file:
+            edit_type = EDIT_TYPE.RENAMED
+        yield FilePatchInfo(None, None,
+                            decode_if_bytes(diff_item.diff),
+                            diff_item.b_path,
+                            edit_type=edit_type,
+                            old_filename=None if diff_item.a_path == diff_item.b_path else diff_item.a_path,
+                            content_loader=load)
+
+
+# a tree SHA identifies the content of a tree, so its languages never change
+_TREE_LANGUAGES_CACHE = LRUCache(max_size=64)
+
+
+def get_tree_languages(repo: Repo, tree_sha: str) -> dict:
+    """
+    Calculate percentage of languages (file extensions) in a git tree. The file paths are streamed from a single
+    'git ls-tree' call, and the result is cached by tree SHA.
+    """
+    cached = _TREE_LANGUAGES_CACHE.get(tree_sha)
+    if cached is not None:
+        return dict(cached)
+    lang_count = Counter()
+    process = subprocess.Popen(['git', f'--git-dir={repo.git_dir}', 'ls-tree', '-r', '-z', '--name-only', tree_sha],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    remainder = b""
+    for chunk in iter(lambda: process.stdout.read(BLOB_READ_CHUNK_BYTES), b""):
+        *paths, remainder = (remainder + chunk).split(b"\0")
+        for path in paths:
+            # same as 'Path(path).suffix', without building a path object per file
+            ext = posixpath.splitext(path)[1]
+            lang_count[(ext if ext != b"." else b"").decode('utf-8', errors='replace').lower().lstrip('.')] += 1
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        raise RuntimeError(f"git ls-tree failed: {stderr.decode('utf-8', errors='replace').strip()}")
+    # Convert counts to percentages
+    total_files = sum(lang_count.values())
+    lang_percentage = {lang: count / total_files * 100 for lang, count in lang_count.items()}
+    _TREE_LANGUAGES_CACHE.set(tree_sha, lang_percentage)
+    return dict(lang_percentage)
+
+
 class LocalGitProvider(GitProvider):
     """
     This class implements the GitProvider interface for local git repositories.
@@ -28,12 +120,15 @@ class LocalGitProvider(GitProvider):
     Instead of providing a PR url, the user provides a local branch path to generate a diff-patch.
     For the MVP it only supports the /review and /describe capabilities.
     """
+    # the calls share the git process of one GitPython Repo, which is not thread-safe
+    supports_concurrent_metadata = False
 
     def __init__(self, target_branch_name, incremental=False):
         self.repo_path = _find_repository_root()
         if self.repo_path is None:
             raise ValueError('Could not find repository root')
         self.repo = Repo(self.repo_path)
+        self._blob_lock = Lock()
         self.head_branch_name = self.repo.head.ref.name
         self.target_branch_name = target_branch_name
         self._prepare_repo()
@@ -68,32 +163,8 @@ class LocalGitProvider(GitProvider):
             create_patch=True,
             R=True
         )
-        diff_files = []
-        for diff_item in diffs:
-            if diff_item.a_blob is not None:
-                original_file_content_str = diff_item.a_blob.data_stream.read().decode('utf-8')
-            else:
-                original_file_content_str = ""  # empty file
-            if diff_item.b_blob is not None:
-                new_file_content_str = diff_item.b_blob.data_stream.read().decode('utf-8')
-            else:
-                new_file_content_str = ""  # empty file
-            edit_type = EDIT_TYPE.MODIFIED
-            if diff_item.new_file:
-                edit_type = EDIT_TYPE.ADDED
-            elif diff_item.deleted_file:
-                edit_type = EDIT_TYPE.DELETED
-            elif diff_item.renamed_file:
-                edit_type = EDIT_TYPE.RENAMED
-            diff_files.append(
-                FilePatchInfo(original_file_content_str,
-                              new_file_content_str,
-                              diff_item.diff.decode('utf-8'),
-                              diff_item.b_path,
-                              edit_type=edit_type,
-                              old_filename=None if diff_item.a_path == diff_item.b_path else diff_item.a_path
-                              )
-            )
+        diff_files = list(iter_diff_files(diffs, get_settings().config.get('max_file_content_bytes', 0),
+                                          self._blob_lock))
         self.diff_files = diff_files
         return diff_files
 
@@ -157,14 +228,7 @@ class LocalGitProvider(GitProvider):
         """
         Calculate percentage of languages in repository. Used for hunk prioritisation.
         """
-        # Get all files in repository
-        filepaths = [Path(item.path) for item in self.repo.tree().traverse() if item.type == 'blob']
-        # Identify language by file extension and count
-        lang_count = Counter(ext.lstrip('.') for filepath in filepaths for ext in [filepath.suffix.lower()])
-        # Convert counts to percentages
-        total_files = len(filepaths)
-        lang_percentage = {lang: count / total_files * 100 for lang, count in lang_count.items()}
-        return lang_percentage
+        return get_tree_languages(self.repo, self.repo.head.commit.tree.hexsha)
 
     def get_pr_branch(self):
         return self.repo.head
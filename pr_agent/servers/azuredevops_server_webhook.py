@@ -24,6 +24,7 @@ from pr_agent.algo.utils import update_settings_from_args
 from pr_agent.config_loader import get_settings
 from pr_agent.git_providers.utils import apply_repo_settings
 from pr_agent.log import LoggingFormat, get_logger, setup_logger
+from pr_agent.servers.utils import metrics_router
 
 setup_logger(fmt=LoggingFormat.JSON, level="DEBUG")
 security = HTTPBasic()
@@ -151,6 +152,7 @@ async def root():
 def start():
     app = FastAPI(middleware=[Middleware(RawContextMiddleware)])
     app.include_router(router)
+    app.include_router(metrics_router)
     uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "3000")))
 
 if __name__ == "__main__":
@@ -12,6 +12,7 @@ from starlette_context.middleware import RawContextMiddleware
 from pr_agent.agent.pr_agent import PRAgent
 from pr_agent.config_loader import get_settings, global_settings
 from pr_agent.log import get_logger, setup_logger
+from pr_agent.servers.utils import metrics_router
 
 setup_logger()
 router = APIRouter()
@@ -69,6 +70,7 @@ def start():
     middleware = [Middleware(RawContextMiddleware)]
     app = FastAPI(middleware=middleware)
     app.include_router(router)
+    app.include_router(metrics_router)
 
     uvicorn.run(app, host="0.0.0.0", port=3000)
 
@@ -22,7 +22,8 @@ from pr_agent.git_providers.utils import apply_repo_settings
 from pr_agent.identity_providers import get_identity_provider
 from pr_agent.identity_providers.identity_provider import Eligibility
 from pr_agent.log import LoggingFormat, get_logger, setup_logger
-from pr_agent.servers.utils import DefaultDictWithTimeout, verify_signature
+from pr_agent.servers.utils import (DefaultDictWithTimeout, metrics_router,
+                                    verify_signature)
 
 setup_logger(fmt=LoggingFormat.JSON, level="DEBUG")
 base_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
@@ -415,6 +416,7 @@ if get_settings().github_app.override_deployment_type:
 middleware = [Middleware(RawContextMiddleware)]
 app = FastAPI(middleware=middleware)
 app.include_router(router)
+app.include_router(metrics_router)
 
 
 def start():
@@ -4,7 +4,11 @@ import time
 from collections import defaultdict
 from typing import Any, Callable
 
-from fastapi import HTTPException
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from pr_agent.algo.metrics import get_metrics_registry
+from pr_agent.config_loader import get_settings
 
 
 def verify_signature(payload_body, secret_token, signature_header):
@@ -84,3 +88,16 @@ class DefaultDictWithTimeout(defaultdict):
     def __delitem__(self, __key):
         del self.__key_times[__key]
         return super().__delitem__(__key)
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Exposes the in-process LLM metrics in the Prometheus text format, when 'config.enable_metrics_endpoint' is set."""
+    # the route is not authenticated, so it is disabled unless explicitly enabled
+    if not get_settings().config.get("enable_metrics_endpoint", False):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(get_metrics_registry().to_prometheus(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -21,8 +21,10 @@ class PRAddDocs:
                  ai_handler: partial[BaseAiHandler,] = LiteLLMAIHandler):
 
         self.git_provider = get_git_provider()(pr_url)
+        self.pr_metadata = self.git_provider.prefetch_pr_metadata(
+            ('languages', 'files', 'branch', 'description_full', 'commit_messages'))
         self.main_language = get_main_pr_language(
-            self.git_provider.get_languages(), self.git_provider.get_files()
+            self.pr_metadata.languages, self.pr_metadata.files
         )
 
         self.ai_handler = ai_handler()
@@ -33,12 +35,12 @@ class PRAddDocs:
         self.cli_mode = cli_mode
         self.vars = {
             "title": self.git_provider.pr.title,
-            "branch": self.git_provider.get_pr_branch(),
-            "description": self.git_provider.get_pr_description(),
+            "branch": self.pr_metadata.branch,
+            "description": self.pr_metadata.get_pr_description(),
             "language": self.main_language,
             "diff": "",  # empty diff for initial calculation
             "extra_instructions": get_settings().pr_add_docs.extra_instructions,
-            "commit_messages_str": self.git_provider.get_commit_messages(),
+            "commit_messages_str": self.pr_metadata.commit_messages,
             'docs_for_language': get_docs_for_language(self.main_language,
                                                        get_settings().pr_add_docs.docs_style),
         }
@@ -15,6 +15,7 @@ from pr_agent.algo.ai_handlers.litellm_ai_handler import LiteLLMAIHandler
 from pr_agent.algo.pr_processing import (add_ai_metadata_to_diff_files,
                                          get_pr_diff, get_pr_multi_diffs,
                                          retry_with_fallback_models)
+from pr_agent.algo.suggestions_dedup import dedup_code_suggestions
 from pr_agent.algo.token_handler import TokenHandler
 from pr_agent.algo.utils import (ModelType, load_yaml, replace_code_tags,
                                  show_relevant_configurations)
@@ -33,8 +34,10 @@ class PRCodeSuggestions:
                  ai_handler: partial[BaseAiHandler,] = LiteLLMAIHandler):
 
         self.git_provider = get_git_provider_with_context(pr_url)
+        self.pr_metadata = self.git_provider.prefetch_pr_metadata(
+            ('languages', 'files', 'branch', 'description_full', 'commit_messages'))
         self.main_language = get_main_pr_language(
-            self.git_provider.get_languages(), self.git_provider.get_files()
+            self.pr_metadata.languages, self.pr_metadata.files
         )
 
         # limit context specifically for the improve command, which has hard input to parse:
@@ -60,7 +63,7 @@ class PRCodeSuggestions:
         self.pr_url = pr_url
         self.cli_mode = cli_mode
         self.pr_description, self.pr_description_files = (
-            self.git_provider.get_pr_description(split_changes_walkthrough=True))
+            self.pr_metadata.get_pr_description(split_changes_walkthrough=True))
         if (self.pr_description_files and get_settings().get("config.is_auto_command", False) and
                 get_settings().get("config.enable_ai_metadata", False)):
             add_ai_metadata_to_diff_files(self.git_provider, self.pr_description_files)
@@ -71,14 +74,14 @@ class PRCodeSuggestions:
 
         self.vars = {
             "title": self.git_provider.pr.title,
-            "branch": self.git_provider.get_pr_branch(),
+            "branch": self.pr_metadata.branch,
             "description": self.pr_description,
             "language": self.main_language,
             "diff": "",  # empty diff for initial calculation
             "diff_no_line_numbers": "",  # empty diff for initial calculation
             "num_code_suggestions": num_code_suggestions,
             "extra_instructions": get_settings().pr_code_suggestions.extra_instructions,
-            "commit_messages_str": self.git_provider.get_commit_messages(),
+            "commit_messages_str": self.pr_metadata.commit_messages,
             "relevant_best_practices": "",
             "is_ai_metadata": get_settings().get("config.enable_ai_metadata", False),
             "focus_only_on_problems": get_settings().get("pr_code_suggestions.focus_only_on_problems", False),
@@ -397,6 +400,10 @@ class PRCodeSuggestions:
         return data
 
     async def _get_prediction(self, model: str, patches_diff: str, patches_diff_no_line_number: str) -> dict:
+        data = await self._get_suggestions(model, patches_diff, patches_diff_no_line_number)
+        return await self._self_reflect_on_chunk(data, patches_diff)
+
+    async def _get_suggestions(self, model: str, patches_diff: str, patches_diff_no_line_number: str) -> dict:
         variables = copy.deepcopy(self.vars)
         variables["diff"] = patches_diff  # update diff
         variables["diff_no_line_numbers"] = patches_diff_no_line_number  # update diff
@@ -410,9 +417,16 @@ class PRCodeSuggestions:
             get_settings().user_prompt = user_prompt
 
         # load suggestions from the AI response
-        data = self._prepare_pr_code_suggestions(response)
-
-        # self-reflect on suggestions (mandatory, since line numbers are generated now here)
+        return self._prepare_pr_code_suggestions(response)
+
+    async def _self_reflect_on_chunk(self, data: dict, patches_diff: str) -> dict:
+        # self-reflect on suggestions (mandatory, since line numbers are generated now here), using only the diff
+        # of the chunk the suggestions were generated for
+        num_suggestions = len(data["code_suggestions"])
+        data["code_suggestions"] = dedup_code_suggestions(
+            data["code_suggestions"], get_settings().pr_code_suggestions.get("dedup_similarity_threshold", 0.8))
+        if len(data["code_suggestions"]) < num_suggestions:
+            get_logger().info(f"Merged {num_suggestions - len(data['code_suggestions'])} duplicate suggestions")
         model_reflection = get_settings().config.model
         response_reflect = await self.self_reflect_on_suggestions(data["code_suggestions"],
                                                                   patches_diff, model=model_reflection)
@@ -655,7 +669,9 @@ class PRCodeSuggestions:
 
     async def _prepare_prediction_extended(self, model: str) -> dict:
         self.patches_diff_list = get_pr_multi_diffs(self.git_provider, self.token_handler, model,
-                                                    max_calls=get_settings().pr_code_suggestions.max_number_of_calls)
+                                                    max_calls=get_settings().pr_code_suggestions.max_number_of_calls,
+                                                    balanced=get_settings().pr_code_suggestions.get(
+                                                        "balanced_chunks", True))
 
         # create a copy of the patches_diff_list, without line numbers for '__new hunk__' sections
         self.patches_diff_list_no_line_numbers = self.remove_line_numbers(self.patches_diff_list)
@@ -672,33 +688,49 @@ class PRCodeSuggestions:
                       zip(self.patches_diff_list, self.patches_diff_list_no_line_numbers)])
                 self.prediction_list = prediction_list
             else:
+                # one AI call at a time
                 prediction_list = []
                 for patches_diff, patches_diff_no_line_numbers in zip(self.patches_diff_list, self.patches_diff_list_no_line_numbers):
                     prediction = await self._get_prediction(model, patches_diff, patches_diff_no_line_numbers)
                     prediction_list.append(prediction)
 
-            data = {"code_suggestions": []}
-            for j, predictions in enumerate(prediction_list):  # each call adds an element to the list
-                if "code_suggestions" in predictions:
-                    score_threshold = max(1, int(get_settings().pr_code_suggestions.suggestions_score_threshold))
-                    for i, prediction in enumerate(predictions["code_suggestions"]):
-                        try:
-                            score = int(prediction.get("score", 1))
-                            if score >= score_threshold:
-                                data["code_suggestions"].append(prediction)
-                            else:
-                                get_logger().info(
-                                    f"Removing suggestions {i} from call {j}, because score is {score}, and score_threshold is {score_threshold}",
-                                    artifact=prediction)
-                        except Exception as e:
-                            get_logger().error(f"Error getting PR diff for suggestion {i} in call {j}, error: {e}",
-                                               artifact={"prediction": prediction})
+            data = self._merge_chunks_predictions(prediction_list)
             self.data = data
         else:
             get_logger().warning(f"Empty PR diff list")
             self.data = data = None
         return data
 
+    @staticmethod
+    def _merge_chunks_predictions(prediction_list: List[dict]) -> dict:
+        """
+        Merges the self-reflected suggestions of all the chunks: drops the suggestions below
+        'suggestions_score_threshold', and keeps a single copy (the highest scored) of near-duplicate suggestions.
+        """
+        data = {"code_suggestions": []}
+        score_threshold = max(1, int(get_settings().pr_code_suggestions.suggestions_score_threshold))
+        for j, predictions in enumerate(prediction_list):  # each call adds an element to the list
+            if "code_suggestions" in predictions:
+                for i, prediction in enumerate(predictions["code_suggestions"]):
+                    try:
+                        score = int(prediction.get("score", 1))
+                        if score >= score_threshold:
+                            data["code_suggestions"].append(prediction)
+                        else:
+                            get_logger().info(
+                                f"Removing suggestions {i} from call {j}, because score is {score}, and score_threshold is {score_threshold}",
+                                artifact=prediction)
+                    except Exception as e:
+                        get_logger().error(f"Error getting PR diff for suggestion {i} in call {j}, error: {e}",
+                                           artifact={"prediction": prediction})
+        num_suggestions = len(data["code_suggestions"])
+        data["code_suggestions"] = dedup_code_suggestions(
+            data["code_suggestions"], get_settings().pr_code_suggestions.get("dedup_similarity_threshold", 0.8))
+        if len(data["code_suggestions"]) < num_suggestions:
+            get_logger().info(f"Merged {num_suggestions - len(data['code_suggestions'])} duplicate suggestions "
+                              f"across chunks")
+        return data
+
     def generate_summarized_suggestions(self, data: Dict) -> str:
         try:
             pr_body = "## PR Code Suggestions ✨\n\n"
@@ -1,9 +1,10 @@
 import asyncio
 import copy
+import hashlib
 import re
 import traceback
 from functools import partial
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import yaml
 from jinja2 import Environment, StrictUndefined
@@ -15,9 +16,9 @@ from pr_agent.algo.pr_processing import (OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD,
                                          get_pr_diff_multiple_patchs,
                                          retry_with_fallback_models)
 from pr_agent.algo.token_handler import TokenHandler
-from pr_agent.algo.utils import (ModelType, PRDescriptionHeader, clip_tokens,
-                                 get_max_tokens, get_user_labels, load_yaml,
-                                 set_custom_labels,
+from pr_agent.algo.utils import (LRUCache, ModelType, PRDescriptionHeader,
+                                 clip_tokens, get_max_tokens, get_user_labels,
+                                 load_yaml, set_custom_labels,
                                  show_relevant_configurations)
 from pr_agent.config_loader import get_settings
 from pr_agent.git_providers import (GithubProvider, get_git_provider,
@@ -29,6 +30,11 @@ from pr_agent.tools.ticket_pr_compliance_check import (
     extract_and_cache_pr_tickets, extract_ticket_links_from_pr_description,
     extract_tickets)
 
+MAX_REDUCE_LEVELS = 3
+
+# per-file summaries of the large PR mode, keyed by the content of the file patch (see '_map_files_predictions')
+_FILES_SUMMARY_CACHE = LRUCache(max_size=5000)
+
 
 class PRDescription:
     def __init__(self, pr_url: str, args: list = None,
@@ -42,8 +48,10 @@ class PRDescription:
         """
         # Initialize the git provider and main PR language
         self.git_provider = get_git_provider_with_context(pr_url)
+        self.pr_metadata = self.git_provider.prefetch_pr_metadata(
+            ('languages', 'files', 'branch', 'user_description', 'commit_messages'))
         self.main_pr_language = get_main_pr_language(
-            self.git_provider.get_languages(), self.git_provider.get_files()
+            self.pr_metadata.languages, self.pr_metadata.files
         )
         self.pr_id = self.git_provider.get_pr_id()
         self.keys_fix = ["filename:", "language:", "changes_summary:", "changes_title:", "description:", "title:"]
@@ -61,12 +69,12 @@ class PRDescription:
         self.COLLAPSIBLE_FILE_LIST_THRESHOLD = get_settings().pr_description.get("collapsible_file_list_threshold", 8)
         self.vars = {
             "title": self.git_provider.pr.title,
-            "branch": self.git_provider.get_pr_branch(),
-            "description": self.git_provider.get_pr_description(full=False),
+            "branch": self.pr_metadata.branch,
+            "description": self.pr_metadata.get_pr_description(full=False),
             "language": self.main_pr_language,
             "diff": "",  # empty diff for initial calculation
             "extra_instructions": get_settings().pr_description.extra_instructions,
-            "commit_messages_str": self.git_provider.get_commit_messages(),
+            "commit_messages_str": self.pr_metadata.commit_messages,
             "enable_custom_labels": get_settings().config.enable_custom_labels,
             "custom_labels_class": "",  # will be filled if necessary in 'set_custom_labels' function
             "enable_semantic_files_types": get_settings().pr_description.enable_semantic_files_types,
@@ -75,7 +83,7 @@ class PRDescription:
             'duplicate_prompt_examples': get_settings().config.get('duplicate_prompt_examples', False),
         }
 
-        self.user_description = self.git_provider.get_user_description()
+        self.user_description = self.pr_metadata.user_description
 
         # Initialize the token handler
         self.token_handler = TokenHandler(
@@ -232,46 +240,54 @@ class PRDescription:
                 self.vars,
                 get_settings().pr_description_only_files_prompts.system,
                 get_settings().pr_description_only_files_prompts.user,
+                model=model,
             )
+            enable_map_reduce = get_settings().pr_description.get("enable_map_reduce", False)
+            max_calls = get_settings().pr_description.get("map_reduce_max_ai_calls", 50) if enable_map_reduce else None
             (patches_compressed_list, total_tokens_list, deleted_files_list, remaining_files_list, file_dict,
              files_in_patches_list) = get_pr_diff_multiple_patchs(
-                self.git_provider, token_handler_only_files_prompt, model)
+                self.git_provider, token_handler_only_files_prompt, model, max_calls=max_calls)
 
             # get the files prediction for each patch
-            if not get_settings().pr_description.async_ai_calls:
-                results = []
-                for i, patches in enumerate(patches_compressed_list):  # sync calls
-                    patches_diff = "\n".join(patches)
-                    get_logger().debug(f"PR diff number {i + 1} for describe files")
-                    prediction_files = await self._get_prediction(model, patches_diff,
-                                                                  prompt="pr_description_only_files_prompts")
-                    results.append(prediction_files)
-            else:  # async calls
-                tasks = []
-                for i, patches in enumerate(patches_compressed_list):
-                    if patches:
+            if enable_map_reduce:
+                file_description_str_list = await self._map_files_predictions(model, patches_compressed_list,
+                                                                              files_in_patches_list)
+            else:
+                if not get_settings().pr_description.async_ai_calls:
+                    results = []
+                    for i, patches in enumerate(patches_compressed_list):  # sync calls
                         patches_diff = "\n".join(patches)
                         get_logger().debug(f"PR diff number {i + 1} for describe files")
-                        task = asyncio.create_task(
-                            self._get_prediction(model, patches_diff, prompt="pr_description_only_files_prompts"))
-                        tasks.append(task)
-                # Wait for all tasks to complete
-                results = await asyncio.gather(*tasks)
-            file_description_str_list = []
-            for i, result in enumerate(results):
-                prediction_files = result.strip().removeprefix('```yaml').strip('`').strip()
-                if load_yaml(prediction_files, keys_fix_yaml=self.keys_fix) and prediction_files.startswith('pr_files'):
-                    prediction_files = prediction_files.removeprefix('pr_files:').strip()
-                    file_description_str_list.append(prediction_files)
-                else:
-                    get_logger().debug(f"failed to generate predictions in iteration {i + 1} for describe files")
+                        prediction_files = await self._get_prediction(model, patches_diff,
+                                                                      prompt="pr_description_only_files_prompts")
+                        results.append(prediction_files)
+                else:  # async calls
+                    tasks = []
+                    for i, patches in enumerate(patches_compressed_list):
+                        if patches:
+                            patches_diff = "\n".join(patches)
+                            get_logger().debug(f"PR diff number {i + 1} for describe files")
+                            task = asyncio.create_task(
+                                self._get_prediction(model, patches_diff, prompt="pr_description_only_files_prompts"))
+                            tasks.append(task)
+                    # Wait for all tasks to complete
+                    results = await asyncio.gather(*tasks)
+                file_description_str_list = []
+                for i, result in enumerate(results):
+                    prediction_files = result.strip().removeprefix('```yaml').strip('`').strip()
+                    if load_yaml(prediction_files, keys_fix_yaml=self.keys_fix) and prediction_files.startswith('pr_files'):
+                        prediction_files = prediction_files.removeprefix('pr_files:').strip()
+                        file_description_str_list.append(prediction_files)
+                    else:
+                        get_logger().debug(f"failed to generate predictions in iteration {i + 1} for describe files")
 
             # generate files_walkthrough string, with proper token handling
             token_handler_only_description_prompt = TokenHandler(
                 self.git_provider.pr,
                 self.vars,
                 get_settings().pr_description_only_description_prompts.system,
-                get_settings().pr_description_only_description_prompts.user)
+                get_settings().pr_description_only_description_prompts.user,
+                model=model)
             files_walkthrough = "\n".join(file_description_str_list)
             files_walkthrough_prompt = copy.deepcopy(files_walkthrough)
             MAX_EXTRA_FILES_TO_PROMPT = 50
@@ -291,10 +307,16 @@ class PRDescription:
                         get_logger().debug(f"Too many deleted files, clipping to {MAX_EXTRA_FILES_TO_PROMPT}")
                         files_walkthrough_prompt += f"\n... and {len(deleted_files_list) - MAX_EXTRA_FILES_TO_PROMPT} more"
                         break
-            tokens_files_walkthrough = len(
-                token_handler_only_description_prompt.encoder.encode(files_walkthrough_prompt))
+            tokens_files_walkthrough = token_handler_only_description_prompt.count_tokens(files_walkthrough_prompt)
             total_tokens = token_handler_only_description_prompt.prompt_tokens + tokens_files_walkthrough
             max_tokens_model = get_max_tokens(model)
+            if enable_map_reduce and total_tokens > max_tokens_model - OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD:
+                # recursively merge the files summaries into higher-level summaries, until the prompt fits
+                files_walkthrough_prompt = await self._reduce_files_walkthrough(
+                    model, file_description_str_list, files_walkthrough_prompt[len(files_walkthrough):],
+                    token_handler_only_description_prompt)
+                tokens_files_walkthrough = token_handler_only_description_prompt.count_tokens(files_walkthrough_prompt)
+                total_tokens = token_handler_only_description_prompt.prompt_tokens + tokens_files_walkthrough
             if total_tokens > max_tokens_model - OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD:
                 # clip files_walkthrough to git the tokens within the limit
                 files_walkthrough_prompt = clip_tokens(files_walkthrough_prompt,
@@ -318,6 +340,118 @@ class PRDescription:
                     get_logger().debug(f"Using only headers for describe {self.pr_id}")
                     self.prediction = prediction_headers
 
+    async def _map_files_predictions(self, model: str, patches_compressed_list: List[List[str]],
+                                     files_in_patches_list: List[List[str]]) -> List[str]:
+        """
+        Map step of the large PR mode: generates the files summaries of all the patch groups, with at most
+        'pr_description.max_parallel_ai_calls' concurrent calls.
+        Per-file summaries are cached by the content of the file patch, so unchanged files are not summarized again
+        on the next push.
+        """
+        diff_files = {file.filename: file for file in self.git_provider.get_diff_files()}
+        cached_summaries = []
+        groups_to_predict = []
+        for patches, files_in_patch in zip(patches_compressed_list, files_in_patches_list):
+            uncached_patches, uncached_files = [], []
+            for patch, filename in zip(patches, files_in_patch):
+                cache_key = self._file_summary_cache_key(model, diff_files.get(filename))
+                cached_summary = _FILES_SUMMARY_CACHE.get(cache_key) if cache_key else None
+                if cached_summary:
+                    cached_summaries.append(cached_summary)
+                else:
+                    uncached_patches.append(patch)
+                    uncached_files.append(filename)
+            if uncached_patches:
+                groups_to_predict.append((uncached_patches, uncached_files))
+        get_logger().info(f"Describe map step: {len(groups_to_predict)} AI calls, "
+                          f"{len(cached_summaries)} cached file summaries")
+
+        semaphore = asyncio.Semaphore(max(get_settings().pr_description.get("max_parallel_ai_calls", 4), 1))
+
+        async def predict_group(patches: List[str]) -> str:
+            async with semaphore:
+                return await self._get_prediction(model, "\n".join(patches),
+                                                  prompt="pr_description_only_files_prompts")
+
+        results = await asyncio.gather(*[predict_group(patches) for patches, _ in groups_to_predict],
+                                       return_exceptions=True)
+
+        file_description_str_list = cached_summaries
+        for i, ((_, files_in_patch), result) in enumerate(zip(groups_to_predict, results)):
+            if isinstance(result, Exception):
+                get_logger().warning(f"Failed to generate predictions in group {i + 1} for describe files: {result}")
+                continue
+            prediction_files = result.strip().removeprefix('```yaml').strip('`').strip()
+            prediction_files_dict = load_yaml(prediction_files, keys_fix_yaml=self.keys_fix)
+            if not prediction_files_dict or not prediction_files.startswith('pr_files'):
+                get_logger().debug(f"failed to generate predictions in group {i + 1} for describe files")
+                continue
+            for file_summary in prediction_files_dict.get('pr_files') or []:
+                if not isinstance(file_summary, dict):
+                    continue
+                file_summary = {key: value.strip() if isinstance(value, str) else value
+                                for key, value in file_summary.items()}
+                file_summary_str = yaml.dump([file_summary], sort_keys=False, allow_unicode=True).strip()
+                file_description_str_list.append(file_summary_str)
+                filename = str(file_summary.get('filename', '')).strip()
+                cache_key = self._file_summary_cache_key(model, diff_files.get(filename))
+                if filename in files_in_patch and cache_key:
+                    _FILES_SUMMARY_CACHE.set(cache_key, file_summary_str)
+        return file_description_str_list
+
+    async def _reduce_files_walkthrough(self, model: str, file_description_str_list: List[str], extra_files_str: str,
+                                        token_handler: TokenHandler) -> str:
+        """
+        Reduce step of the large PR mode: while the files walkthrough does not fit the description prompt, splits it
+        into parts that fit, summarizes each part with the description prompt, and continues with the summaries.
+        """
+        max_tokens = get_max_tokens(model) - OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD - token_handler.prompt_tokens
+        semaphore = asyncio.Semaphore(max(get_settings().pr_description.get("max_parallel_ai_calls", 4), 1))
+
+        async def summarize_part(part: str) -> str:
+            async with semaphore:
+                prediction = await self._get_prediction(model, part,
+                                                        prompt="pr_description_only_description_prompts")
+            prediction = prediction.strip().removeprefix('```yaml').strip('`').strip()
+            prediction_dict = load_yaml(prediction, keys_fix_yaml=self.keys_fix)
+            if isinstance(prediction_dict, dict) and prediction_dict.get('description'):
+                return f"{str(prediction_dict.get('title', '')).strip()}\n{str(prediction_dict['description']).strip()}"
+            return prediction
+
+        summaries = file_description_str_list
+        for level in range(MAX_REDUCE_LEVELS):
+            summaries_tokens = token_handler.count_tokens_batch(summaries)
+            if sum(summaries_tokens) + len(summaries) <= max_tokens or len(summaries) <= 1:
+                break
+            parts, part, part_tokens = [], [], 0
+            for summary, summary_tokens in zip(summaries, summaries_tokens):
+                if part and part_tokens + summary_tokens > max_tokens:
+                    parts.append("\n".join(part))
+                    part, part_tokens = [], 0
+                part.append(summary)
+                part_tokens += summary_tokens + 1
+            if part:
+                parts.append("\n".join(part))
+            if len(parts) >= len(summaries):
+                break  # no progress, each summary is too large on its own
+            get_logger().info(f"Describe reduce step {level + 1}: merging {len(summaries)} summaries into "
+                              f"{len(parts)} parts")
+            results = await asyncio.gather(*[summarize_part(part) for part in parts], return_exceptions=True)
+            summaries = [f"Summary of changes, part {i + 1}:\n{result}" for i, result in enumerate(results)
+                         if not isinstance(result, Exception) and result]
+            if not summaries:
+                get_logger().warning("Failed to merge the files summaries in the reduce step")
+                return "\n".join(file_description_str_list) + extra_files_str
+        return "\n".join(summaries) + extra_files_str
+
+    @staticmethod
+    def _file_summary_cache_key(model: str, file) -> Optional[str]:
+        # files without a patch are not cached, there is no content to key them by
+        if file is None or not file.patch:
+            return None
+        content = f"{model}\0{file.filename}\0{file.patch}\0{get_settings().pr_description.extra_instructions}"
+        return hashlib.sha256(content.encode('utf-8', errors='replace')).hexdigest()
+
     async def extend_uncovered_files(self, original_prediction: str) -> str:
         try:
             prediction = original_prediction
@@ -28,8 +28,10 @@ class PRGenerateLabels:
         """
         # Initialize the git provider and main PR language
         self.git_provider = get_git_provider()(pr_url)
+        self.pr_metadata = self.git_provider.prefetch_pr_metadata(
+            ('languages', 'files', 'branch', 'user_description', 'commit_messages'))
         self.main_pr_language = get_main_pr_language(
-            self.git_provider.get_languages(), self.git_provider.get_files()
+            self.pr_metadata.languages, self.pr_metadata.files
         )
         self.pr_id = self.git_provider.get_pr_id()
 
@@ -40,12 +42,12 @@ class PRGenerateLabels:
         # Initialize the variables dictionary
         self.vars = {
             "title": self.git_provider.pr.title,
-            "branch": self.git_provider.get_pr_branch(),
-            "description": self.git_provider.get_pr_description(full=False),
+            "branch": self.pr_metadata.branch,
+            "description": self.pr_metadata.get_pr_description(full=False),
             "language": self.main_pr_language,
             "diff": "",  # empty diff for initial calculation
             "extra_instructions": get_settings().pr_description.extra_instructions,
-            "commit_messages_str": self.git_provider.get_commit_messages(),
+            "commit_messages_str": self.pr_metadata.commit_messages,
             "enable_custom_labels": get_settings().config.enable_custom_labels,
             "custom_labels_class": "",  # will be filled if necessary in 'set_custom_labels' function
         }
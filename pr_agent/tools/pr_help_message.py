@@ -8,9 +8,10 @@ from jinja2 import Environment, StrictUndefined
 from pr_agent.algo import MAX_TOKENS
 from pr_agent.algo.ai_handlers.base_ai_handler import BaseAiHandler
 from pr_agent.algo.ai_handlers.litellm_ai_handler import LiteLLMAIHandler
+from pr_agent.algo.docs_index import get_docs_index
 from pr_agent.algo.pr_processing import retry_with_fallback_models
 from pr_agent.algo.token_handler import TokenHandler
-from pr_agent.algo.utils import ModelType, clip_tokens, load_yaml, get_max_tokens
+from pr_agent.algo.utils import ModelType, load_yaml, get_max_tokens
 from pr_agent.config_loader import get_settings
 from pr_agent.git_providers import BitbucketServerProvider, GithubProvider, get_git_provider_with_context
 from pr_agent.log import get_logger
@@ -107,42 +108,25 @@ class PRHelpMessage:
                         get_logger().error("The `Help` tool chat feature requires an OpenAI API key for calculating embeddings")
                     return
 
-                # current path
+                # retrieve the documentation sections that are most relevant to the question
                 docs_path= Path(__file__).parent.parent.parent / 'docs' / 'docs'
-                # get all the 'md' files inside docs_path and its subdirectories
-                md_files = list(docs_path.glob('**/*.md'))
-                folders_to_exclude = ['/finetuning_benchmark/']
-                files_to_exclude = {'EXAMPLE_BEST_PRACTICE.md', 'compression_strategy.md', '/docs/overview/index.md'}
-                md_files = [file for file in md_files if not any(folder in str(file) for folder in folders_to_exclude) and not any(file.name == file_to_exclude for file_to_exclude in files_to_exclude)]
-
-                # sort the 'md_files' so that 'priority_files' will be at the top
-                priority_files_strings = ['/docs/index.md', '/usage-guide', 'tools/describe.md', 'tools/review.md',
-                                          'tools/improve.md', '/faq']
-                md_files_priority = [file for file in md_files if
-                                     any(priority_string in str(file) for priority_string in priority_files_strings)]
-                md_files_not_priority = [file for file in md_files if file not in md_files_priority]
-                md_files = md_files_priority + md_files_not_priority
-
-                docs_prompt = ""
-                for file in md_files:
-                    try:
-                        with open(file, 'r') as f:
-                            file_path = str(file).replace(str(docs_path), '')
-                            docs_prompt += f"\n==file name==\n\n{file_path}\n\n==file content==\n\n{f.read().strip()}\n=========\n\n"
-                    except Exception as e:
-                        get_logger().error(f"Error while reading the file {file}: {e}")
-                token_count = self.token_handler.count_tokens(docs_prompt)
-                get_logger().debug(f"Token count of full documentation website: {token_count}")
-
                 model = get_settings().config.model
+                docs_index = get_docs_index(docs_path, self.token_handler, model)
                 if model in MAX_TOKENS:
-                    max_tokens_full = MAX_TOKENS[model] # note - here we take the actual max tokens, without any reductions. we do aim to get the full documentation website in the prompt
+                    max_tokens_full = MAX_TOKENS[model] # note - here we take the actual max tokens, without any reductions
                 else:
                     max_tokens_full = get_max_tokens(model)
                 delta_output = 2000
-                if token_count > max_tokens_full - delta_output:
-                    get_logger().info(f"Token count {token_count} exceeds the limit {max_tokens_full - delta_output}. Skipping the PR Help message.")
-                    docs_prompt = clip_tokens(docs_prompt, max_tokens_full - delta_output)
+                sections = docs_index.select_sections(self.question_str, max_tokens_full - delta_output,
+                                                      get_settings().get('pr_help.max_docs_sections', 20))
+                if not sections:
+                    # no section matches the question, so the documentation is given as a whole, clipped to the model
+                    get_logger().info("No documentation section matches the question, using the full documentation")
+                    sections = docs_index.select_leading_sections(max_tokens_full - delta_output)
+                docs_prompt = docs_index.format_sections(sections)
+                get_logger().debug(f"Retrieved {len(sections)} documentation sections "
+                                   f"({sum(section.tokens for section in sections)} tokens) out of "
+                                   f"{len(docs_index.sections)}")
                 self.vars['snippets'] = docs_prompt.strip()
 
                 # run the AI model
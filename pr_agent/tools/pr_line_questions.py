@@ -22,15 +22,17 @@ class PR_LineQuestions:
     def __init__(self, pr_url: str, args=None, ai_handler: partial[BaseAiHandler,] = LiteLLMAIHandler):
         self.question_str = self.parse_args(args)
         self.git_provider = get_git_provider()(pr_url)
+        self.pr_metadata = self.git_provider.prefetch_pr_metadata(
+            ('languages', 'files', 'branch'))
         self.main_pr_language = get_main_pr_language(
-            self.git_provider.get_languages(), self.git_provider.get_files()
+            self.pr_metadata.languages, self.pr_metadata.files
         )
         self.ai_handler = ai_handler()
         self.ai_handler.main_pr_language = self.main_pr_language
 
         self.vars = {
             "title": self.git_provider.pr.title,
-            "branch": self.git_provider.get_pr_branch(),
+            "branch": self.pr_metadata.branch,
             "diff": "",  # empty diff for initial calculation
             "question": self.question_str,
             "full_hunk": "",
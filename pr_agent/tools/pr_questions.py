@@ -20,8 +20,10 @@ class PRQuestions:
         question_str = self.parse_args(args)
         self.pr_url = pr_url
         self.git_provider = get_git_provider()(pr_url)
+        self.pr_metadata = self.git_provider.prefetch_pr_metadata(
+            ('languages', 'files', 'branch', 'description_full', 'commit_messages'))
         self.main_pr_language = get_main_pr_language(
-            self.git_provider.get_languages(), self.git_provider.get_files()
+            self.pr_metadata.languages, self.pr_metadata.files
         )
         self.ai_handler = ai_handler()
         self.ai_handler.main_pr_language = self.main_pr_language
@@ -29,12 +31,12 @@ class PRQuestions:
         self.question_str = question_str
         self.vars = {
             "title": self.git_provider.pr.title,
-            "branch": self.git_provider.get_pr_branch(),
-            "description": self.git_provider.get_pr_description(),
+            "branch": self.pr_metadata.branch,
+            "description": self.pr_metadata.get_pr_description(),
             "language": self.main_pr_language,
             "diff": "",  # empty diff for initial calculation
             "questions": self.question_str,
-            "commit_messages_str": self.git_provider.get_commit_messages(),
+            "commit_messages_str": self.pr_metadata.commit_messages,
         }
         self.token_handler = TokenHandler(self.git_provider.pr,
                                           self.vars,
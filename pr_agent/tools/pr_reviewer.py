@@ -12,6 +12,8 @@ from pr_agent.algo.ai_handlers.litellm_ai_handler import LiteLLMAIHandler
 from pr_agent.algo.pr_processing import (add_ai_metadata_to_diff_files,
                                          get_pr_diff,
                                          retry_with_fallback_models)
+from pr_agent.algo.review_store import (file_blob_sha, get_changed_files,
+                                        get_review_store, merge_reviews)
 from pr_agent.algo.token_handler import TokenHandler
 from pr_agent.algo.utils import (ModelType, PRReviewHeader,
                                  convert_to_markdown_v2, github_action_output,
@@ -47,11 +49,24 @@ class PRReviewer:
         self.git_provider = get_git_provider_with_context(pr_url)
         self.args = args
         self.incremental = self.parse_incremental(args)  # -i command
+
+        # with a review store, incremental and automatic (push triggered) reviews only cover the files changed since
+        # the stored review, and are merged into it
+        self.review_store = get_review_store()
+        self.stored_review = None
+        self.reviewed_files = None
+        if self.review_store and (self.incremental.is_incremental or get_settings().config.get('is_auto_command', False)):
+            self.stored_review = self.review_store.load(self._get_review_store_key(pr_url))
+            if self.stored_review:
+                self.incremental = IncrementalPR(False)
+
         if self.incremental and self.incremental.is_incremental:
             self.git_provider.get_incremental_commits(self.incremental)
 
+        self.pr_metadata = self.git_provider.prefetch_pr_metadata(
+            ('languages', 'files', 'branch', 'description_full', 'commit_messages'))
         self.main_language = get_main_pr_language(
-            self.git_provider.get_languages(), self.git_provider.get_files()
+            self.pr_metadata.languages, self.pr_metadata.files
         )
         self.pr_url = pr_url
         self.is_answer = is_answer
@@ -65,7 +80,7 @@ class PRReviewer:
         self.prediction = None
         answer_str, question_str = self._get_user_answers()
         self.pr_description, self.pr_description_files = (
-            self.git_provider.get_pr_description(split_changes_walkthrough=True))
+            self.pr_metadata.get_pr_description(split_changes_walkthrough=True))
         if (self.pr_description_files and get_settings().get("config.is_auto_command", False) and
                 get_settings().get("config.enable_ai_metadata", False)):
             add_ai_metadata_to_diff_files(self.git_provider, self.pr_description_files)
@@ -76,7 +91,7 @@ class PRReviewer:
 
         self.vars = {
             "title": self.git_provider.pr.title,
-            "branch": self.git_provider.get_pr_branch(),
+            "branch": self.pr_metadata.branch,
             "description": self.pr_description,
             "language": self.main_language,
             "diff": "",  # empty diff for initial calculation
@@ -89,7 +104,7 @@ class PRReviewer:
             'question_str': question_str,
             'answer_str': answer_str,
             "extra_instructions": get_settings().pr_reviewer.extra_instructions,
-            "commit_messages_str": self.git_provider.get_commit_messages(),
+            "commit_messages_str": self.pr_metadata.commit_messages,
             "custom_labels": "",
             "enable_custom_labels": get_settings().config.enable_custom_labels,
             "is_ai_metadata":  get_settings().get("config.enable_ai_metadata", False),
@@ -146,6 +161,25 @@ class PRReviewer:
                                     f"No files were changed since the [previous PR Review]({previous_review_url})")
                 return None
 
+            if self.stored_review:
+                diff_files = self.git_provider.get_diff_files()
+                changed_files, removed_files = get_changed_files(self.stored_review.get("files", {}), diff_files)
+                if not changed_files:
+                    if removed_files:
+                        # nothing to review, but the issues of the removed files are dropped from the stored review
+                        get_logger().info(f"Files were only removed since the stored review of {self.pr_url}, "
+                                          f"skipping review", artifact={"removed_files": sorted(removed_files)})
+                        self.reviewed_files = changed_files
+                        self._update_review_store({})
+                    else:
+                        get_logger().info(f"No files were changed since the stored review of {self.pr_url}, "
+                                          f"skipping review")
+                    return None
+                get_logger().info(f"Reviewing {len(changed_files)} files changed since the stored review",
+                                  artifact={"changed_files": sorted(changed_files),
+                                            "removed_files": sorted(removed_files)})
+                self.reviewed_files = changed_files
+
             if get_settings().config.publish_output and not get_settings().config.get('is_auto_command', False):
                 self.git_provider.publish_comment("Preparing review...", is_temporary=True)
 
@@ -181,7 +215,8 @@ class PRReviewer:
                                         self.token_handler,
                                         model,
                                         add_line_numbers_to_hunks=True,
-                                        disable_extra_lines=False,)
+                                        disable_extra_lines=False,
+                                        only_files=self.reviewed_files)
 
         if self.patches_diff:
             get_logger().debug(f"PR diff", diff=self.patches_diff)
@@ -234,6 +269,9 @@ class PRReviewer:
             key_issues_to_review = data['review'].pop('key_issues_to_review')
             data['review']['key_issues_to_review'] = key_issues_to_review
 
+        if self.review_store:
+            data = self._update_review_store(data)
+
         incremental_review_markdown_text = None
         # Add incremental review section
         if self.incremental.is_incremental:
@@ -264,6 +302,28 @@ class PRReviewer:
 
         return markdown_text
 
+    def _get_review_store_key(self, pr_url: str) -> str:
+        try:
+            return self.git_provider.get_pr_url()
+        except Exception:
+            return pr_url
+
+    def _update_review_store(self, data: dict) -> dict:
+        """
+        Merges the review of the changed files into the stored review (if only the changed files were reviewed), and
+        stores the result together with the blob SHAs of all the PR files.
+        """
+        try:
+            diff_files = self.git_provider.get_diff_files()
+            files = {file.filename: file_blob_sha(file) for file in diff_files}
+            if self.stored_review and self.reviewed_files is not None:
+                unchanged_files = set(files) - self.reviewed_files
+                data = merge_reviews(self.stored_review.get("review", {}), data, unchanged_files)
+            self.review_store.save(self._get_review_store_key(self.pr_url), data, files)
+        except Exception as e:
+            get_logger().error(f"Failed to update the review store, error: {e}")
+        return data
+
     def _get_user_answers(self) -> Tuple[str, str]:
         """
         Retrieves the question and answer strings from the discussion messages related to a pull request.
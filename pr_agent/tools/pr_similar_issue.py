@@ -1,9 +1,15 @@
+import hashlib
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
 import openai
 from pydantic import BaseModel, Field
+from tenacity import (retry, retry_if_exception_type, stop_after_attempt,
+                      wait_random_exponential)
 
 from pr_agent.algo import MAX_TOKENS
 from pr_agent.algo.token_handler import TokenHandler
@@ -13,6 +19,37 @@ from pr_agent.git_providers import get_git_provider
 from pr_agent.log import get_logger
 
 MODEL = "text-embedding-ada-002"
+EMBEDDING_DIMENSION = 1536
+EMBEDDING_BATCH_SIZE = 100
+EMBEDDING_MAX_PARALLEL_CALLS = 4
+
+
+def embed_texts(texts: List[str]) -> List[Optional[List[float]]]:
+    """
+    Embeds texts in batches of EMBEDDING_BATCH_SIZE, with up to EMBEDDING_MAX_PARALLEL_CALLS concurrent calls, each
+    retried with exponential backoff. Returns None for the texts of batches that failed.
+    """
+    if not texts:
+        return []
+    client = openai.OpenAI(api_key=get_settings().openai.key, max_retries=0)
+
+    @retry(retry=retry_if_exception_type((openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError,
+                                          openai.InternalServerError)),
+           stop=stop_after_attempt(5), wait=wait_random_exponential(multiplier=1, max=30), reraise=True)
+    def embed_batch_with_retries(batch: List[str]) -> List[List[float]]:
+        res = client.embeddings.create(input=batch, model=MODEL)
+        return [record.embedding for record in sorted(res.data, key=lambda record: record.index)]
+
+    def embed_batch(batch: List[str]) -> List[Optional[List[float]]]:
+        try:
+            return embed_batch_with_retries(batch)
+        except Exception as e:
+            get_logger().error(f"Failed to embed a batch of {len(batch)} texts, error: {e}")
+            return [None] * len(batch)
+
+    batches = [texts[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=min(EMBEDDING_MAX_PARALLEL_CALLS, len(batches))) as executor:
+        return [embed for batch_embeds in executor.map(embed_batch, batches) for embed in batch_embeds]
 
 
 class PRSimilarIssue:
@@ -174,18 +211,37 @@ class PRSimilarIssue:
                 else:
                     get_logger().info('No new issues to update')
 
+        elif get_settings().pr_similar_issue.vectordb == "local":
+            try:
+                # requires numpy
+                from pr_agent.algo.local_vector_store import LocalVectorStore
+            except ImportError as e:
+                raise Exception("Please install numpy to use local as vectordb") from e
+            self.vector_store = LocalVectorStore(os.path.join(get_settings().local_vectordb.path, index_name))
+
+            # sync only the issues updated since the last indexed one (in order of update, to resume where we stopped)
+            sync_state = self.vector_store.get_sync_state(repo_name_for_index)
+            get_issues_kwargs = {"state": "all", "sort": "updated", "direction": "asc"}
+            if sync_state and not get_settings().pr_similar_issue.force_update_dataset:
+                get_issues_kwargs["since"] = datetime.fromisoformat(sync_state["updated_at"])
+                get_logger().info(f"Updating the local index with issues updated since {sync_state['updated_at']}...")
+            else:
+                get_logger().info('Indexing the entire repo...')
+            self.last_synced_issue = None
+            self._update_local_store_with_issues(repo_obj.get_issues(**get_issues_kwargs), repo_name_for_index)
+
 
     async def run(self):
         get_logger().info('Getting issue...')
         repo_name, original_issue_number = self.git_provider._parse_issue_url(self.issue_url.split('=')[-1])
         issue_main = self.git_provider.repo_obj.get_issue(original_issue_number)
         issue_str, comments, number = self._process_issue(issue_main)
-        openai.api_key = get_settings().openai.key
         get_logger().info('Done')
 
         get_logger().info('Querying...')
-        res = openai.Embedding.create(input=[issue_str], engine=MODEL)
-        embeds = [record['embedding'] for record in res['data']]
+        embeds = embed_texts([issue_str])
+        if embeds[0] is None:
+            raise Exception("Failed to embed the issue")
 
         relevant_issues_number_list = []
         relevant_comment_number_list = []
@@ -246,6 +302,28 @@ class PRSimilarIssue:
                 score_list.append(str("{:.2f}".format(1-r['_distance'])))
             get_logger().info('Done')
 
+        elif get_settings().pr_similar_issue.vectordb == "local":
+            res = self.vector_store.query(embeds[0], top_k=5, metadata_filter={"repo": self.repo_name_for_index})
+
+            for r in res:
+                try:
+                    issue_number = int(r["id"].split('.')[0].split('_')[-1])
+                except:
+                    get_logger().debug(f"Failed to parse issue number from {r['id']}")
+                    continue
+
+                if original_issue_number == issue_number:
+                    continue
+                if issue_number not in relevant_issues_number_list:
+                    relevant_issues_number_list.append(issue_number)
+
+                if 'comment' in r["id"]:
+                    relevant_comment_number_list.append(int(r["id"].split('.')[1].split('_')[-1]))
+                else:
+                    relevant_comment_number_list.append(-1)
+                score_list.append(str("{:.2f}".format(r['score'])))
+            get_logger().info('Done')
+
         get_logger().info('Publishing response...')
         similar_issues_str = "### Similar Issues\n___\n\n"
 
@@ -272,8 +350,7 @@ class PRSimilarIssue:
         issue_str = f"Issue Header: \"{header}\"\n\nIssue Body:\n{body}"
         return issue_str, comments, number
 
-    def _update_index_with_issues(self, issues_list, repo_name_for_index, upsert=False):
-        get_logger().info('Processing issues...')
+    def _build_corpus(self, issues_list, repo_name_for_index, limit_issues: bool = True) -> 'Corpus':
         corpus = Corpus()
         example_issue_record = Record(
             id=f"example_issue_{repo_name_for_index}",
@@ -290,10 +367,11 @@ class PRSimilarIssue:
             counter += 1
             if counter % 100 == 0:
                 get_logger().info(f"Scanned {counter} issues")
-            if counter >= self.max_issues_to_scan:
+            if limit_issues and counter >= self.max_issues_to_scan:
                 get_logger().info(f"Scanned {self.max_issues_to_scan} issues, stopping")
                 break
 
+            self.last_synced_issue = issue
             issue_str, comments, number = self._process_issue(issue)
             issue_key = f"issue_{number}"
             username = issue.user.login
@@ -327,24 +405,47 @@ class PRSimilarIssue:
                                                   level=IssueLevel.COMMENT)
                             )
                             corpus.append(comment_record)
+        return corpus
+
+    def _update_local_store_with_issues(self, issues_list, repo_name_for_index):
+        get_logger().info('Processing issues...')
+        # the issues are synced from the oldest update, so they are not limited by 'max_issues_to_scan' - otherwise
+        # the sync mark would only advance by that many of the oldest issues per run, never reaching the recent ones
+        corpus = self._build_corpus(issues_list, repo_name_for_index, limit_issues=False)
+        records = corpus.documents[1:]  # the local store tracks its sync state instead of an example issue record
+        get_logger().info('Done')
+
+        # embed only the records that are new or whose text changed
+        text_hashes = {record.id: hashlib.sha256(record.text.encode("utf-8")).hexdigest() for record in records}
+        stored_text_hashes = self.vector_store.get_text_hashes(text_hashes.keys())
+        records = [record for record in records if stored_text_hashes.get(record.id) != text_hashes[record.id]]
+        get_logger().info(f'Embedding {len(records)} new or updated records...')
+        embeds = embed_texts([record.text for record in records])
+        records_and_embeds = [(record, embed) for record, embed in zip(records, embeds) if embed is not None]
+        sync_state = {}
+        if len(records_and_embeds) < len(records):
+            # keep the previous sync mark, so the next sync fetches the issues of the failed records again (records
+            # that were embedded are skipped then, by their text hash)
+            get_logger().error(f"Failed to embed {len(records) - len(records_and_embeds)} records, "
+                               f"the sync state of {repo_name_for_index} is not advanced")
+        elif self.last_synced_issue:
+            sync_state[repo_name_for_index] = {"updated_at": self.last_synced_issue.updated_at.isoformat(),
+                                               "issue_number": self.last_synced_issue.number}
+        self.vector_store.upsert([{"id": record.id, "metadata": record.metadata.dict(), "text_hash": text_hashes[record.id]}
+                                  for record, _ in records_and_embeds],
+                                 [embed for _, embed in records_and_embeds],
+                                 sync_state=sync_state)
+        get_logger().info('Done')
+
+    def _update_index_with_issues(self, issues_list, repo_name_for_index, upsert=False):
+        get_logger().info('Processing issues...')
+        corpus = self._build_corpus(issues_list, repo_name_for_index)
         df = pd.DataFrame(corpus.dict()["documents"])
         get_logger().info('Done')
 
         get_logger().info('Embedding...')
-        openai.api_key = get_settings().openai.key
         list_to_encode = list(df["text"].values)
-        try:
-            res = openai.Embedding.create(input=list_to_encode, engine=MODEL)
-            embeds = [record['embedding'] for record in res['data']]
-        except:
-            embeds = []
-            get_logger().error('Failed to embed entire list, embedding one by one...')
-            for i, text in enumerate(list_to_encode):
-                try:
-                    res = openai.Embedding.create(input=[text], engine=MODEL)
-                    embeds.append(res['data'][0]['embedding'])
-                except:
-                    embeds.append([0] * 1536)
+        embeds = [embed if embed is not None else [0] * EMBEDDING_DIMENSION for embed in embed_texts(list_to_encode)]
         df["values"] = embeds
         meta = DatasetMetadata.empty()
         meta.dense_model.dimension = len(embeds[0])
@@ -369,78 +470,13 @@ class PRSimilarIssue:
 
     def _update_table_with_issues(self, issues_list, repo_name_for_index, ingest=False):
         get_logger().info('Processing issues...')
-
-        corpus = Corpus()
-        example_issue_record = Record(
-            id=f"example_issue_{repo_name_for_index}",
-            text="example_issue",
-            metadata=Metadata(repo=repo_name_for_index)
-        )
-        corpus.append(example_issue_record)
-
-        counter = 0
-        for issue in issues_list:
-            if issue.pull_request:
-                continue
-
-            counter += 1
-            if counter % 100 == 0:
-                get_logger().info(f"Scanned {counter} issues")
-            if counter >= self.max_issues_to_scan:
-                get_logger().info(f"Scanned {self.max_issues_to_scan} issues, stopping")
-                break
-
-            issue_str, comments, number = self._process_issue(issue)
-            issue_key = f"issue_{number}"
-            username = issue.user.login
-            created_at = str(issue.created_at)
-            if len(issue_str) < 8000 or \
-                    self.token_handler.count_tokens(issue_str) < get_max_tokens(MODEL):  # fast reject first
-                issue_record = Record(
-                    id=issue_key + "." + "issue",
-                    text=issue_str,
-                    metadata=Metadata(repo=repo_name_for_index,
-                                        username=username,
-                                        created_at=created_at,
-                                        level=IssueLevel.ISSUE)
-                )
-                corpus.append(issue_record)
-                if comments:
-                    for j, comment in enumerate(comments):
-                        comment_body = comment.body
-                        num_words_comment = len(comment_body.split())
-                        if num_words_comment < 10 or not isinstance(comment_body, str):
-                            continue
-
-                        if len(comment_body) < 8000 or \
-                                self.token_handler.count_tokens(comment_body) < MAX_TOKENS[MODEL]:
-                            comment_record = Record(
-                                id=issue_key + ".comment_" + str(j + 1),
-                                text=comment_body,
-                                metadata=Metadata(repo=repo_name_for_index,
-                                                    username=username,  # use issue username for all comments
-                                                    created_at=created_at,
-                                                    level=IssueLevel.COMMENT)
-                            )
-                            corpus.append(comment_record)
+        corpus = self._build_corpus(issues_list, repo_name_for_index)
         df = pd.DataFrame(corpus.dict()["documents"])
         get_logger().info('Done')
 
         get_logger().info('Embedding...')
-        openai.api_key = get_settings().openai.key
         list_to_encode = list(df["text"].values)
-        try:
-            res = openai.Embedding.create(input=list_to_encode, engine=MODEL)
-            embeds = [record['embedding'] for record in res['data']]
-        except:
-            embeds = []
-            get_logger().error('Failed to embed entire list, embedding one by one...')
-            for i, text in enumerate(list_to_encode):
-                try:
-                    res = openai.Embedding.create(input=[text], engine=MODEL)
-                    embeds.append(res['data'][0]['embedding'])
-                except:
-                    embeds.append([0] * 1536)
+        embeds = [embed if embed is not None else [0] * EMBEDDING_DIMENSION for embed in embed_texts(list_to_encode)]
         df["vector"] = embeds
         get_logger().info('Done')
 
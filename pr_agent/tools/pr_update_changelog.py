@@ -23,8 +23,10 @@ class PRUpdateChangelog:
     def __init__(self, pr_url: str, cli_mode=False, args=None, ai_handler: partial[BaseAiHandler,] = LiteLLMAIHandler):
 
         self.git_provider = get_git_provider()(pr_url)
+        self.pr_metadata = self.git_provider.prefetch_pr_metadata(
+            ('languages', 'files', 'branch', 'description_full', 'commit_messages'))
         self.main_language = get_main_pr_language(
-            self.git_provider.get_languages(), self.git_provider.get_files()
+            self.pr_metadata.languages, self.pr_metadata.files
         )
         self.commit_changelog = get_settings().pr_update_changelog.push_changelog_changes
         self._get_changelog_file()  # self.changelog_file_str
@@ -37,15 +39,15 @@ class PRUpdateChangelog:
         self.cli_mode = cli_mode
         self.vars = {
             "title": self.git_provider.pr.title,
-            "branch": self.git_provider.get_pr_branch(),
-            "description": self.git_provider.get_pr_description(),
+            "branch": self.pr_metadata.branch,
+            "description": self.pr_metadata.get_pr_description(),
             "language": self.main_language,
             "diff": "",  # empty diff for initial calculation
             "pr_link": "",
             "changelog_file_str": self.changelog_file_str,
             "today": date.today(),
             "extra_instructions": get_settings().pr_update_changelog.extra_instructions,
-            "commit_messages_str": self.git_provider.get_commit_messages(),
+            "commit_messages_str": self.pr_metadata.commit_messages,
         }
         self.token_handler = TokenHandler(self.git_provider.pr,
                                           self.vars,
@@ -142,7 +144,7 @@ class PRUpdateChangelog:
     def _push_changelog_update(self, new_file_content, answer):
         self.git_provider.create_or_update_pr_file(
             file_path="CHANGELOG.md",
-            branch=self.git_provider.get_pr_branch(),
+            branch=self.pr_metadata.branch,
             contents=new_file_content,
             message="[skip ci] Update CHANGELOG.md",
         )
@@ -180,7 +182,7 @@ Example:
     def _get_changelog_file(self):
         try:
             self.changelog_file = self.git_provider.get_pr_file_content(
-                "CHANGELOG.md", self.git_provider.get_pr_branch()
+                "CHANGELOG.md", self.pr_metadata.branch
             )
             changelog_file_lines = self.changelog_file.splitlines()
             changelog_file_lines = changelog_file_lines[:CHANGELOG_LINES]
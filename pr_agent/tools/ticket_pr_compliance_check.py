@@ -1,6 +1,9 @@
+import asyncio
+import copy
 import re
 import traceback
 
+from pr_agent.algo.utils import LRUCache
 from pr_agent.config_loader import get_settings
 from pr_agent.git_providers import GithubProvider
 from pr_agent.log import get_logger
@@ -9,6 +12,12 @@ from pr_agent.log import get_logger
 GITHUB_TICKET_PATTERN = re.compile(
      r'(https://github[^/]+/[^/]+/[^/]+/issues/\d+)|(\b(\w+)/(\w+)#(\d+)\b)|(#\d+)'
 )
+MAX_TICKET_CHARACTERS = 10000
+MAX_PARALLEL_TICKET_REQUESTS = 8
+# sub-issues can change without updating their parent issue, so cached tickets expire after this many seconds
+TICKETS_CACHE_TTL = 600
+# fetched tickets, keyed by the ticket URL and the issue 'updated_at', shared across PRs
+_TICKETS_CACHE = LRUCache(max_size=1000, ttl=TICKETS_CACHE_TTL)
 
 def find_jira_tickets(text):
     # Regular expression patterns for JIRA tickets
@@ -63,8 +72,83 @@ def extract_ticket_links_from_pr_description(pr_description, repo_path, base_url
     return list(github_tickets)
 
 
+def _clip_ticket_body(body) -> str:
+    body = body or ""
+    if len(body) > MAX_TICKET_CHARACTERS:
+        body = body[:MAX_TICKET_CHARACTERS] + "..."
+    return body
+
+
+async def _fetch_sub_issue(git_provider, sub_issue_url, semaphore):
+    try:
+        sub_repo, sub_issue_number = git_provider._parse_issue_url(sub_issue_url)
+        async with semaphore:
+            sub_issue = await asyncio.to_thread(git_provider.repo_obj.get_issue, sub_issue_number)
+        return {
+            'ticket_url': sub_issue_url,
+            'title': sub_issue.title,
+            'body': _clip_ticket_body(sub_issue.body)
+        }
+    except Exception as e:
+        get_logger().warning(f"Failed to fetch sub-issue content for {sub_issue_url}: {e}")
+        return None
+
+
+async def _fetch_ticket(git_provider, ticket, semaphore):
+    repo_name, original_issue_number = git_provider._parse_issue_url(ticket)
+
+    try:
+        async with semaphore:
+            issue_main = await asyncio.to_thread(git_provider.repo_obj.get_issue, original_issue_number)
+    except Exception as e:
+        get_logger().error(f"Error getting main issue: {e}",
+                           artifact={"traceback": traceback.format_exc()})
+        return None
+
+    # an issue that was not updated since it was last fetched has the same content and sub-issues
+    cache_key = (ticket, str(getattr(issue_main, 'updated_at', '')))
+    cached_ticket = _TICKETS_CACHE.get(cache_key)
+    if cached_ticket is not None:
+        return copy.deepcopy(cached_ticket)
+
+    # Extract sub-issues
+    sub_issues_content = []
+    is_complete = True
+    try:
+        async with semaphore:
+            sub_issues = await asyncio.to_thread(git_provider.fetch_sub_issues, ticket)
+        # the semaphore is released before gathering, since each sub-issue fetch acquires it
+        results = await asyncio.gather(*[_fetch_sub_issue(git_provider, sub_issue_url, semaphore)
+                                         for sub_issue_url in sub_issues])
+        sub_issues_content = [result for result in results if result is not None]
+        is_complete = len(sub_issues_content) == len(results)
+    except Exception as e:
+        get_logger().warning(f"Failed to fetch sub-issues for {ticket}: {e}")
+        is_complete = False
+
+    # Extract labels
+    labels = []
+    try:
+        for label in issue_main.labels:
+            labels.append(label.name if hasattr(label, 'name') else label)
+    except Exception as e:
+        get_logger().error(f"Error extracting labels error= {e}",
+                           artifact={"traceback": traceback.format_exc()})
+
+    ticket_content = {
+        'ticket_id': issue_main.number,
+        'ticket_url': ticket,
+        'title': issue_main.title,
+        'body': _clip_ticket_body(issue_main.body),
+        'labels': ", ".join(labels),
+        'sub_issues': sub_issues_content  # Store sub-issues content
+    }
+    if is_complete:
+        _TICKETS_CACHE.set(cache_key, copy.deepcopy(ticket_content))
+    return ticket_content
+
+
 async def extract_tickets(git_provider):
-    MAX_TICKET_CHARACTERS = 10000
     try:
         if isinstance(git_provider, GithubProvider):
             user_description = git_provider.get_user_description()
@@ -72,62 +156,11 @@ async def extract_tickets(git_provider):
             tickets_content = []
 
             if tickets:
-
-                for ticket in tickets:
-                    repo_name, original_issue_number = git_provider._parse_issue_url(ticket)
-
-                    try:
-                        issue_main = git_provider.repo_obj.get_issue(original_issue_number)
-                    except Exception as e:
-                        get_logger().error(f"Error getting main issue: {e}",
-                                           artifact={"traceback": traceback.format_exc()})
-                        continue
-
-                    issue_body_str = issue_main.body or ""
-                    if len(issue_body_str) > MAX_TICKET_CHARACTERS:
-                        issue_body_str = issue_body_str[:MAX_TICKET_CHARACTERS] + "..."
-
-                    # Extract sub-issues
-                    sub_issues_content = []
-                    try:
-                        sub_issues = git_provider.fetch_sub_issues(ticket)
-                        for sub_issue_url in sub_issues:
-                            try:
-                                sub_repo, sub_issue_number = git_provider._parse_issue_url(sub_issue_url)
-                                sub_issue = git_provider.repo_obj.get_issue(sub_issue_number)
-
-                                sub_body = sub_issue.body or ""
-                                if len(sub_body) > MAX_TICKET_CHARACTERS:
-                                    sub_body = sub_body[:MAX_TICKET_CHARACTERS] + "..."
-
-                                sub_issues_content.append({
-                                    'ticket_url': sub_issue_url,
-                                    'title': sub_issue.title,
-                                    'body': sub_body
-                                })
-                            except Exception as e:
-                                get_logger().warning(f"Failed to fetch sub-issue content for {sub_issue_url}: {e}")
-
-                    except Exception as e:
-                        get_logger().warning(f"Failed to fetch sub-issues for {ticket}: {e}")
-
-                    # Extract labels
-                    labels = []
-                    try:
-                        for label in issue_main.labels:
-                            labels.append(label.name if hasattr(label, 'name') else label)
-                    except Exception as e:
-                        get_logger().error(f"Error extracting labels error= {e}",
-                                           artifact={"traceback": traceback.format_exc()})
-
-                    tickets_content.append({
-                        'ticket_id': issue_main.number,
-                        'ticket_url': ticket,
-                        'title': issue_main.title,
-                        'body': issue_body_str,
-                        'labels': ", ".join(labels),
-                        'sub_issues': sub_issues_content  # Store sub-issues content
-                    })
+                # the tickets and their sub-issues are fetched concurrently, with a bounded number of open requests
+                semaphore = asyncio.Semaphore(MAX_PARALLEL_TICKET_REQUESTS)
+                results = await asyncio.gather(*[_fetch_ticket(git_provider, ticket, semaphore)
+                                                 for ticket in tickets])
+                tickets_content = [result for result in results if result is not None]
 
                 return tickets_content
 
@@ -0,0 +1,97 @@
+"""
+Benchmarks the single-pass packer of the compressed diff ('generate_full_patches') against the previous approach of
+one 'generate_full_patch' scan per patch group, on a synthetic PR.
+
+Tokens are counted with a whitespace tokenizer, so the timings measure the packing itself.
+
+Usage:
+    PYTHONPATH=. python tests/benchmarks/benchmark_compressed_diff_packing.py [--files N] [--max-calls N]
+"""
+import argparse
+import random
+import time
+
+from pr_agent.algo.pr_processing import (OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD,
+                                         OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD,
+                                         generate_full_patches)
+from pr_agent.algo.token_handler import TokenEncoder, TokenHandler
+
+MAX_TOKENS_MODEL = 32000
+
+
+def make_file_dict(num_files: int, seed: int = 0) -> dict:
+    rnd = random.Random(seed)
+    file_dict = {}
+    for i in range(num_files):
+        num_lines = int(rnd.paretovariate(1.2) * 5)
+        patch = "@@ -1 +1 @@\n" + "\n".join(f"+line {j} of file {i}" for j in range(num_lines))
+        file_dict[f"src/module_{i}.py"] = {'patch': patch, 'tokens': len(patch.split()), 'edit_type': None}
+    # same order as 'pr_generate_compressed_diff' - by decreasing size
+    return dict(sorted(file_dict.items(), key=lambda item: item[1]['tokens'], reverse=True))
+
+
+def legacy_generate_full_patch(file_dict, max_tokens_model, remaining_files_list_prev, token_handler):
+    # the previous implementation: list membership, one full scan per group, and a re-count of each added patch
+    total_tokens = token_handler.prompt_tokens
+    patches, remaining_files_list_new, files_in_patch_list = [], [], []
+    for filename, data in file_dict.items():
+        if filename not in remaining_files_list_prev:
+            continue
+        patch, new_patch_tokens = data['patch'], data['tokens']
+        if total_tokens > max_tokens_model - OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD:
+            continue
+        if total_tokens + new_patch_tokens > max_tokens_model - OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD:
+            remaining_files_list_new.append(filename)
+            continue
+        if patch:
+            patch_final = f"\n\n## File: '{filename.strip()}'\n\n{patch.strip()}\n"
+            patches.append(patch_final)
+            total_tokens += token_handler.count_tokens(patch_final)
+            files_in_patch_list.append(filename)
+    return total_tokens, patches, remaining_files_list_new, files_in_patch_list
+
+
+def legacy_pack(file_dict, token_handler, max_calls):
+    remaining_files_list = list(file_dict)
+    patches_list = []
+    for _ in range(max_calls):
+        _, patches, remaining_files_list, _ = legacy_generate_full_patch(file_dict, MAX_TOKENS_MODEL,
+                                                                         remaining_files_list, token_handler)
+        if not patches:
+            break
+        patches_list.append(patches)
+    return patches_list, remaining_files_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--max-calls", type=int, default=50)
+    args = parser.parse_args()
+
+    TokenEncoder.register_tokenizer("benchmark", lambda model: lambda text: text.split())
+    token_handler = TokenHandler(model="benchmark-model")
+    token_handler.prompt_tokens = 1000
+    file_dict = make_file_dict(args.files)
+    print(f"{len(file_dict)} files, {sum(d['tokens'] for d in file_dict.values())} tokens, "
+          f"up to {args.max_calls} groups of {MAX_TOKENS_MODEL} tokens")
+
+    start = time.perf_counter()
+    legacy_patches_list, legacy_remaining = legacy_pack(file_dict, token_handler, args.max_calls)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, patches_list, remaining, _ = generate_full_patches(False, file_dict, MAX_TOKENS_MODEL, list(file_dict),
+                                                          token_handler, max_groups=args.max_calls)
+    new_time = time.perf_counter() - start
+
+    for name, groups, left, elapsed in (("per-group scans", legacy_patches_list, legacy_remaining, legacy_time),
+                                        ("single pass", patches_list, remaining, new_time)):
+        packed = sum(len(group) for group in groups)
+        print(f"{name:>16}: {elapsed * 1000:9.1f} ms, {len(groups)} groups, {packed} files packed, "
+              f"{len(left)} files left")
+    print(f"speedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmarks the diff engines of 'load_large_diff' ('git diff --no-index', the pure python Myers diff, and difflib with
+trimmed common prefix and suffix) on a synthetic large file with scattered edits.
+
+Usage:
+    PYTHONPATH=. python tests/benchmarks/benchmark_load_large_diff.py [--lines N] [--edits N] [--skip-difflib]
+"""
+import argparse
+import random
+import time
+
+from pr_agent.algo.diff_engine import diff_lines, is_git_available
+
+
+def make_file_versions(num_lines: int, num_edits: int, seed: int = 0):
+    rnd = random.Random(seed)
+    # a small vocabulary, so that many lines repeat, as in real code (blank lines, braces, returns...)
+    vocabulary = [f"    statement_{i}(value)\n" for i in range(200)] + ["\n", "    }\n", "    return None\n"]
+    original_lines = [rnd.choice(vocabulary) for _ in range(num_lines)]
+    new_lines = list(original_lines)
+    for _ in range(num_edits):
+        position = rnd.randrange(len(new_lines))
+        operation = rnd.random()
+        if operation < 0.33:
+            del new_lines[position]
+        elif operation < 0.66:
+            new_lines.insert(position, f"    added_{rnd.randrange(10 ** 6)}()\n")
+        else:
+            new_lines[position] = f"    modified_{rnd.randrange(10 ** 6)}()\n"
+    return original_lines, new_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--skip-difflib", action="store_true", help="difflib may take minutes on scattered edits")
+    args = parser.parse_args()
+
+    original_lines, new_lines = make_file_versions(args.lines, args.edits)
+    print(f"{len(original_lines)} -> {len(new_lines)} lines, {args.edits} edits")
+
+    engines = ["git", "myers"] if is_git_available() else ["myers"]
+    if not args.skip_difflib:
+        engines.append("difflib")
+    for engine in engines:
+        start = time.perf_counter()
+        diff = diff_lines(original_lines, new_lines, engine=engine)
+        elapsed = time.perf_counter() - start
+        changed = sum(1 for line in diff[2:] if line[:1] in ("+", "-"))
+        print(f"{engine:>8}: {elapsed * 1000:9.1f} ms, {len(diff)} patch lines, {changed} changed lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compares TokenHandler.estimate_tokens against the exact tiktoken count on a corpus of real diffs.
+
+The corpus is the per-file patches of the last commits of a local git repository (this repository by default).
+
+Usage:
+    PYTHONPATH=. python tests/benchmarks/benchmark_token_estimator.py [--repo PATH] [--commits N]
+"""
+import argparse
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+
+from pr_agent.algo.token_handler import TokenHandler
+
+
+def load_patches(repo: str, commits: int) -> list:
+    log = subprocess.run(["git", "-C", repo, "log", "-p", "--no-color", "--format=", f"-{commits}"],
+                         capture_output=True, text=True, errors="replace", check=True).stdout
+    patches = []
+    for part in log.split("diff --git ")[1:]:
+        header, _, body = part.partition("\n@@")
+        if not body:
+            continue  # binary files, renames without changes
+        filename = header.split("\n", 1)[0].split(" b/")[-1]
+        patches.append((filename, "@@" + body))
+    return patches
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", default=".")
+    parser.add_argument("--commits", type=int, default=200)
+    args = parser.parse_args()
+
+    patches = load_patches(args.repo, args.commits)
+    token_handler = TokenHandler()
+    texts = [patch for _, patch in patches]
+    filenames = [filename for filename, _ in patches]
+
+    start = time.perf_counter()
+    exact = [token_handler.count_tokens(text) for text in texts]
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    estimated = token_handler.estimate_tokens_batch(texts, filenames)
+    estimate_time = time.perf_counter() - start
+
+    errors_by_extension = defaultdict(list)
+    errors = []
+    for filename, exact_tokens, estimated_tokens in zip(filenames, exact, estimated):
+        if exact_tokens < 20:
+            continue
+        error = estimated_tokens / exact_tokens - 1
+        errors.append(error)
+        errors_by_extension[filename.rsplit(".", 1)[-1] if "." in filename else "<none>"].append(error)
+
+    print(f"patches: {len(patches)}, exact tokens: {sum(exact)}, estimated tokens: {sum(estimated)} "
+          f"(total error {sum(estimated) / max(sum(exact), 1) - 1:+.1%})")
+    print(f"exact count: {exact_time * 1000:.1f} ms, estimate: {estimate_time * 1000:.1f} ms")
+    if errors:
+        print(f"per-patch relative error: median {statistics.median(errors):+.1%}, "
+              f"p5 {percentile(errors, 0.05):+.1%}, p95 {percentile(errors, 0.95):+.1%}")
+    for extension, extension_errors in sorted(errors_by_extension.items(), key=lambda item: -len(item[1])):
+        print(f"  .{extension:<10} n={len(extension_errors):<5} median error {statistics.median(extension_errors):+.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Measures the error margin of counting the tokens of a model family with 'cl100k_base', as TokenEncoder does for the
+families without an exact local tokenizer (see MODEL_FAMILY_TOKEN_MARGINS in pr_agent/algo/token_handler.py).
+
+For each patch of the corpus, the ratio between the count of the family tokenizer and the 'cl100k_base' count is
+measured. The margin is the 95th percentile of 'ratio - 1', so that 95% of the patches are not undercounted.
+
+The corpus is the per-file patches of the last commits of a local git repository (this repository by default).
+The Claude tokenizer bundled with litellm is measured by default; other families can be measured with a HuggingFace
+'tokenizer.json' file.
+
+Usage:
+    PYTHONPATH=. python tests/benchmarks/benchmark_token_margins.py [--repo PATH] [--commits N]
+        [--tokenizer FAMILY=PATH/TO/tokenizer.json ...]
+"""
+import argparse
+import os
+import statistics
+
+from tiktoken import get_encoding
+from tokenizers import Tokenizer
+
+from tests.benchmarks.benchmark_token_estimator import load_patches, percentile
+
+
+def default_tokenizers() -> dict:
+    import litellm
+    path = os.path.join(os.path.dirname(litellm.__file__), "litellm_core_utils", "tokenizers",
+                        "anthropic_tokenizer.json")
+    return {"claude": path} if os.path.exists(path) else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", default=".")
+    parser.add_argument("--commits", type=int, default=200)
+    parser.add_argument("--tokenizer", action="append", default=[], metavar="FAMILY=PATH")
+    args = parser.parse_args()
+
+    tokenizers = default_tokenizers()
+    tokenizers.update(dict(value.split("=", 1) for value in args.tokenizer))
+    texts = [patch for _, patch in load_patches(args.repo, args.commits)]
+    encoder = get_encoding("cl100k_base")
+    approximate = [len(encoder.encode(text, disallowed_special=())) for text in texts]
+
+    print(f"patches: {len(texts)}, cl100k_base tokens: {sum(approximate)}")
+    for family, path in sorted(tokenizers.items()):
+        tokenizer = Tokenizer.from_file(path)
+        exact = [len(encoding.ids) for encoding in tokenizer.encode_batch(texts, add_special_tokens=False)]
+        ratios = [exact_tokens / approximate_tokens - 1
+                  for exact_tokens, approximate_tokens in zip(exact, approximate) if approximate_tokens >= 20]
+        print(f"{family:<10} tokens: {sum(exact)} (total {sum(exact) / max(sum(approximate), 1) - 1:+.1%}), "
+              f"per-patch: median {statistics.median(ratios):+.1%}, p95 {percentile(ratios, 0.95):+.1%}, "
+              f"max {max(ratios):+.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import pytest
+
+from pr_agent.algo.token_handler import TokenEncoder
+
+
+@pytest.fixture
+def token_encoder_registry(monkeypatch):
+    """
+    Isolates the global TokenEncoder registry, so that tokenizers registered by a test are removed after it.
+    """
+    monkeypatch.setattr(TokenEncoder, "_family_tokenizers", dict(TokenEncoder._family_tokenizers))
+    monkeypatch.setattr(TokenEncoder, "_encoders", dict(TokenEncoder._encoders))
+    monkeypatch.setattr(TokenEncoder, "_exact_models", set(TokenEncoder._exact_models))
+    return TokenEncoder
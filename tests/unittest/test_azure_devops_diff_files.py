@@ -0,0 +1,79 @@
+import threading
+from types import SimpleNamespace
+
+from pr_agent.algo.types import EDIT_TYPE
+from pr_agent.config_loader import get_settings
+from pr_agent.git_providers import AzureDevopsProvider
+from pr_agent.git_providers.git_provider import MAX_FILES_ALLOWED_FULL
+
+
+class FakeAzureDevopsClient:
+    def __init__(self, changes, contents):
+        self.changes = changes
+        self.contents = contents
+        self.item_requests = []
+        self.lock = threading.Lock()
+
+    def get_pull_request_iterations(self, repository_id, pull_request_id, project):
+        return [SimpleNamespace(id=1)]
+
+    def get_pull_request_iteration_changes(self, repository_id, pull_request_id, iteration_id, project):
+        return SimpleNamespace(change_entries=[
+            SimpleNamespace(additional_properties={'item': {'path': path}, 'changeType': change_type})
+            for path, change_type in self.changes])
+
+    def get_item(self, repository_id, path, project, version_descriptor, download, include_content):
+        with self.lock:
+            self.item_requests.append((path, version_descriptor.version))
+        if (path, version_descriptor.version) not in self.contents:
+            raise Exception("item not found")
+        return SimpleNamespace(content=self.contents[(path, version_descriptor.version)])
+
+
+def make_provider(client):
+    provider = AzureDevopsProvider.__new__(AzureDevopsProvider)
+    provider.azure_devops_client = client
+    provider.repo_slug = "repo"
+    provider.workspace_slug = "project"
+    provider.pr_num = 1
+    provider.diff_files = None
+    provider.pr = SimpleNamespace(last_merge_target_commit=SimpleNamespace(commit_id="base"),
+                                  last_merge_source_commit=SimpleNamespace(commit_id="head"))
+    return provider
+
+
+class TestAzureDevopsDiffFiles:
+    def test_contents_and_patches(self):
+        changes = [("/src/a.py", "edit"), ("/src/b.py", "add"), ("/src/c.py", "delete")]
+        contents = {("/src/a.py", "base"): "x = 1\n", ("/src/a.py", "head"): "x = 2\n",
+                    ("/src/b.py", "head"): "y = 1\n", ("/src/c.py", "base"): "z = 1\n"}
+        client = FakeAzureDevopsClient(changes, contents)
+
+        diff_files = make_provider(client).get_diff_files()
+
+        assert [file.filename for file in diff_files] == ["/src/a.py", "/src/b.py", "/src/c.py"]
+        assert [file.edit_type for file in diff_files] == [EDIT_TYPE.MODIFIED, EDIT_TYPE.ADDED, EDIT_TYPE.DELETED]
+        assert (diff_files[0].base_file, diff_files[0].head_file) == ("x = 1\n", "x = 2\n")
+        assert "-x = 1" in diff_files[0].patch and "+x = 2" in diff_files[0].patch
+        assert diff_files[2].head_file == "" and "-z = 1" in diff_files[2].patch
+        # the original content of added files is not requested
+        assert ("/src/b.py", "base") not in client.item_requests
+
+    def test_only_limited_number_of_files_keep_full_content(self, monkeypatch):
+        changes = [(f"/f{i}.py", "edit") for i in range(MAX_FILES_ALLOWED_FULL + 10)]
+        contents = {}
+        for i in range(len(changes)):
+            contents[(f"/f{i}.py", "base")] = "a\n"
+            contents[(f"/f{i}.py", "head")] = "b\n"
+        client = FakeAzureDevopsClient(changes, contents)
+        monkeypatch.setattr(get_settings().azure_devops, "max_files_with_patch", MAX_FILES_ALLOWED_FULL + 5,
+                            raising=False)
+
+        diff_files = make_provider(client).get_diff_files()
+
+        assert len(diff_files) == len(changes)
+        assert len({path for path, _ in client.item_requests}) == MAX_FILES_ALLOWED_FULL + 5
+        assert diff_files[0].patch and diff_files[0].head_file == "b\n"
+        # past MAX_FILES_ALLOWED_FULL, the patch is kept without the full content
+        assert diff_files[MAX_FILES_ALLOWED_FULL].patch and diff_files[MAX_FILES_ALLOWED_FULL].head_file == ""
+        assert diff_files[-1].patch == "" and diff_files[-1].head_file == ""
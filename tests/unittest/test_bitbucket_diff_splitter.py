@@ -0,0 +1,104 @@
+from unittest.mock import MagicMock, patch
+
+from pr_agent.algo.types import EDIT_TYPE
+from pr_agent.config_loader import get_settings
+from pr_agent.git_providers.bitbucket_provider import (BitbucketProvider,
+                                                       iter_file_patches)
+
+# in the format of 'git diff'
+PR_DIFF = (b"diff --git a/src/app.py b/src/app.py\n"
+           b"index caa56f0..61528d7 100644\n"
+           b"--- a/src/app.py\n"
+           b"+++ b/src/app.py\n"
+           b"@@ -1,2 +1,2 @@\n"
+           b" import os\n"
+           b"--- removed line that looks like a header\n"
+           b"+added line\n"
+           b"diff --git a/docs/new file.md b/docs/new file.md\n"
+           b"new file mode 100644\n"
+           b"index 0000000..61528d7\n"
+           b"--- /dev/null\n"
+           b"+++ b/docs/new file.md\t\n"  # git ends the paths with spaces with a TAB
+           b"@@ -0,0 +1 @@\n"
+           b"+caf\xe9\n"
+           b"diff --git a/old.py b/old.py\n"
+           b"deleted file mode 100644\n"
+           b"index 61528d7..0000000\n"
+           b"--- a/old.py\n"
+           b"+++ /dev/null\n"
+           b"@@ -1 +0,0 @@\n"
+           b"-gone\n"
+           b"diff --git a/logo.png b/logo.png\n"
+           b"index caa56f0..61528d7 100644\n"
+           b"Binary files a/logo.png and b/logo.png differ\n"
+           b"diff --git a/before.py b/after.py\n"
+           b"similarity index 100%\n"
+           b"rename from before.py\n"
+           b"rename to after.py\n")
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestIterFilePatches:
+    def test_split_per_file(self):
+        expected = [
+            ("src/app.py", "src/app.py",
+             "@@ -1,2 +1,2 @@\n import os\n--- removed line that looks like a header\n+added line"),
+            (None, "docs/new file.md", "@@ -0,0 +1 @@\n+caf\xe9"),
+            ("old.py", None, "@@ -1 +0,0 @@\n-gone"),
+            ("logo.png", "logo.png", ""),
+            ("before.py", "after.py", ""),
+        ]
+        # the result does not depend on where the chunks of the response end
+        for chunk_size in (1, 7, 64, len(PR_DIFF)):
+            assert list(iter_file_patches(chunked(PR_DIFF, chunk_size))) == expected
+
+    def test_quoted_paths_and_empty_diff(self):
+        diff = (b'diff --git "a/caf\\303\\251.py" "b/caf\\303\\251.py"\n'
+                b'--- "a/caf\\303\\251.py"\n'
+                b'+++ "b/caf\\303\\251.py"\n'
+                b'@@ -1 +1 @@\n-a\n+b\n')
+        assert list(iter_file_patches([diff])) == [("caf\xe9.py", "caf\xe9.py", "@@ -1 +1 @@\n-a\n+b")]
+        assert list(iter_file_patches([])) == []
+
+
+def make_diffstat(status, old_path, new_path, lines_added=1, lines_removed=1):
+    diff = MagicMock()
+    diff.old.path, diff.new.path = old_path, new_path
+    diff.old.get_data.return_value = None
+    diff.new.get_data.return_value = None
+    diff.data = {'status': status, 'lines_added': lines_added, 'lines_removed': lines_removed}
+    return diff
+
+
+class TestBitbucketGetDiffFiles:
+    def test_patches_are_matched_to_diffstat_by_path(self, monkeypatch):
+        provider = BitbucketProvider.__new__(BitbucketProvider)
+        provider.diff_files = None
+        provider.headers = {}
+        provider.bitbucket_pull_request_api_url = "https://api.bitbucket.org/2.0/repositories/ws/repo/pullrequests/1"
+        provider.pr = MagicMock()
+        # a different order than the diff, and a file the diff does not have
+        provider.pr.diffstat.return_value = [
+            make_diffstat('removed', 'old.py', None),
+            make_diffstat('added', None, 'docs/new file.md'),
+            make_diffstat('modified', 'src/app.py', 'src/app.py'),
+            make_diffstat('modified', 'missing.py', 'missing.py'),
+        ]
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.iter_content.side_effect = lambda chunk_size: iter(chunked(PR_DIFF, 10))
+        monkeypatch.setattr(get_settings().bitbucket_app, "avoid_full_files", True, raising=False)
+
+        with patch("pr_agent.git_providers.bitbucket_provider.requests.get", return_value=response) as get:
+            diff_files = provider.get_diff_files()
+
+        assert get.call_args.args[0] == provider.bitbucket_pull_request_api_url + "/diff"
+        assert [(file.filename, file.edit_type) for file in diff_files] == [
+            ("old.py", EDIT_TYPE.DELETED), ("docs/new file.md", EDIT_TYPE.ADDED),
+            ("src/app.py", EDIT_TYPE.MODIFIED), ("missing.py", EDIT_TYPE.MODIFIED)]
+        assert [file.patch for file in diff_files] == [
+            "@@ -1 +0,0 @@\n-gone", "@@ -0,0 +1 @@\n+caf\xe9",
+            "@@ -1,2 +1,2 @@\n import os\n--- removed line that looks like a header\n+added line", ""]
@@ -3,8 +3,10 @@ from unittest.mock import MagicMock
 from atlassian.bitbucket import Bitbucket
 
 from pr_agent.algo.types import EDIT_TYPE, FilePatchInfo
+from pr_agent.config_loader import get_settings
 from pr_agent.git_providers import BitbucketServerProvider
 from pr_agent.git_providers.bitbucket_provider import BitbucketProvider
+from pr_agent.git_providers.git_provider import MAX_FILES_ALLOWED_FULL
 
 
 class TestBitbucketProvider:
@@ -304,3 +306,79 @@ class TestBitbucketServerProvider:
         actual = provider.get_diff_files()
 
         assert actual == expected
+
+    def test_get_diff_files_caches_merge_base(self):
+        bitbucket_client = self.get_multi_merge_diverge_mock_client(70)
+        bitbucket_client.get_pull_request.return_value = {
+            'toRef': {'latestCommit': '1111111111111111111111111111111111111111'},
+            'fromRef': {'latestCommit': 'ae4eca7f222c96d396927d48ab7538e2ee13ca63'}
+        }
+
+        for _ in range(2):
+            provider = BitbucketServerProvider(
+                "https://git.onpreminstance.com/projects/AAA/repos/my-repo/pull-requests/1",
+                bitbucket_client=bitbucket_client
+            )
+            provider.get_diff_files()
+
+        # the commits of both branches are listed only for the first provider
+        assert bitbucket_client.get_pull_requests_commits.call_count == 1
+        assert bitbucket_client.get_commits.call_count == 1
+
+    def test_get_diff_files_loads_contents_per_change_type(self):
+        bitbucket_client = self.get_multi_merge_diverge_mock_client(816)
+        bitbucket_client.get_pull_requests_changes.return_value = [
+            {'path': {'toString': 'added.py'}, 'type': 'ADD'},
+            {'path': {'toString': 'deleted.py'}, 'type': 'DELETE'},
+            {'path': {'toString': 'renamed.py'}, 'srcPath': {'toString': 'source.py'}, 'type': 'RENAME'},
+            {'path': {'toString': 'image.png'}, 'type': 'MODIFY'},
+        ]
+        contents = {('added.py', 'ae4eca7f222c96d396927d48ab7538e2ee13ca63'): 'new\n',
+                    ('deleted.py', '548f8ba15abc30875a082156314426806c3f4d97'): b'old\n',
+                    ('source.py', '548f8ba15abc30875a082156314426806c3f4d97'): 'a\nb\n',
+                    ('renamed.py', 'ae4eca7f222c96d396927d48ab7538e2ee13ca63'): 'a\nc\n'}
+        bitbucket_client.get_content_of_file.side_effect = \
+            lambda project_key, repository_slug, filename, at=None, markup=None: contents[(filename, at)]
+
+        provider = BitbucketServerProvider(
+            "https://git.onpreminstance.com/projects/AAA/repos/my-repo/pull-requests/1",
+            bitbucket_client=bitbucket_client
+        )
+        actual = provider.get_diff_files()
+
+        assert [(file.filename, file.edit_type, file.base_file, file.head_file) for file in actual] == [
+            ('added.py', EDIT_TYPE.ADDED, '', 'new\n'),
+            ('deleted.py', EDIT_TYPE.DELETED, 'old\n', ''),
+            ('renamed.py', EDIT_TYPE.RENAMED, 'a\nb\n', 'a\nc\n'),
+        ]
+        assert actual[2].patch == '--- \n+++ \n@@ -1,2 +1,2 @@\n a\n-b\n+c\n'
+        assert bitbucket_client.get_content_of_file.call_count == 4
+
+    def test_get_diff_files_reads_patches_of_files_past_the_full_limit(self, monkeypatch):
+        bitbucket_client = self.get_multi_merge_diverge_mock_client(816)
+        changes = [{'path': {'toString': f'f{i}.py'}, 'type': 'MODIFY'} for i in range(MAX_FILES_ALLOWED_FULL + 2)]
+        bitbucket_client.get_pull_requests_changes.return_value = changes
+        bitbucket_client.get_content_of_file.side_effect = \
+            lambda project_key, repository_slug, filename, at=None, markup=None: 'a\n'
+        file_diff = {'diffs': [{'hunks': [{'sourceLine': 1, 'sourceSpan': 2, 'destinationLine': 1,
+                                           'destinationSpan': 2, 'segments': [
+                                               {'type': 'CONTEXT', 'lines': [{'line': 'a'}]},
+                                               {'type': 'REMOVED', 'lines': [{'line': 'b'}]},
+                                               {'type': 'ADDED', 'lines': [{'line': 'c'}]}]}]}]}
+        get = bitbucket_client.get.side_effect
+        bitbucket_client.get.side_effect = lambda url, params=None: file_diff if '/diff/' in url else get(url)
+        monkeypatch.setattr(get_settings().bitbucket_server, "max_files_with_patch", MAX_FILES_ALLOWED_FULL,
+                            raising=False)
+
+        provider = BitbucketServerProvider(
+            "https://git.onpreminstance.com/projects/AAA/repos/my-repo/pull-requests/1",
+            bitbucket_client=bitbucket_client
+        )
+        actual = provider.get_diff_files()
+
+        assert len(actual) == len(changes)
+        assert actual[0].head_file == 'a\n'
+        # the next file is read from the diff API, without its content
+        assert (actual[-3].head_file, actual[-3].patch) == ('', '@@ -1,2 +1,2 @@\n a\n-b\n+c')
+        assert (actual[-2].head_file, actual[-2].patch) == ('', '')
+        assert bitbucket_client.get_content_of_file.call_count == 2 * (MAX_FILES_ALLOWED_FULL - 1)
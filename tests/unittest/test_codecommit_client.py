@@ -103,6 +103,18 @@ class TestCodeCommitProvider:
         assert content == b"boto3==1.28.25\ndynaconf==3.1.12\nfastapi==0.99.0\nPyGithub==1.59.*\n"
         assert content.decode("utf-8") == "boto3==1.28.25\ndynaconf==3.1.12\nfastapi==0.99.0\nPyGithub==1.59.*\n"
 
+    def test_get_blob(self):
+        api = CodeCommitClient()
+        api.boto_client = MagicMock()
+        api.boto_client.get_blob.return_value = {"content": b"print('hello')\n"}
+
+        content = api.get_blob("my_test_repo", "c172209495d7968a8fdad76469564fb708460bc1")
+
+        assert content == b"print('hello')\n"
+        api.boto_client.get_blob.assert_called_once_with(repositoryName="my_test_repo",
+                                                         blobId="c172209495d7968a8fdad76469564fb708460bc1")
+        assert api.get_blob("my_test_repo", "") == b""
+
     def test_get_pr(self):
         # Create a mock CodeCommitClient instance and codecommit_client member
         api = CodeCommitClient()
@@ -189,3 +189,34 @@ class TestCodeCommitProvider:
         input = "## PR Feedback\n<details><summary>Code feedback:</summary>\nfile foo\n</summary>\n"
         expect = "## PR Feedback\nCode feedback:\nfile foo\n\n"
         assert CodeCommitProvider._remove_markdown_html(input) == expect
+
+
+class TestCodeCommitDiffFiles:
+    def test_blobs_are_fetched_once_and_concurrently(self):
+        blobs = {"a1": b"x = 1\n", "b1": b"x = 2\n", "b2": "new file\n", "same": b"unchanged\n"}
+        requested = []
+
+        def get_blob(repo_name, blob_id):
+            requested.append(blob_id)
+            return blobs[blob_id]
+
+        with patch.object(CodeCommitProvider, "__init__", lambda x, y: None):
+            provider = CodeCommitProvider(None)
+            provider.repo_name = "repo"
+            provider.diff_files = None
+            provider.git_files = [
+                CodeCommitFile("a.py", "a1", "a.py", "b1", EDIT_TYPE.MODIFIED),
+                CodeCommitFile("", "", "b.py", "b2", EDIT_TYPE.ADDED),
+                CodeCommitFile("old.py", "same", "new.py", "same", EDIT_TYPE.RENAMED),
+                CodeCommitFile("image.png", "a1", "image.png", "b1", EDIT_TYPE.MODIFIED),
+            ]
+            provider.codecommit_client = type("FakeClient", (), {"get_blob": staticmethod(get_blob)})()
+
+            diff_files = provider.get_diff_files()
+
+        assert [file.filename for file in diff_files] == ["a.py", "b.py", "new.py"]
+        assert sorted(requested) == ["a1", "b1", "b2", "same"]
+        assert (diff_files[0].base_file, diff_files[0].head_file) == ("x = 1\n", "x = 2\n")
+        assert "-x = 1" in diff_files[0].patch and "+x = 2" in diff_files[0].patch
+        assert diff_files[1].base_file == "" and diff_files[1].head_file == "new file\n"
+        assert diff_files[2].patch == "" and diff_files[2].old_filename == "old.py"
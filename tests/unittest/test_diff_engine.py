@@ -0,0 +1,113 @@
+import difflib
+import random
+import re
+
+import pytest
+
+from pr_agent.algo import diff_engine
+from pr_agent.algo.diff_engine import (diff_lines, git_diff_lines,
+                                       myers_diff_lines, register_diff_engine)
+from pr_agent.algo.utils import load_large_diff
+from pr_agent.config_loader import get_settings
+
+_RE_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def apply_patch(original_lines, diff):
+    # applies unified diff lines to the original lines, checking the context and removed lines along the way
+    result, position = [], 0
+    for line in diff[2:]:
+        match = _RE_HUNK_HEADER.match(line)
+        if match:
+            start = int(match.group(1)) - (1 if match.group(2) != "0" else 0)
+            result.extend(original_lines[position:start])
+            position = start
+        elif line[0] in (" ", "-"):
+            assert original_lines[position] == line[1:]
+            if line[0] == " ":
+                result.append(line[1:])
+            position += 1
+        else:
+            result.append(line[1:])
+    return result + original_lines[position:]
+
+
+def random_versions(rnd, max_lines=40):
+    # a small alphabet, so that lines repeat and there are many equally short edit scripts
+    original_lines = [f"{rnd.randrange(6)}\n" for _ in range(rnd.randrange(max_lines))]
+    new_lines = list(original_lines)
+    for _ in range(rnd.randrange(8)):
+        if rnd.random() < 0.5 and new_lines:
+            del new_lines[rnd.randrange(len(new_lines))]
+        else:
+            new_lines.insert(rnd.randint(0, len(new_lines)), f"{rnd.randrange(9)}\n")
+    return original_lines, new_lines
+
+
+class TestMyersDiff:
+    def test_patches_apply_and_are_minimal(self):
+        rnd = random.Random(0)
+        for _ in range(300):
+            original_lines, new_lines = random_versions(rnd)
+            diff = myers_diff_lines(original_lines, new_lines)
+            assert apply_patch(original_lines, diff) == new_lines
+            changed = sum(1 for line in diff[2:] if line[0] in "+-" and not line.startswith("@@"))
+            matcher = difflib.SequenceMatcher(None, original_lines, new_lines, autojunk=False)
+            # a shortest edit script never changes more lines than difflib's
+            assert changed <= len(original_lines) + len(new_lines) - 2 * sum(
+                block.size for block in matcher.get_matching_blocks())
+
+    def test_same_format_as_difflib(self):
+        original_lines = [f"line {i}\n" for i in range(2000)]
+        new_lines = list(original_lines)
+        new_lines[1000] = "changed line\n"
+        new_lines.insert(1500, "inserted line\n")
+        del new_lines[3]
+        assert myers_diff_lines(original_lines, new_lines) == list(difflib.unified_diff(original_lines, new_lines))
+        assert myers_diff_lines(original_lines, list(original_lines)) == []
+        assert myers_diff_lines([], ["a\n"]) == list(difflib.unified_diff([], ["a\n"]))
+
+    def test_timeout_still_returns_a_valid_patch(self):
+        rnd = random.Random(1)
+        original_lines = [f"{rnd.randrange(50)}\n" for _ in range(2000)]
+        new_lines = [f"{rnd.randrange(50)}\n" for _ in range(2000)]
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(diff_engine, "MYERS_DIFF_TIMEOUT_SECONDS", 0)
+            diff = myers_diff_lines(original_lines, new_lines)
+        assert apply_patch(original_lines, diff) == new_lines
+
+
+class TestDiffEngines:
+    @pytest.mark.skipif(not diff_engine.is_git_available(), reason="git is not installed")
+    def test_git_engine(self, monkeypatch):
+        original_lines = [f"line {i}\n" for i in range(100)]
+        new_lines = original_lines[:10] + ["new line\n"] + original_lines[12:]
+        # small files are left to the python engines
+        assert git_diff_lines(original_lines, new_lines) is None
+        monkeypatch.setattr(diff_engine, "GIT_DIFF_MIN_LINES", 0)
+        assert git_diff_lines(original_lines, new_lines) == list(difflib.unified_diff(original_lines, new_lines))
+        assert git_diff_lines(original_lines, list(original_lines)) == []
+
+    def test_custom_engine_and_fallback(self, monkeypatch):
+        monkeypatch.setattr(diff_engine, "_DIFF_ENGINES", dict(diff_engine._DIFF_ENGINES))
+        monkeypatch.setattr(diff_engine, "_DIFF_ENGINES_ORDER", dict(diff_engine._DIFF_ENGINES_ORDER))
+        calls = []
+        register_diff_engine("declining", lambda original_lines, new_lines, context: calls.append(context))
+        original_lines, new_lines = ["a\n", "b\n"], ["a\n", "c\n"]
+        assert diff_lines(original_lines, new_lines, engine="declining") == myers_diff_lines(original_lines, new_lines)
+        assert calls == [3]
+        assert diff_lines(original_lines, new_lines, engine="unknown") == myers_diff_lines(original_lines, new_lines)
+
+    def test_load_large_diff_size_ceilings(self, monkeypatch):
+        monkeypatch.setattr(get_settings().config, "max_diff_file_lines", 5, raising=False)
+        original = "".join(f"line {i}\n" for i in range(10))
+        patch = load_large_diff("big.txt", original + "new line\n", original)
+        assert patch.startswith("--- \n+++ \n@@ -1,10 +1,11 @@ File too large to diff")
+        assert patch.count("\n") == 3
+
+        monkeypatch.setattr(get_settings().config, "max_diff_file_lines", 0, raising=False)
+        monkeypatch.setattr(get_settings().config, "max_diff_file_bytes", 20, raising=False)
+        assert "File too large to diff" in load_large_diff("big.txt", original + "new line\n", original)
+
+        monkeypatch.setattr(get_settings().config, "max_diff_file_bytes", 0, raising=False)
+        assert load_large_diff("big.txt", original + "new line\n", original).endswith("+new line\n")
@@ -0,0 +1,46 @@
+import pytest
+
+from pr_agent.algo.docs_index import (DocsIndex, get_docs_index,
+                                      split_markdown_sections)
+from pr_agent.algo.token_handler import TokenEncoder, TokenHandler
+
+
+class TestDocsIndex:
+    @pytest.fixture(autouse=True)
+    def setup(self, token_encoder_registry):
+        TokenEncoder.register_tokenizer("docsfamily", lambda model: lambda text: text.split())
+        self.token_handler = TokenHandler(model="docsfamily-model")
+
+    def test_split_markdown_sections(self):
+        text = "intro\n# Title\ntext\n```\n# not a header\n```\n## Sub\nmore\n#### deep header\n"
+        assert split_markdown_sections(text) == [
+            ("", "intro"),
+            ("# Title", "# Title\ntext\n```\n# not a header\n```"),
+            ("## Sub", "## Sub\nmore\n#### deep header"),
+        ]
+
+    def test_select_sections(self, tmp_path):
+        (tmp_path / "tools").mkdir()
+        (tmp_path / "tools" / "review.md").write_text("# Review\nThe review tool.\n## Labels\nEffort labels.\n")
+        (tmp_path / "other.md").write_text("# Azure\nSet the azure key.\n# Labels\nCustom labels are generated.\n")
+        (tmp_path / "EXAMPLE_BEST_PRACTICE.md").write_text("# Labels\nexcluded labels\n")
+
+        docs_index = get_docs_index(tmp_path, self.token_handler, "docsfamily-model")
+        assert get_docs_index(tmp_path, self.token_handler, "docsfamily-model") is docs_index
+        assert [section.file_path for section in docs_index.sections] == ["/tools/review.md", "/tools/review.md",
+                                                                          "/other.md", "/other.md"]
+
+        sections = docs_index.select_sections("how are labels generated?", max_tokens=1000, max_sections=5)
+        assert [section.header for section in sections] == ["## Labels", "# Labels"]
+        # priority files (main tools) win ties
+        assert docs_index.select_sections("labels", max_tokens=1000, max_sections=1)[0].header == "## Labels"
+        assert docs_index.select_sections("azure", max_tokens=3, max_sections=5) == []
+        assert docs_index.select_sections("unrelated question", max_tokens=1000, max_sections=5) == []
+        # priority files first, in documentation order, up to the first section that does not fit
+        first_tokens = docs_index.sections[0].tokens
+        assert docs_index.select_leading_sections(max_tokens=1000) == docs_index.sections
+        assert docs_index.select_leading_sections(max_tokens=first_tokens) == docs_index.sections[:1]
+
+        docs_prompt = DocsIndex.format_sections(docs_index.sections[:2])
+        assert docs_prompt.count("==file name==") == 1
+        assert "# Review\nThe review tool.\n\n## Labels\nEffort labels." in docs_prompt
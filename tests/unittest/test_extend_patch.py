@@ -1,9 +1,11 @@
+import difflib
+
 import pytest
 
 from pr_agent.algo.git_patch_processing import extend_patch
 from pr_agent.algo.pr_processing import pr_generate_extended_diff
 from pr_agent.algo.token_handler import TokenHandler
-from pr_agent.algo.utils import load_large_diff
+from pr_agent.algo.utils import load_large_diff, unified_diff_lines
 from pr_agent.config_loader import get_settings
 get_settings().set("CONFIG.CLI_MODE", True)
 get_settings().config.allow_dynamic_context = False
@@ -164,6 +166,18 @@ class TestExtendedPatchMoreLines:
         p0_extended = patches_extended_with_extra_lines[0].strip()
         assert p0_extended == "## File: 'file1'\n\n@@ -3,8 +3,8 @@ \n line0\n line1\n-original content\n+modified content\n line2\n line3\n line4\n line5\n line6"
 
+    def test_extended_diff_far_above_limit_is_estimated(self, token_handler, pr_languages):
+        patches_exact, total_tokens_exact, _ = pr_generate_extended_diff(
+            pr_languages, token_handler, add_line_numbers_to_hunks=False, max_tokens=100000)
+        patches_estimated, total_tokens_estimated, patches_estimated_tokens = pr_generate_extended_diff(
+            pr_languages, token_handler, add_line_numbers_to_hunks=False, max_tokens=10)
+
+        assert patches_estimated == patches_exact
+        assert patches_estimated_tokens == token_handler.estimate_tokens_batch(patches_estimated,
+                                                                               ["file1", "file2"])
+        assert total_tokens_estimated == token_handler.prompt_tokens + sum(patches_estimated_tokens)
+        assert total_tokens_estimated > 10 and total_tokens_exact > 10
+
 class TestLoadLargeDiff:
     def test_no_newline(self):
         patch = load_large_diff("test.py",
@@ -192,4 +206,22 @@ class TestLoadLargeDiff:
         assert load_large_diff("test.py", "", "") == ""
         assert load_large_diff("test.py", None, None) == ""
         assert (load_large_diff("test.py", "content\n", "") ==
-                '--- \n+++ \n@@ -1 +1 @@\n-\n+content\n')
\ No newline at end of file
+                '--- \n+++ \n@@ -1 +1 @@\n-\n+content\n')
+
+    def test_large_file_with_few_changes(self):
+        original_lines = [f"line {i}\n" for i in range(2000)]
+        new_lines = list(original_lines)
+        new_lines[1000] = "changed line\n"
+        new_lines.insert(1500, "inserted line\n")
+
+        diff = unified_diff_lines(original_lines, new_lines)
+
+        assert diff == list(difflib.unified_diff(original_lines, new_lines))
+        assert [line for line in diff if line.startswith("@@")] == ["@@ -998,7 +998,7 @@\n",
+                                                                   "@@ -1498,6 +1498,7 @@\n"]
+
+    def test_identical_and_edge_changes(self):
+        lines = [f"line {i}\n" for i in range(10)]
+        assert unified_diff_lines(lines, list(lines)) == []
+        for new_lines in (lines[1:], lines[:-1], ["first\n"] + lines, lines + ["last\n"], []):
+            assert unified_diff_lines(lines, new_lines) == list(difflib.unified_diff(lines, new_lines))
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from pr_agent.git_providers import GithubProvider
+from pr_agent.tools import ticket_pr_compliance_check
+from pr_agent.tools.ticket_pr_compliance_check import extract_tickets
+
+
+class FakeRepo:
+    def __init__(self, issues):
+        self.issues = issues
+        self.get_issue_calls = 0
+
+    def get_issue(self, number):
+        self.get_issue_calls += 1
+        if number not in self.issues:
+            raise Exception(f"issue {number} not found")
+        return self.issues[number]
+
+
+def make_provider(description, issues, sub_issues):
+    provider = GithubProvider.__new__(GithubProvider)
+    provider.repo = "owner/repo"
+    provider.base_url_html = "https://github.com"
+    provider.repo_obj = FakeRepo(issues)
+    provider.fetch_sub_issues_calls = 0
+
+    def fetch_sub_issues(ticket):
+        provider.fetch_sub_issues_calls += 1
+        return sub_issues.get(ticket, set())
+
+    provider.get_user_description = lambda: description
+    provider.fetch_sub_issues = fetch_sub_issues
+    return provider
+
+
+def make_issue(number, updated_at="2024-01-01", labels=()):
+    return SimpleNamespace(number=number, title=f"title {number}", body=f"body {number}", updated_at=updated_at,
+                           labels=[SimpleNamespace(name=label) for label in labels])
+
+
+class TestExtractTickets:
+    def setup_method(self):
+        ticket_pr_compliance_check._TICKETS_CACHE.clear()
+
+    def test_tickets_and_sub_issues(self):
+        issues = {1: make_issue(1, labels=["bug"]), 2: make_issue(2), 10: make_issue(10), 11: make_issue(11)}
+        sub_issues = {"https://github.com/owner/repo/issues/1": ["https://github.com/owner/repo/issues/10",
+                                                                  "https://github.com/owner/repo/issues/11"]}
+        provider = make_provider("Fixes #1 and #2", issues, sub_issues)
+
+        tickets = asyncio.run(extract_tickets(provider))
+
+        assert sorted(ticket['ticket_id'] for ticket in tickets) == [1, 2]
+        ticket_1 = next(ticket for ticket in tickets if ticket['ticket_id'] == 1)
+        assert ticket_1['labels'] == "bug"
+        assert ticket_1['body'] == "body 1"
+        assert [sub_issue['title'] for sub_issue in ticket_1['sub_issues']] == ["title 10", "title 11"]
+
+    def test_unchanged_tickets_are_cached(self):
+        issues = {1: make_issue(1), 10: make_issue(10)}
+        sub_issues = {"https://github.com/owner/repo/issues/1": ["https://github.com/owner/repo/issues/10"]}
+        provider = make_provider("Fixes #1", issues, sub_issues)
+
+        first = asyncio.run(extract_tickets(provider))
+        assert provider.repo_obj.get_issue_calls == 2
+        second = asyncio.run(extract_tickets(provider))
+        assert second == first
+        # only the main issue is fetched again, to check its 'updated_at'
+        assert provider.repo_obj.get_issue_calls == 3
+        assert provider.fetch_sub_issues_calls == 1
+
+        issues[1].updated_at = "2024-02-01"
+        asyncio.run(extract_tickets(provider))
+        assert provider.fetch_sub_issues_calls == 2
+
+    def test_cached_tickets_expire(self, monkeypatch):
+        issues = {1: make_issue(1)}
+        provider = make_provider("Fixes #1", issues, {})
+        monkeypatch.setattr(ticket_pr_compliance_check._TICKETS_CACHE, "ttl", 0)
+
+        asyncio.run(extract_tickets(provider))
+        time.sleep(0.01)
+        asyncio.run(extract_tickets(provider))
+        assert provider.fetch_sub_issues_calls == 2
+
+    def test_failed_sub_issue_is_not_cached(self):
+        issues = {1: make_issue(1)}
+        sub_issues = {"https://github.com/owner/repo/issues/1": ["https://github.com/owner/repo/issues/10"]}
+        provider = make_provider("Fixes #1", issues, sub_issues)
+
+        tickets = asyncio.run(extract_tickets(provider))
+        assert tickets[0]['sub_issues'] == []
+        asyncio.run(extract_tickets(provider))
+        assert provider.fetch_sub_issues_calls == 2
+
+    def test_missing_ticket_is_skipped(self):
+        provider = make_provider("Fixes #1 and #3", {1: make_issue(1)}, {})
+        tickets = asyncio.run(extract_tickets(provider))
+        assert [ticket['ticket_id'] for ticket in tickets] == [1]
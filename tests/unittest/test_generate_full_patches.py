@@ -0,0 +1,67 @@
+import pytest
+
+from pr_agent.algo.pr_processing import (OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD,
+                                         generate_full_patch,
+                                         generate_full_patches,
+                                         split_patches_balanced)
+from pr_agent.algo.token_handler import TokenEncoder, TokenHandler
+
+
+class TestGenerateFullPatches:
+    @pytest.fixture(autouse=True)
+    def setup(self, token_encoder_registry):
+        TokenEncoder.register_tokenizer("packingfamily", lambda model: lambda text: text.split())
+        self.token_handler = TokenHandler(model="packingfamily-model")
+        self.token_handler.prompt_tokens = 0
+        # 'tokens' is the size of the patch without the file header ('## File: ...' adds 3 tokens)
+        self.file_dict = {}
+        for filename, size in [("a.py", 60), ("b.py", 50), ("c.py", 40), ("d.py", 10), ("e.py", 500)]:
+            patch = " ".join(["x"] * size)
+            self.file_dict[filename] = {'patch': patch, 'tokens': size, 'edit_type': None}
+        self.max_tokens_model = OUTPUT_BUFFER_TOKENS_SOFT_THRESHOLD + 100
+
+    def test_first_fit_groups(self):
+        total_tokens_list, patches_list, remaining_files, files_in_patches_list = generate_full_patches(
+            False, self.file_dict, self.max_tokens_model, list(self.file_dict), self.token_handler, max_groups=3)
+
+        assert files_in_patches_list == [["a.py", "d.py"], ["b.py", "c.py"]]
+        assert total_tokens_list == [76, 96]
+        assert patches_list[0][0] == "\n\n## File: 'a.py'\n\n" + self.file_dict["a.py"]['patch'] + "\n"
+        assert remaining_files == ["e.py"]
+
+    def test_single_group_matches_generate_full_patch(self):
+        remaining_files_list_prev = ["b.py", "c.py", "d.py", "e.py"]
+        total_tokens, patches, remaining_files, files_in_patch = generate_full_patch(
+            True, self.file_dict, self.max_tokens_model, remaining_files_list_prev, self.token_handler)
+
+        # without the file header, the three smaller patches exactly fill the group
+        assert files_in_patch == ["b.py", "c.py", "d.py"]
+        assert total_tokens == 100
+        assert patches[0] == "\n\n" + self.file_dict["b.py"]['patch']
+        assert remaining_files == ["e.py"]
+
+    def test_empty_additional_groups_are_dropped(self):
+        total_tokens_list, patches_list, remaining_files, files_in_patches_list = generate_full_patches(
+            False, self.file_dict, self.max_tokens_model, ["e.py"], self.token_handler, max_groups=3)
+
+        assert total_tokens_list == [0]
+        assert patches_list == [[]]
+        assert files_in_patches_list == [[]]
+        assert remaining_files == ["e.py"]
+
+
+class TestSplitPatchesBalanced:
+    def test_balances_chunks(self):
+        # a greedy split would give chunks of 90 and 30 tokens
+        patches = [("a", 50, "Python"), ("b", 40, "Python"), ("c", 20, "Python"), ("d", 10, "Python")]
+        assert split_patches_balanced(patches, max_calls=3, max_chunk_tokens=100) == ["a\nd", "b\nc"]
+
+    def test_prefers_same_language_chunk(self):
+        patches = [("py1", 40, "Python"), ("js1", 40, "JavaScript"), ("py2", 10, "Python"), ("js2", 10, "JavaScript")]
+        assert split_patches_balanced(patches, max_calls=2, max_chunk_tokens=60) == ["py1\npy2", "js1\njs2"]
+
+    def test_respects_max_calls(self):
+        patches = [("a", 60, "Python"), ("b", 60, "Python"), ("c", 60, "Python")]
+        assert split_patches_balanced(patches, max_calls=2, max_chunk_tokens=100) == ["a", "b"]
+        assert split_patches_balanced(patches, max_calls=5, max_chunk_tokens=100) == ["a", "b", "c"]
+        assert split_patches_balanced([], max_calls=2, max_chunk_tokens=100) == []
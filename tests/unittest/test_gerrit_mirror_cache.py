@@ -0,0 +1,99 @@
+import os
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+from git import Repo
+
+from pr_agent.git_providers.gerrit_provider import (cleanup_worktrees,
+                                                    prepare_worktree,
+                                                    release_worktree)
+
+GIT_ENV = {"GIT_AUTHOR_NAME": "test", "GIT_AUTHOR_EMAIL": "test@example.com",
+           "GIT_COMMITTER_NAME": "test", "GIT_COMMITTER_EMAIL": "test@example.com"}
+
+
+def git(*args, cwd):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True,
+                          env={**os.environ, **GIT_ENV}).stdout.decode().strip()
+
+
+@pytest.fixture
+def remote(tmp_path):
+    # a repository with two changes, published under gerrit-like refs
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    git("init", "--quiet", cwd=remote)
+    (remote / "file.py").write_text("a = 1\n")
+    git("add", "file.py", cwd=remote)
+    git("commit", "--quiet", "-m", "initial", cwd=remote)
+    for change in (1, 2):
+        (remote / "file.py").write_text(f"a = {change + 1}\n")
+        git("commit", "--quiet", "-am", f"change {change}", cwd=remote)
+        git("update-ref", f"refs/changes/0{change}/{change}/1", "HEAD", cwd=remote)
+    return f"file://{remote}"
+
+
+class TestGerritMirrorCache:
+    def test_worktrees_share_one_mirror(self, remote, tmp_path):
+        cache_dir = tmp_path / "cache"
+        first = prepare_worktree(remote, "group/project", "refs/changes/01/1/1", cache_dir)
+        second = prepare_worktree(remote, "group/project", "refs/changes/02/2/1", cache_dir)
+
+        assert first != second
+        assert (first / "file.py").read_text() == "a = 2\n"
+        assert (second / "file.py").read_text() == "a = 3\n"
+        assert first.parent.parent == second.parent.parent
+        assert len(list(cache_dir.glob("*/mirror.git"))) == 1
+        # the change commit and its parent, as in the previous per-request clone
+        repo = Repo(second)
+        assert repo.head.commit.message.strip() == "change 2"
+        assert repo.head.commit.parents[0].message.strip() == "change 1"
+
+    def test_cleanup_removes_oldest_worktrees(self, remote, tmp_path):
+        cache_dir = tmp_path / "cache"
+        worktrees = [prepare_worktree(remote, "project", "refs/changes/01/1/1", cache_dir) for _ in range(3)]
+        for age, worktree in enumerate(reversed(worktrees)):
+            timestamp = time.time() - age * 60
+            os.utime(worktree, (timestamp, timestamp))
+            # no provider uses them anymore
+            release_worktree(str(worktree))
+
+        cleanup_worktrees(cache_dir, max_worktrees=1)
+
+        assert [worktree.exists() for worktree in worktrees] == [False, False, True]
+        mirror = worktrees[0].parent.parent / "mirror.git"
+        assert git("for-each-ref", "--format=%(refname)", "refs/pr-agent/", cwd=mirror) == \
+            f"refs/pr-agent/{worktrees[2].name}"
+        assert len(git("worktree", "list", "--porcelain", cwd=mirror).split("\n\n")) == 2  # the mirror and one worktree
+
+    def test_cleanup_keeps_worktrees_in_use(self, remote, tmp_path):
+        cache_dir = tmp_path / "cache"
+        in_use = prepare_worktree(remote, "project", "refs/changes/01/1/1", cache_dir)
+        released = prepare_worktree(remote, "project", "refs/changes/01/1/1", cache_dir)
+        newest = prepare_worktree(remote, "project", "refs/changes/02/2/1", cache_dir)
+        for age, worktree in enumerate((newest, released, in_use)):
+            timestamp = time.time() - age * 60
+            os.utime(worktree, (timestamp, timestamp))
+        release_worktree(str(released))
+        release_worktree(str(newest))
+
+        cleanup_worktrees(cache_dir, max_worktrees=1)
+
+        assert [worktree.exists() for worktree in (in_use, released, newest)] == [True, False, True]
+        release_worktree(str(in_use))
+
+    def test_cleanup_ignores_vanished_worktrees(self, tmp_path, monkeypatch):
+        cache_dir = tmp_path / "cache"
+        for name in ("a", "b"):
+            (cache_dir / "project" / "worktrees" / name).mkdir(parents=True)
+        stat = Path.stat
+
+        def stat_or_vanish(path, *args, **kwargs):
+            if path.name == "a":
+                raise FileNotFoundError(path)
+            return stat(path, *args, **kwargs)
+
+        monkeypatch.setattr(Path, "stat", stat_or_vanish)
+        cleanup_worktrees(cache_dir, max_worktrees=1)
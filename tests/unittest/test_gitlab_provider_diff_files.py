@@ -0,0 +1,126 @@
+import threading
+from types import SimpleNamespace
+
+from gitlab import GitlabGetError
+
+from pr_agent.algo.pr_processing import load_files_content
+from pr_agent.algo.types import EDIT_TYPE
+from pr_agent.git_providers.gitlab_provider import GitLabProvider
+
+
+def make_change(path, diff="@@ -1 +1 @@\n-a\n+b\n", new_file=False, deleted_file=False):
+    return {'old_path': path, 'new_path': path, 'diff': diff, 'new_file': new_file, 'deleted_file': deleted_file,
+            'renamed_file': False}
+
+
+class FakeGitlab:
+    def __init__(self, changes, contents, diffs_endpoint=True):
+        self.changes = changes
+        self.contents = contents
+        self.diffs_endpoint = diffs_endpoint
+        self.http_list_calls = []
+        self.file_requests = []
+        self.active_requests = 0
+        self.max_active_requests = 0
+        self.lock = threading.Lock()
+        self.projects = SimpleNamespace(get=lambda id_project, lazy=False: SimpleNamespace(
+            files=SimpleNamespace(get=self.get_file)))
+
+    def http_list(self, path, query_data=None, get_all=False):
+        self.http_list_calls.append((path, query_data))
+        if not self.diffs_endpoint:
+            raise Exception("404 Not Found")
+        return list(self.changes)
+
+    def get_file(self, file_path, ref):
+        with self.lock:
+            self.file_requests.append((file_path, ref))
+            self.active_requests += 1
+            self.max_active_requests = max(self.max_active_requests, self.active_requests)
+        try:
+            if (file_path, ref) not in self.contents:
+                raise GitlabGetError("404 File Not Found")
+            return SimpleNamespace(decode=lambda: self.contents[(file_path, ref)])
+        finally:
+            with self.lock:
+                self.active_requests -= 1
+
+
+def make_provider(fake_gitlab):
+    provider = GitLabProvider.__new__(GitLabProvider)
+    provider.gl = fake_gitlab
+    provider.gitlab_url = "https://gitlab.example.com"
+    provider.id_project = "group/project"
+    provider.id_mr = 7
+    provider.diff_files = None
+    provider.git_files = None
+    provider.mr_changes = None
+    provider.mr = SimpleNamespace(iid=7, manager=SimpleNamespace(path="/projects/group%2Fproject/merge_requests"),
+                                  diff_refs={'base_sha': 'base', 'head_sha': 'head'},
+                                  changes=lambda: {'changes': list(fake_gitlab.changes)})
+    return provider
+
+
+class TestGitLabDiffFiles:
+    def test_files_are_loaded_with_the_diffs_endpoint(self):
+        changes = [make_change(f"src/file_{i}.py") for i in range(20)] + [make_change("src/new.py", new_file=True)]
+        contents = {}
+        for i in range(20):
+            contents[(f"src/file_{i}.py", 'base')] = f"a{i}"
+            contents[(f"src/file_{i}.py", 'head')] = f"b{i}"
+        contents[("src/new.py", 'head')] = "new"
+        fake_gitlab = FakeGitlab(changes, contents)
+        provider = make_provider(fake_gitlab)
+
+        diff_files = provider.get_diff_files()
+
+        assert fake_gitlab.http_list_calls == [("/projects/group%2Fproject/merge_requests/7/diffs",
+                                                {'per_page': 100, 'unidiff': True})]
+        assert [file.filename for file in diff_files] == [change['new_path'] for change in changes]
+        # the files content is loaded on first access
+        assert fake_gitlab.file_requests == []
+        load_files_content(diff_files)
+        assert (diff_files[3].base_file, diff_files[3].head_file) == ("a3", "b3")
+        assert (diff_files[-1].base_file, diff_files[-1].head_file) == ("", "new")
+        assert diff_files[-1].edit_type == EDIT_TYPE.ADDED
+        assert diff_files[0].num_plus_lines == 1 and diff_files[0].num_minus_lines == 1
+        assert len(fake_gitlab.file_requests) == 2 * len(changes)
+        # the changes are listed once, for the files and the diff files
+        provider.get_files()
+        assert len(fake_gitlab.http_list_calls) == 1
+
+    def test_only_limited_number_of_files_are_loaded(self):
+        changes = [make_change(f"file_{i}.py") for i in range(60)]
+        fake_gitlab = FakeGitlab(changes, {})
+        provider = make_provider(fake_gitlab)
+
+        diff_files = provider.get_diff_files()
+        load_files_content(diff_files)
+
+        assert len(diff_files) == 60
+        loaded_files = {file_path for file_path, _ in fake_gitlab.file_requests}
+        assert loaded_files == {f"file_{i}.py" for i in range(49)}
+        assert fake_gitlab.max_active_requests <= 8
+
+    def test_files_without_diff_are_loaded_eagerly(self):
+        changes = [make_change("a.py"), make_change("large.py", diff="")]
+        contents = {("a.py", 'base'): "a", ("a.py", 'head'): "b",
+                    ("large.py", 'base'): "x\n", ("large.py", 'head'): "y\n"}
+        fake_gitlab = FakeGitlab(changes, contents)
+        provider = make_provider(fake_gitlab)
+
+        diff_files = provider.get_diff_files()
+
+        assert sorted(fake_gitlab.file_requests) == [("large.py", 'base'), ("large.py", 'head')]
+        assert "-x" in diff_files[1].patch and "+y" in diff_files[1].patch
+        assert diff_files[0].head_file == "b"
+        assert ("a.py", 'head') in fake_gitlab.file_requests
+
+    def test_fallback_to_changes(self):
+        changes = [make_change("a.py")]
+        fake_gitlab = FakeGitlab(changes, {("a.py", 'base'): "old", ("a.py", 'head'): "new"}, diffs_endpoint=False)
+        provider = make_provider(fake_gitlab)
+
+        assert provider.get_files() == ["a.py"]
+        diff_files = provider.get_diff_files()
+        assert (diff_files[0].base_file, diff_files[0].head_file) == ("old", "new")
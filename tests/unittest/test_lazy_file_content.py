@@ -0,0 +1,71 @@
+import pytest
+
+from pr_agent.algo.pr_processing import (load_files_content,
+                                         pr_generate_extended_diff)
+from pr_agent.algo.token_handler import TokenEncoder, TokenHandler
+from pr_agent.algo.types import EDIT_TYPE, FilePatchInfo
+
+BASE_FILE = "line1\nline2\nline3\noriginal\nline5\nline6\n"
+HEAD_FILE = "line1\nline2\nline3\nmodified\nline5\nline6\n"
+PATCH = "@@ -4,1 +4,1 @@\n-original\n+modified\n"
+
+
+def make_lazy_file(filename, calls):
+    def load(version):
+        calls.append((filename, version))
+        return BASE_FILE if version == 'base' else HEAD_FILE
+    return FilePatchInfo(None, None, PATCH, filename, edit_type=EDIT_TYPE.MODIFIED, content_loader=load)
+
+
+class TestLazyFileContent:
+    @pytest.fixture(autouse=True)
+    def setup(self, token_encoder_registry):
+        TokenEncoder.register_tokenizer("lazyfamily", lambda model: lambda text: text.split())
+        self.token_handler = TokenHandler(model="lazyfamily-model")
+        self.token_handler.prompt_tokens = 0
+
+    def test_content_is_loaded_once_on_first_access(self):
+        calls = []
+        file = make_lazy_file("a.py", calls)
+        assert not file.is_content_loaded('head')
+        assert file.head_file == HEAD_FILE
+        assert file.head_file == HEAD_FILE
+        assert calls == [("a.py", 'head')]
+        assert file.is_content_loaded('head') and not file.is_content_loaded('base')
+
+    def test_eager_content_and_assignment(self):
+        file = FilePatchInfo("base", "head", PATCH, "a.py")
+        assert file.is_content_loaded('base') and file.base_file == "base"
+        file.head_file = "new head"
+        assert file.head_file == "new head"
+        assert file == FilePatchInfo("base", "new head", PATCH, "a.py")
+
+    def test_failed_load_returns_empty_content(self):
+        def load(version):
+            raise RuntimeError("not found")
+        file = FilePatchInfo(None, None, PATCH, "a.py", content_loader=load)
+        assert file.base_file == ""
+
+    def test_diff_without_extra_lines_does_not_load_content(self):
+        calls = []
+        files = [make_lazy_file("a.py", calls), make_lazy_file("b.py", calls)]
+        patches, _, _ = pr_generate_extended_diff([{'files': files}], self.token_handler,
+                                                  add_line_numbers_to_hunks=False)
+        assert len(patches) == 2
+        assert calls == []
+
+    def test_diff_with_extra_lines_loads_content(self):
+        calls = []
+        files = [make_lazy_file("a.py", calls), make_lazy_file("b.py", calls)]
+        patches, _, _ = pr_generate_extended_diff([{'files': files}], self.token_handler,
+                                                  add_line_numbers_to_hunks=False,
+                                                  patch_extra_lines_before=1, patch_extra_lines_after=1)
+        assert sorted(calls) == [("a.py", 'base'), ("a.py", 'head'), ("b.py", 'base'), ("b.py", 'head')]
+        assert " line3\n-original\n+modified\n line5" in patches[0]
+
+    def test_load_files_content_skips_loaded_files(self):
+        calls = []
+        files = [make_lazy_file("a.py", calls), FilePatchInfo("base", "head", PATCH, "b.py")]
+        files[0].base_file
+        load_files_content(files)
+        assert sorted(calls) == [("a.py", 'base'), ("a.py", 'head')]
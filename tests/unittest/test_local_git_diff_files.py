@@ -0,0 +1,80 @@
+import os
+import subprocess
+from threading import Lock
+
+import pytest
+from git import Repo
+
+from pr_agent.algo.types import EDIT_TYPE
+from pr_agent.git_providers.local_git_provider import (get_tree_languages,
+                                                       iter_diff_files,
+                                                       read_blob)
+
+GIT_ENV = {"GIT_AUTHOR_NAME": "test", "GIT_AUTHOR_EMAIL": "test@example.com",
+           "GIT_COMMITTER_NAME": "test", "GIT_COMMITTER_EMAIL": "test@example.com"}
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    for name, value in GIT_ENV.items():
+        monkeypatch.setenv(name, value)
+    repo = Repo.init(tmp_path)
+    files = {"code.py": b"a = 1\n", "latin.txt": "caf\xe9\n".encode("latin-1"), "image.bin": b"\x89PNG\0\0\0",
+             "big.txt": b"x" * 1000 + b"\n", "removed.py": b"gone\n"}
+    for name, content in files.items():
+        (tmp_path / name).write_bytes(content)
+    repo.index.add(list(files))
+    repo.index.commit("base")
+    (tmp_path / "code.py").write_bytes(b"a = 2\n")
+    (tmp_path / "latin.txt").write_bytes("caf\xe9!\n".encode("latin-1"))
+    (tmp_path / "image.bin").write_bytes(b"\x89PNG\0\0\1")
+    (tmp_path / "big.txt").write_bytes(b"y" * 1000 + b"\n")
+    os.remove(tmp_path / "removed.py")
+    repo.index.add(["code.py", "latin.txt", "image.bin", "big.txt"])
+    repo.index.remove(["removed.py"])
+    repo.index.commit("head")
+    return repo
+
+
+def get_diffs(repo):
+    return repo.head.commit.diff(repo.head.commit.parents[0], create_patch=True, R=True)
+
+
+class TestLocalGitDiffFiles:
+    def test_read_blob(self, repo):
+        blobs = {item.path: item for item in repo.head.commit.tree.traverse()}
+        assert read_blob(blobs["code.py"], max_size=100) == "a = 2\n"
+        assert read_blob(blobs["latin.txt"], max_size=100) == "caf\xe9!\n"
+        assert read_blob(blobs["image.bin"], max_size=100) == ""
+        assert read_blob(blobs["big.txt"], max_size=100) == ""
+        assert read_blob(blobs["big.txt"], max_size=0) == "y" * 1000 + "\n"
+        assert read_blob(None, max_size=100) == ""
+        # partially read streams are drained, so the next blob is read correctly
+        assert read_blob(blobs["code.py"], max_size=100) == "a = 2\n"
+
+    def test_diff_files_load_contents_lazily(self, repo):
+        diff_files = iter_diff_files(get_diffs(repo), max_size=100, blob_lock=Lock())
+        assert not isinstance(diff_files, list)
+        files = {file.filename or file.old_filename: file for file in diff_files}
+
+        assert not files["code.py"].is_content_loaded("base")
+        assert (files["code.py"].base_file, files["code.py"].head_file) == ("a = 1\n", "a = 2\n")
+        assert files["code.py"].edit_type == EDIT_TYPE.MODIFIED
+        assert "+a = 2" in files["code.py"].patch
+        assert files["latin.txt"].head_file == "caf\xe9!\n"
+        assert files["image.bin"].head_file == ""
+        assert files["big.txt"].head_file == ""
+        assert "+" + "y" * 1000 in files["big.txt"].patch
+        assert files["removed.py"].edit_type == EDIT_TYPE.DELETED
+        assert (files["removed.py"].base_file, files["removed.py"].head_file) == ("gone\n", "")
+
+    def test_tree_languages(self, repo, monkeypatch):
+        tree_sha = repo.head.commit.tree.hexsha
+        languages = get_tree_languages(repo, tree_sha)
+        assert languages == {"py": 25.0, "txt": 50.0, "bin": 25.0}
+
+        # the same tree is not listed again
+        def fail(*args, **kwargs):
+            raise AssertionError("the tree was listed again")
+        monkeypatch.setattr(subprocess, "Popen", fail)
+        assert get_tree_languages(repo, tree_sha) == languages
@@ -0,0 +1,34 @@
+from pr_agent.algo.local_vector_store import LocalVectorStore
+
+
+class TestLocalVectorStore:
+    def test_upsert_query_and_reload(self, tmp_path):
+        store = LocalVectorStore(str(tmp_path / "index"))
+        assert store.query([1.0, 0.0], top_k=5) == []
+        assert store.get_sync_state("org-repo") == {}
+
+        store.upsert([{"id": "issue_1.issue", "metadata": {"repo": "org-repo"}, "text_hash": "a"},
+                      {"id": "issue_2.issue", "metadata": {"repo": "org-repo"}, "text_hash": "b"},
+                      {"id": "issue_1.issue", "metadata": {"repo": "other-repo"}, "text_hash": "c"}],
+                     [[1.0, 0.0], [0.0, 2.0], [1.0, 1.0]],
+                     sync_state={"org-repo": {"updated_at": "2024-01-01T00:00:00"}})
+
+        # the last record with the same id replaces the previous one
+        assert len(store) == 2
+        assert store.get_text_hashes(["issue_1.issue", "issue_2.issue", "issue_3.issue"]) == {"issue_1.issue": "c",
+                                                                                             "issue_2.issue": "b"}
+
+        reloaded = LocalVectorStore(str(tmp_path / "index"))
+        assert reloaded.get_sync_state("org-repo") == {"updated_at": "2024-01-01T00:00:00"}
+        results = reloaded.query([0.0, 1.0], top_k=5)
+        assert [result["id"] for result in results] == ["issue_2.issue", "issue_1.issue"]
+        assert round(results[0]["score"], 4) == 1.0
+        assert [result["id"] for result in reloaded.query([0.0, 1.0], top_k=5,
+                                                          metadata_filter={"repo": "other-repo"})] == ["issue_1.issue"]
+
+        reloaded.upsert([{"id": "issue_3.issue", "metadata": {"repo": "org-repo"}, "text_hash": "d"}], [[3.0, 3.0]])
+        reloaded.upsert([], [], sync_state={"org-repo": {"updated_at": "2024-02-01T00:00:00"}})
+        reloaded = LocalVectorStore(str(tmp_path / "index"))
+        assert len(reloaded) == 3
+        assert reloaded.get_sync_state("org-repo")["updated_at"] == "2024-02-01T00:00:00"
+        assert reloaded.query([1.0, 1.0], top_k=1)[0]["id"] in ("issue_1.issue", "issue_3.issue")
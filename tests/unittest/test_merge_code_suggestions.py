@@ -0,0 +1,17 @@
+from pr_agent.config_loader import get_settings
+from pr_agent.tools.pr_code_suggestions import PRCodeSuggestions
+
+
+class TestMergeChunksPredictions:
+    def test_threshold_and_duplicates(self, monkeypatch):
+        monkeypatch.setattr(get_settings().pr_code_suggestions, 'suggestions_score_threshold', 5)
+        suggestion = {"relevant_file": "a.py", "existing_code": "x = 1", "improved_code": "x = 2", "score": 6}
+        duplicate = dict(suggestion, existing_code="x  =  1\n", score=8)
+        low_score = {"relevant_file": "b.py", "existing_code": "y = 1", "improved_code": "y = 2", "score": 3}
+        other = {"relevant_file": "b.py", "existing_code": "y = 1", "improved_code": "y = 3", "score": 7}
+
+        data = PRCodeSuggestions._merge_chunks_predictions([{"code_suggestions": [suggestion, low_score]},
+                                                           {"code_suggestions": [duplicate, other]},
+                                                           {}])
+
+        assert data["code_suggestions"] == [duplicate, other]
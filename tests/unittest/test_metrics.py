@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from pr_agent.algo.metrics import MetricsRegistry, metrics_command
+from pr_agent.config_loader import get_settings
+from pr_agent.servers.utils import metrics
+
+
+class TestMetricsRegistry:
+    def test_record_call_tagged_by_command(self):
+        registry = MetricsRegistry()
+        with metrics_command("review"):
+            registry.record_call(model="gpt-4o", latency=1.5, finish_reason="stop", prompt_tokens=1000,
+                                 completion_tokens=200, cost=0.01)
+            registry.record_call(model="gpt-4o", latency=3, finish_reason="stop", prompt_tokens=500,
+                                 completion_tokens=100)
+        registry.record_error(model="gpt-4o", error="APITimeoutError", command="improve")
+
+        summary = registry.summary()
+        assert summary["pr_agent_llm_requests_total"] == {"review/gpt-4o/stop": 2}
+        assert summary["pr_agent_llm_prompt_tokens_total"] == {"review/gpt-4o": 1500}
+        assert summary["pr_agent_llm_errors_total"] == {"improve/gpt-4o/APITimeoutError": 1}
+        assert summary["pr_agent_llm_request_duration_seconds"]["review/gpt-4o"] == {
+            "count": 2, "sum": 4.5, "avg": 2.25, "max": 3.0}
+
+    def test_prometheus_format(self):
+        registry = MetricsRegistry()
+        registry.record_call(model="gpt-4o", latency=1.5, finish_reason="stop", prompt_tokens=10, command="describe")
+        text = registry.to_prometheus()
+
+        assert "# TYPE pr_agent_llm_request_duration_seconds histogram" in text
+        assert 'pr_agent_llm_requests_total{command="describe",model="gpt-4o",finish_reason="stop"} 1' in text
+        assert 'pr_agent_llm_request_duration_seconds_bucket{command="describe",model="gpt-4o",le="1"} 0' in text
+        assert 'pr_agent_llm_request_duration_seconds_bucket{command="describe",model="gpt-4o",le="2.5"} 1' in text
+        assert 'pr_agent_llm_request_duration_seconds_bucket{command="describe",model="gpt-4o",le="+Inf"} 1' in text
+        assert 'pr_agent_llm_request_duration_seconds_count{command="describe",model="gpt-4o"} 1' in text
+
+    def test_metrics_endpoint_is_disabled_by_default(self, monkeypatch):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(metrics())
+        assert error.value.status_code == 404
+
+        monkeypatch.setattr(get_settings().config, "enable_metrics_endpoint", True, raising=False)
+        assert asyncio.run(metrics()).status_code == 200
@@ -0,0 +1,150 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from pr_agent.algo.utils import LRUCache
+from pr_agent.tools import pr_description
+from pr_agent.tools.pr_description import PRDescription
+
+MODEL = "gpt-4o"
+
+
+def file_summary(filename):
+    return f"pr_files:\n- filename: {filename}\n  changes_title: changes of {filename}\n  label: enhancement"
+
+
+class FakeTokenHandler:
+    """
+    Counts one token per word.
+    """
+    prompt_tokens = 0
+
+    def count_tokens_batch(self, texts):
+        return [len(text.split()) for text in texts]
+
+
+@pytest.fixture
+def files_cache(monkeypatch):
+    cache = LRUCache(max_size=100)
+    monkeypatch.setattr(pr_description, "_FILES_SUMMARY_CACHE", cache)
+    return cache
+
+
+def make_tool(diff_files, get_prediction):
+    tool = PRDescription.__new__(PRDescription)
+    tool.keys_fix = ["filename:", "language:", "changes_summary:", "changes_title:", "description:", "title:"]
+    tool.git_provider = SimpleNamespace(get_diff_files=lambda: diff_files)
+    tool._get_prediction = get_prediction
+    return tool
+
+
+class TestMapFilesPredictions:
+    def test_cached_files_are_not_predicted_again(self, files_cache):
+        files = [SimpleNamespace(filename=name, patch=f"patch of {name}") for name in ("a.py", "b.py")]
+        calls = []
+
+        async def get_prediction(model, patches_diff, prompt):
+            calls.append(patches_diff)
+            return "\n".join(file_summary(name) for name in ("a.py", "b.py") if name in patches_diff)
+
+        files_cache.set(PRDescription._file_summary_cache_key(MODEL, files[0]), "cached summary of a.py")
+        tool = make_tool(files, get_prediction)
+
+        summaries = asyncio.run(tool._map_files_predictions(MODEL, [["diff a.py", "diff b.py"]],
+                                                            [["a.py", "b.py"]]))
+
+        assert calls == ["diff b.py"]
+        assert summaries[0] == "cached summary of a.py"
+        assert len(summaries) == 2 and "b.py" in summaries[1]
+        assert files_cache.get(PRDescription._file_summary_cache_key(MODEL, files[1])) == summaries[1]
+
+        # the next run uses only the cache
+        assert asyncio.run(tool._map_files_predictions(MODEL, [["diff a.py", "diff b.py"]],
+                                                       [["a.py", "b.py"]])) == summaries
+        assert len(calls) == 1
+
+    def test_failed_group_is_skipped_and_not_cached(self, files_cache):
+        files = [SimpleNamespace(filename=name, patch=f"patch of {name}") for name in ("a.py", "b.py")]
+
+        async def get_prediction(model, patches_diff, prompt):
+            if "b.py" in patches_diff:
+                raise TimeoutError("AI call timed out")
+            return file_summary("a.py")
+
+        tool = make_tool(files, get_prediction)
+
+        summaries = asyncio.run(tool._map_files_predictions(MODEL, [["diff a.py"], ["diff b.py"]],
+                                                            [["a.py"], ["b.py"]]))
+
+        assert len(summaries) == 1 and "a.py" in summaries[0]
+        assert PRDescription._file_summary_cache_key(MODEL, files[1]) not in files_cache
+
+    def test_files_without_patch_are_not_cached(self, files_cache):
+        files = [SimpleNamespace(filename="a.py", patch="")]
+        calls = []
+
+        async def get_prediction(model, patches_diff, prompt):
+            calls.append(patches_diff)
+            return file_summary("a.py")
+
+        tool = make_tool(files, get_prediction)
+
+        for _ in range(2):
+            asyncio.run(tool._map_files_predictions(MODEL, [["diff a.py"]], [["a.py"]]))
+
+        assert len(calls) == 2
+        assert len(files_cache) == 0
+        assert PRDescription._file_summary_cache_key(MODEL, files[0]) is None
+        assert PRDescription._file_summary_cache_key(MODEL, None) is None
+
+
+class TestReduceFilesWalkthrough:
+    @pytest.fixture(autouse=True)
+    def max_tokens(self, monkeypatch):
+        # 50 tokens are left for the files walkthrough
+        monkeypatch.setattr(pr_description, "get_max_tokens",
+                            lambda model: 50 + pr_description.OUTPUT_BUFFER_TOKENS_HARD_THRESHOLD)
+
+    def test_multi_level_reduce(self):
+        calls = []
+
+        async def get_prediction(model, patches_diff, prompt):
+            calls.append(patches_diff)
+            return "title: merged\ndescription: " + " ".join(["word"] * 14)
+
+        tool = make_tool([], get_prediction)
+        walkthrough = [" ".join([f"file{i}"] * 20) for i in range(8)]
+
+        result = asyncio.run(tool._reduce_files_walkthrough(MODEL, walkthrough, "\nextra", FakeTokenHandler()))
+
+        # 8 summaries of 20 tokens are merged into 4 parts, and the 4 summaries of the parts into 2
+        assert len(calls) == 6
+        assert result.count("Summary of changes, part") == 2
+        assert result.endswith("\nextra")
+
+    def test_no_progress_keeps_the_summaries(self):
+        calls = []
+
+        async def get_prediction(model, patches_diff, prompt):
+            calls.append(patches_diff)
+            return "title: merged\ndescription: merged"
+
+        tool = make_tool([], get_prediction)
+        walkthrough = [" ".join([f"file{i}"] * 60) for i in range(3)]
+
+        result = asyncio.run(tool._reduce_files_walkthrough(MODEL, walkthrough, "", FakeTokenHandler()))
+
+        assert calls == []
+        assert result == "\n".join(walkthrough)
+
+    def test_failed_reduce_falls_back_to_the_summaries(self):
+        async def get_prediction(model, patches_diff, prompt):
+            raise TimeoutError("AI call timed out")
+
+        tool = make_tool([], get_prediction)
+        walkthrough = [" ".join([f"file{i}"] * 20) for i in range(8)]
+
+        result = asyncio.run(tool._reduce_files_walkthrough(MODEL, walkthrough, "\nextra", FakeTokenHandler()))
+
+        assert result == "\n".join(walkthrough) + "\nextra"
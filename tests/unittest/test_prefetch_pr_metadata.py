@@ -0,0 +1,140 @@
+import threading
+import time
+from types import MappingProxyType, SimpleNamespace
+
+import pytest
+
+from pr_agent.git_providers import GithubProvider, GitLabProvider
+from pr_agent.git_providers.git_provider import PR_METADATA_FIELDS, PRMetadata
+
+
+def make_provider(barrier=None):
+    provider = GitLabProvider.__new__(GitLabProvider)
+    provider.calls = []
+
+    def getter(name, value):
+        def get():
+            provider.calls.append(name)
+            if barrier:
+                # every call waits for the others, which only returns when they all run at the same time
+                barrier.wait(timeout=5)
+            return value
+        return get
+
+    provider.get_languages = getter('languages', {'Python': 100})
+    provider.get_files = getter('files', ['a.py', 'b.py'])
+    provider.get_pr_branch = getter('branch', 'feature')
+    provider.get_pr_description_full = getter('description_full', 'full description')
+    provider.get_user_description = getter('user_description', 'user description')
+    provider.get_commit_messages = getter('commit_messages', '1. first commit')
+    return provider
+
+
+class FakeRequester:
+    """
+    Stands for the single connection of a PyGithub client, and records the requests that overlap.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.overlaps = 0
+        self.threads = set()
+
+    def request(self, value):
+        with self.lock:
+            self.in_flight += 1
+            self.overlaps += self.in_flight > 1
+            self.threads.add(threading.get_ident())
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        return value
+
+
+def make_github_provider(requester):
+    provider = GithubProvider.__new__(GithubProvider)
+    provider.repo = "owner/repo"
+    provider.incremental = SimpleNamespace(is_incremental=False)
+    provider.git_files = None
+    provider.repo_obj = SimpleNamespace(full_name="owner/repo",
+                                        get_languages=lambda: requester.request({'Python': 100}))
+    commit = SimpleNamespace(commit=SimpleNamespace(message="first commit"))
+    provider.pr = SimpleNamespace(get_files=lambda: requester.request(['a.py']),
+                                  get_commits=lambda: requester.request([commit]),
+                                  head=SimpleNamespace(ref="feature"), body="description")
+    return provider
+
+
+class TestPrefetchPRMetadata:
+    def test_all_fields_are_fetched_concurrently(self):
+        provider = make_provider(threading.Barrier(len(PR_METADATA_FIELDS)))
+        metadata = provider.prefetch_pr_metadata()
+
+        assert sorted(provider.calls) == sorted(PR_METADATA_FIELDS)
+        assert metadata.languages == {'Python': 100}
+        assert isinstance(metadata.languages, MappingProxyType)
+        assert metadata.files == ('a.py', 'b.py')
+        assert metadata.branch == 'feature'
+        assert metadata.commit_messages == '1. first commit'
+        assert metadata.get_pr_description() == 'full description'
+        assert metadata.get_pr_description(full=False) == 'user description'
+
+    def test_only_requested_fields(self):
+        provider = make_provider()
+        metadata = provider.prefetch_pr_metadata(('branch', 'files'))
+
+        assert sorted(provider.calls) == ['branch', 'files']
+        assert metadata.branch == 'feature'
+        assert metadata.languages is None
+
+    def test_snapshot_is_immutable(self):
+        metadata = make_provider().prefetch_pr_metadata(('branch',))
+        with pytest.raises(Exception):
+            metadata.branch = 'main'
+        assert isinstance(metadata, PRMetadata)
+
+    def test_errors_are_raised(self):
+        provider = make_provider()
+
+        def fail():
+            raise RuntimeError("no access")
+
+        provider.get_languages = fail
+        with pytest.raises(RuntimeError):
+            provider.prefetch_pr_metadata()
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError):
+            make_provider().prefetch_pr_metadata(('reviewers',))
+
+    def test_sequential_for_git_backed_providers(self):
+        provider = make_provider()
+        provider.supports_concurrent_metadata = False
+        threads = set()
+        get_files = provider.get_files
+
+        def get_files_in_thread():
+            threads.add(threading.get_ident())
+            return get_files()
+
+        provider.get_files = get_files_in_thread
+        metadata = provider.prefetch_pr_metadata()
+
+        assert provider.calls == list(PR_METADATA_FIELDS)
+        assert threads == {threading.get_ident()}
+        assert metadata.files == ('a.py', 'b.py')
+
+    def test_github_requests_do_not_overlap(self):
+        requester = FakeRequester()
+        provider = make_github_provider(requester)
+
+        metadata = provider.prefetch_pr_metadata()
+
+        assert requester.overlaps == 0
+        assert requester.threads == {threading.get_ident()}
+        assert metadata.languages == {'Python': 100}
+        assert metadata.files == ('a.py',)
+        assert metadata.branch == 'feature'
+        assert metadata.commit_messages == '1. first commit'
+        assert metadata.get_pr_description(full=False) == 'description'
@@ -0,0 +1,58 @@
+from pr_agent.algo.review_store import (ReviewStore, file_blob_sha,
+                                        get_changed_files, merge_reviews)
+from pr_agent.algo.types import FilePatchInfo
+
+
+class TestReviewStore:
+    def test_file_blob_sha_is_the_git_blob_sha(self):
+        file = FilePatchInfo(base_file="", head_file="hello\n", patch="", filename="a.txt")
+        assert file_blob_sha(file) == "ce013625030ba8dba906f756967f9e9ca394464a"  # git hash-object
+        no_content = FilePatchInfo(base_file="", head_file="", patch="+hello", filename="a.txt")
+        assert file_blob_sha(no_content).startswith("patch:")
+        lazy = FilePatchInfo(None, None, "+hello", "a.txt", content_loader=lambda version: "hello\n")
+        assert file_blob_sha(lazy) == file_blob_sha(no_content)
+        assert not lazy.is_content_loaded('head')
+
+    def test_get_changed_files(self):
+        files = [FilePatchInfo("", "a", "", "a.py"), FilePatchInfo("", "b2", "", "b.py"),
+                 FilePatchInfo("", "c", "", "c.py")]
+        stored_files = {"a.py": file_blob_sha(files[0]), "b.py": "old", "d.py": "old"}
+        assert get_changed_files(stored_files, files) == ({"b.py", "c.py"}, {"d.py"})
+
+    def test_merge_reviews(self):
+        stored = {"review": {"estimated_effort_to_review_[1-5]": "4, because ...",
+                             "security_concerns": "Possible SQL injection in a.py",
+                             "key_issues_to_review": [{"relevant_file": "a.py", "issue_header": "old a"},
+                                                      {"relevant_file": "b.py", "issue_header": "old b"}],
+                             "relevant_tests": "No"}}
+        new = {"review": {"estimated_effort_to_review_[1-5]": "2, because ...",
+                          "security_concerns": "No",
+                          "relevant_tests": "Yes",
+                          "key_issues_to_review": [{"relevant_file": "b.py", "issue_header": "new b"}]}}
+
+        merged = merge_reviews(stored, new, unchanged_files={"a.py"})["review"]
+
+        assert merged["estimated_effort_to_review_[1-5]"] == "4, because ..."
+        assert merged["security_concerns"] == "Possible SQL injection in a.py"
+        assert merged["relevant_tests"] == "Yes"
+        assert [issue["issue_header"] for issue in merged["key_issues_to_review"]] == ["old a", "new b"]
+        assert list(merged)[-1] == "key_issues_to_review"
+
+    def test_merge_reviews_drops_issues_of_removed_files(self):
+        stored = {"review": {"key_issues_to_review": [{"relevant_file": "removed.py", "issue_header": "old"}],
+                             "relevant_tests": "No"}}
+
+        merged = merge_reviews(stored, {}, unchanged_files={"a.py"})["review"]
+
+        assert merged == {"relevant_tests": "No", "key_issues_to_review": []}
+
+    def test_save_and_load(self, tmp_path):
+        store = ReviewStore(str(tmp_path / "reviews"))
+        assert store.load("https://github.com/org/repo/pull/1") is None
+
+        store.save("https://github.com/org/repo/pull/1", {"review": {"relevant_tests": "No"}}, {"a.py": "sha"})
+        entry = store.load("https://github.com/org/repo/pull/1")
+
+        assert entry["review"] == {"review": {"relevant_tests": "No"}}
+        assert entry["files"] == {"a.py": "sha"}
+        assert store.load("https://github.com/org/repo/pull/2") is None
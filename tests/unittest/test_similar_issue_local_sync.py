@@ -0,0 +1,27 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from pr_agent.algo.local_vector_store import LocalVectorStore
+from pr_agent.tools import pr_similar_issue
+from pr_agent.tools.pr_similar_issue import PRSimilarIssue
+
+
+def make_issue(number):
+    return SimpleNamespace(pull_request=None, title=f"title {number}", body=f"body {number}", number=number,
+                           user=SimpleNamespace(login="user"), created_at=datetime(2024, 1, 1),
+                           updated_at=datetime(2024, 1, number), get_comments=lambda: [])
+
+
+class TestSimilarIssueLocalSync:
+    def test_local_sync_is_not_limited_by_max_issues_to_scan(self, tmp_path, monkeypatch):
+        tool = PRSimilarIssue.__new__(PRSimilarIssue)
+        tool.max_issues_to_scan = 2
+        tool.last_synced_issue = None
+        tool.vector_store = LocalVectorStore(str(tmp_path / "index"))
+        monkeypatch.setattr(pr_similar_issue, "embed_texts", lambda texts: [[1.0, 0.0]] * len(texts))
+
+        tool._update_local_store_with_issues([make_issue(number) for number in range(1, 6)], "org-repo")
+
+        assert len(tool.vector_store) == 5
+        assert tool.vector_store.get_sync_state("org-repo") == {"updated_at": "2024-01-05T00:00:00",
+                                                                 "issue_number": 5}
@@ -0,0 +1,45 @@
+from pr_agent.algo.suggestions_dedup import (SuggestionsIndex, code_shingles,
+                                             dedup_code_suggestions)
+
+
+class TestSuggestionsDedup:
+    code = "if user is None:\n    raise ValueError('missing user')\nreturn user.name"
+
+    def test_code_shingles_ignore_whitespace_and_case(self):
+        assert code_shingles(self.code) == code_shingles(self.code.upper().replace("\n", "\n\n  "))
+        assert code_shingles("") == set()
+
+    def test_near_duplicates_are_merged(self):
+        suggestions = [
+            {"relevant_file": "a.py", "improved_code": self.code, "relevant_lines_start": 10,
+             "relevant_lines_end": 12, "score": 6},
+            {"relevant_file": "b.py", "improved_code": self.code, "relevant_lines_start": 10,
+             "relevant_lines_end": 12, "score": 6},
+            {"relevant_file": "a.py", "improved_code": self.code + "  ", "relevant_lines_start": 11,
+             "relevant_lines_end": 14, "score": 8},
+            {"relevant_file": "a.py", "improved_code": self.code, "relevant_lines_start": 30,
+             "relevant_lines_end": 32, "score": 6},
+            {"relevant_file": "a.py", "improved_code": "for item in items:\n    process(item)",
+             "relevant_lines_start": 10, "relevant_lines_end": 12, "score": 6},
+        ]
+        assert dedup_code_suggestions(suggestions) == [suggestions[2], suggestions[1], suggestions[3],
+                                                       suggestions[4]]
+        assert dedup_code_suggestions(suggestions, similarity_threshold=0) == suggestions
+
+    def test_suggestions_without_lines_are_matched_by_code(self):
+        index = SuggestionsIndex()
+        assert index.add({"relevant_file": "a.py", "improved_code": self.code}) == 0
+        assert index.find_duplicate({"relevant_file": "a.py", "improved_code": self.code,
+                                     "relevant_lines_start": 5, "relevant_lines_end": 7}) == 0
+        assert index.find_duplicate({"relevant_file": "a.py", "improved_code": "return None"}) is None
+
+    def test_same_fix_at_different_places_without_lines_is_kept(self):
+        suggestions = [
+            {"relevant_file": "a.py", "existing_code": "def load(path):\n    return open(path).read()",
+             "improved_code": self.code},
+            {"relevant_file": "a.py", "existing_code": "class Writer:\n    def save(self, data): pass",
+             "improved_code": self.code},
+            {"relevant_file": "a.py", "existing_code": "def load(path):\n    return open(path).read()",
+             "improved_code": self.code + "\n"},
+        ]
+        assert dedup_code_suggestions(suggestions) == suggestions[:2]
@@ -0,0 +1,91 @@
+import pytest
+
+from pr_agent.algo.token_handler import TokenEncoder, TokenHandler
+from pr_agent.config_loader import get_settings
+
+
+@pytest.mark.usefixtures("token_encoder_registry")
+class TestTokenEncoder:
+    def test_registered_tokenizer_is_cached_per_model(self):
+        created = []
+
+        def factory(model):
+            created.append(model)
+            return lambda text: text.split()
+
+        TokenEncoder.register_tokenizer("fakefamily", factory)
+        encoder_a = TokenEncoder.get_token_encoder("fakefamily-large")
+        encoder_b = TokenEncoder.get_token_encoder("fakefamily-small")
+
+        assert TokenEncoder.get_token_encoder("fakefamily-large") is encoder_a
+        assert encoder_a is not encoder_b
+        assert created == ["fakefamily-large", "fakefamily-small"]
+        assert encoder_a.encode("one two three", disallowed_special=()) == ["one", "two", "three"]
+
+    def test_error_margin_only_for_approximate_tokenizers(self, monkeypatch):
+        monkeypatch.setattr(get_settings().config, 'model_token_count_estimate_factor', 0.5, raising=False)
+        TokenEncoder.register_tokenizer("exactfamily", lambda model: lambda text: text.split())
+        monkeypatch.setitem(TokenEncoder._encoders, "approx-model", TokenEncoder._encoders.get(
+            "exactfamily-model", TokenEncoder.get_token_encoder("exactfamily-model")))
+
+        assert TokenEncoder.get_error_margin("exactfamily-model") == 0.0
+        assert TokenEncoder.get_error_margin("approx-model") == 0.5
+
+        exact_handler = TokenHandler(model="exactfamily-model")
+        approx_handler = TokenHandler(model="approx-model")
+        assert exact_handler.count_tokens("a b c d") == 4
+        assert approx_handler.count_tokens("a b c d") == 6
+
+    def test_measured_margin_of_model_families(self, monkeypatch):
+        monkeypatch.setattr(get_settings().config, 'model_token_count_estimate_factor', 0.0, raising=False)
+        assert TokenEncoder.get_error_margin("anthropic/claude-3-7-sonnet") == 0.31
+        assert TokenEncoder.get_error_margin("gemini/gemini-2.0-flash") == 0.0
+        assert TokenEncoder.get_error_margin("gpt-4o") == 0.0
+        # a configured factor replaces the measured margins
+        monkeypatch.setattr(get_settings().config, 'model_token_count_estimate_factor', 0.5, raising=False)
+        assert TokenEncoder.get_error_margin("anthropic/claude-3-7-sonnet") == 0.5
+
+    def test_for_model_counts_the_prompt_with_the_other_model(self, monkeypatch):
+        monkeypatch.setattr(get_settings().config, 'model_token_count_estimate_factor', 0.0, raising=False)
+        TokenEncoder.register_tokenizer("wordsfamily", lambda model: lambda text: text.split())
+        TokenEncoder.register_tokenizer("charsfamily", lambda model: lambda text: list(text))
+        pr = object()
+        token_handler = TokenHandler(pr, {"name": "b"}, "a {{ name }}", "c", model="wordsfamily-model")
+        assert token_handler.prompt_tokens == 3
+
+        other = token_handler.for_model("charsfamily-model")
+        assert token_handler.for_model("wordsfamily-model") is token_handler
+        assert (other.model, other.prompt_tokens, other.count_tokens("ab cd")) == ("charsfamily-model", 4, 5)
+        assert (token_handler.prompt_tokens, token_handler.count_tokens("ab cd")) == (3, 2)
+
+    def test_estimate_tokens(self):
+        TokenEncoder.register_tokenizer("estimatefamily", lambda model: lambda text: text.split())
+        token_handler = TokenHandler(model="estimatefamily-model")
+
+        assert token_handler.estimate_tokens("") == 0
+        assert token_handler.estimate_tokens("a" * 410, "main.py") == 100
+        assert token_handler.estimate_tokens("a" * 330) == 100
+        assert token_handler.estimate_tokens("é" * 165, "notes.unknown") == 100  # 2 bytes per character
+        assert token_handler.estimate_tokens_batch(["a" * 410, "a" * 330], ["main.py", None]) == [100, 100]
+
+    def test_count_tokens_batch(self):
+        class BatchEncoder:
+            def __init__(self):
+                self.batch_calls = 0
+
+            def encode(self, text, **kwargs):
+                return text.split()
+
+            def encode_ordinary_batch(self, texts, num_threads=8):
+                self.batch_calls += 1
+                return [text.split() for text in texts]
+
+        TokenEncoder.register_tokenizer("batchfamily", lambda model: lambda text: text.split())
+        token_handler = TokenHandler(model="batchfamily-model")
+        patches = ["a b c", "", "d e"]
+        assert token_handler.count_tokens_batch(patches) == [token_handler.count_tokens(p) for p in patches]
+        assert token_handler.count_tokens_batch([]) == []
+
+        token_handler.encoder = BatchEncoder()
+        assert token_handler.count_tokens_batch(patches) == [3, 0, 2]
+        assert token_handler.encoder.batch_calls == 1